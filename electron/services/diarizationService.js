@@ -15,6 +15,7 @@
 const fs = require('fs');
 const path = require('path');
 const speakerManager = require('./speakerManager');
+const { readSpeakerEmbeddings } = require('../utils/npyReader');
 const dbService = require('../database/dbService');
 
 /**
@@ -26,7 +27,7 @@ const dbService = require('../database/dbService');
 
 /**
  * @typedef {Object} DiarizationData
- * @property {Object} [speaker_embeddings] - Mapa de embeddings (v2.0)
+ * @property {Object} [speaker_embeddings] - Mapa de embeddings (v2.0, en línea o desde el .npy)
  * @property {Array} [segments] - Lista de segmentos
  * @property {string} [version] - Versión del esquema
  */
@@ -46,13 +47,24 @@ class DiarizationService {
       const data = JSON.parse(raw);
 
       // Detectar schema v2.0: tiene speaker_embeddings con keys
-      const hasEmbeddings =
+      let speakerEmbeddings =
         data?.speaker_embeddings &&
         typeof data.speaker_embeddings === 'object' &&
-        Object.keys(data.speaker_embeddings).length > 0;
+        Object.keys(data.speaker_embeddings).length > 0
+          ? data.speaker_embeddings
+          : null;
+
+      // Centroides en el .npy adjunto (speaker_embeddings_file) cuando no van en línea
+      if (!speakerEmbeddings && data?.speaker_embeddings_file?.speakers?.length) {
+        try {
+          speakerEmbeddings = readSpeakerEmbeddings(diarizationPath, data.speaker_embeddings_file);
+        } catch (npyErr) {
+          console.warn(`[DiarizationService] No se pudieron leer los embeddings de ${data.speaker_embeddings_file.path}: ${npyErr.message}`);
+        }
+      }
 
       return {
-        speaker_embeddings: hasEmbeddings ? data.speaker_embeddings : null,
+        speaker_embeddings: speakerEmbeddings,
         segments: data?.segments || [],
         version: data?.version || 'unknown',
       };
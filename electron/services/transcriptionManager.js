@@ -5,8 +5,23 @@ const { app } = require('electron');
 const dbService = require('../database/dbService');
 const notificationService = require('./notificationService');
 const { getSetting } = require('../utils/paths');
+const { createEventReader } = require('../utils/pythonEvents');
 
 const SUPPORTED_AUDIO_EXTENSIONS = ['webm', 'wav', 'mp3', 'm4a', 'ogg', 'aac', 'flac'];
+// Últimos segmentos parciales de la transcripción activa expuestos a la UI
+const MAX_PREVIEW_SEGMENTS = 20;
+
+/**
+ * Con --events los logs humanos de los scripts llegan por stderr: solo los
+ * errores reales se registran como error.
+ */
+function logPythonStderr(label, data) {
+  const msg = data.toString().trim();
+  if (!msg) return;
+  if (/FATAL_ERROR|TRANSCRIPTION_ERROR|Traceback/.test(msg)) console.error(`[${label} ERR]: ${msg}`);
+  else if (msg.toLowerCase().includes('warning')) console.warn(`[${label} WARN]: ${msg}`);
+  else console.log(`[${label}]: ${msg}`);
+}
 
 class TranscriptionManager {
   constructor() {
@@ -15,6 +30,7 @@ class TranscriptionManager {
     this.onUpdateCallback = null;
     this.onAutoAnalyzeCallback = null;
     this.basePath = null;
+    this.preview = [];
     // Don't check queue here, DB isn't ready. Explicitly call checkQueue() from main.js
   }
 
@@ -44,7 +60,8 @@ class TranscriptionManager {
     
     return {
       active: activeQueue,
-      history: history
+      history: history,
+      preview: this.preview
     };
   }
 
@@ -131,6 +148,7 @@ class TranscriptionManager {
     try {
         const { settingsPath } = require('../utils/paths');
         let diarizationFile = null;
+        let inlineDiarization = null;
         
         if (fs.existsSync(settingsPath)) {
             const settingsData = fs.readFileSync(settingsPath, 'utf8');
@@ -146,7 +164,12 @@ class TranscriptionManager {
                         .find((candidate) => fs.existsSync(candidate));
                     const outputDiarizationPath = path.join(this.basePath, recording.relative_path, 'analysis', 'diarization.json');
                     
-                    if (sysAudioPath) {
+                    if (sysAudioPath && !app.isPackaged) {
+                        // Un solo proceso: pyannote y Whisper en paralelo sobre la pista ya decodificada.
+                        // El binario empaquetado excluye torch, así que allí se mantiene el pre-proceso.
+                        console.log(`[Manager] Diarización habilitada. Se ejecuta junto a la transcripción.`);
+                        inlineDiarization = { hfToken: settings.hfToken, outputPath: outputDiarizationPath };
+                    } else if (sysAudioPath) {
                         console.log(`[Manager] Diarización habilitada. Ejecutando pre-proceso...`);
                         this.updateProgress(0, 'diarizing');
                         
@@ -167,7 +190,9 @@ class TranscriptionManager {
                         const diarizationArgs = [
                             '--audio_file', sysAudioPath,
                             '--hf_token', settings.hfToken,
-                            '--output_json', outputDiarizationPath
+                            '--output_json', outputDiarizationPath,
+                            // Centroides en diarization.embeddings.npy (diarizationService los lee de ahí)
+                            '--embeddings_format', 'npy'
                         ];
                         if (ffmpegPath && fs.existsSync(ffmpegPath)) diarizationArgs.push('--ffmpeg', ffmpegPath);
                         if (ffprobePath && fs.existsSync(ffprobePath)) diarizationArgs.push('--ffprobe', ffprobePath);
@@ -196,7 +221,7 @@ class TranscriptionManager {
         await this.runTranscriptionProcess(this.activeTask, diarizationFile, (p) => {
             const totalProgress = Math.floor(baseProgress + (p * progressFactor));
             this.updateProgress(totalProgress, 'transcribing');
-        });
+        }, inlineDiarization);
         
         dbService.updateTask(nextTask.id, 'completed', 'completed', 100);
         this.activeTask = null;
@@ -240,26 +265,26 @@ class TranscriptionManager {
             }
         }
 
-        const args = [...execArgs, ...scriptArgs];
+        const args = [...execArgs, ...scriptArgs, '--events'];
         this.process = spawn(executablePath, args, { env: { ...process.env, PYTHONUNBUFFERED: '1' } });
 
-        this.process.stdout.on('data', (data) => {
-            const message = data.toString().trim();
-            console.log(`[${scriptName}]: ${message}`);
-            const progressMatch = message.match(/PROGRESS:\s*(\d+)/);
-            if (progressMatch && onProgress) {
-                onProgress(parseInt(progressMatch[1], 10));
-            }
+        let fatalError = null;
+        const reader = createEventReader({
+            onEvent: (event) => {
+                if (event.type === 'progress' && onProgress) onProgress(event.value);
+                else if (event.type === 'error' && event.fatal) fatalError = event.message;
+            },
+            onLine: (line) => console.log(`[${scriptName}]: ${line}`),
         });
 
-        this.process.stderr.on('data', (data) => {
-            console.error(`[${scriptName} ERR]: ${data.toString()}`);
-        });
+        this.process.stdout.on('data', (data) => reader.push(data));
+        this.process.stderr.on('data', (data) => logPythonStderr(scriptName, data));
 
         this.process.on('close', (code) => {
             this.process = null;
-            if (code === 0) resolve();
-            else reject(new Error(`${scriptName} exited with code ${code}`));
+            reader.end();
+            if (code === 0 && !fatalError) resolve();
+            else reject(new Error(fatalError || `${scriptName} exited with code ${code}`));
         });
 
         this.process.on('error', (err) => {
@@ -269,7 +294,7 @@ class TranscriptionManager {
     });
 }
 
-runTranscriptionProcess(task, diarizationFile, onProgress) {
+runTranscriptionProcess(task, diarizationFile, onProgress, inlineDiarization = null) {
     return new Promise((resolve, reject) => {
         const isDev = !app.isPackaged;
         let executablePath;
@@ -300,7 +325,12 @@ runTranscriptionProcess(task, diarizationFile, onProgress) {
         if (task.model) args.push('--model', task.model);
         if (ffmpegPath && fs.existsSync(ffmpegPath)) args.push('--ffmpeg', ffmpegPath);
         if (ffprobePath && fs.existsSync(ffprobePath)) args.push('--ffprobe', ffprobePath);
-        if (diarizationFile) args.push('--diarization_file', diarizationFile);
+        if (inlineDiarization) {
+            args.push('--diarize', '--hf_token', inlineDiarization.hfToken, '--diarization_file', inlineDiarization.outputPath);
+        } else if (diarizationFile) {
+            args.push('--diarization_file', diarizationFile);
+        }
+        args.push('--events');
 
         try {
             const { settingsPath } = require('../utils/paths');
@@ -317,24 +347,30 @@ runTranscriptionProcess(task, diarizationFile, onProgress) {
         }
 
         this.process = spawn(executablePath, args, { env: spawnEnv });
-
-        this.process.stdout.on('data', (data) => {
-            const message = data.toString().trim();
-            const progressMatch = message.match(/PROGRESS:\s*(\d+)/);
-            if (progressMatch && onProgress) {
-                onProgress(parseInt(progressMatch[1], 10));
-            }
+        this.preview = [];
+
+        let fatalError = null;
+        const reader = createEventReader({
+            onEvent: (event) => {
+                if (event.type === 'progress' && onProgress) onProgress(event.value);
+                else if (event.type === 'partial_result') this.appendPreview(event);
+                else if (event.type === 'model_selection') {
+                    console.log(`[Transcription ${task.id}] Modelo ${event.model} (beam ${event.beam_size}), ETA ${event.eta_s}s de ${event.budget_s}s`);
+                } else if (event.type === 'draft_ready') {
+                    console.log(`[Transcription ${task.id}] Borrador (${event.model}) listo en ${event.elapsed_s}s`);
+                }
+                else if (event.type === 'error' && event.fatal) fatalError = event.message;
+            },
         });
 
-        this.process.stderr.on('data', (data) => {
-            const msg = data.toString().trim();
-            if (msg.toLowerCase().includes('warning')) console.warn(`[Transcription ${task.id} WARN]: ${msg}`);
-            else console.error(`[Transcription ${task.id} ERR]: ${msg}`);
-        });
+        this.process.stdout.on('data', (data) => reader.push(data));
+        this.process.stderr.on('data', (data) => logPythonStderr(`Transcription ${task.id}`, data));
 
         this.process.on('close', (code) => {
             this.process = null;
-            if (code === 0) {
+            reader.end();
+            this.preview = [];
+            if (code === 0 && !fatalError) {
                 dbService.updateStatus(folderName, 'transcribed');
                 dbService.updateRagStatus(folderName, null);
                 if (task.model) dbService.updateTranscriptionModel(folderName, task.model);
@@ -345,7 +381,7 @@ runTranscriptionProcess(task, diarizationFile, onProgress) {
                 }
                 resolve();
             } else {
-                reject(new Error(`Process exited with code ${code}`));
+                reject(new Error(fatalError || `Process exited with code ${code}`));
             }
         });
 
@@ -386,6 +422,12 @@ runTranscriptionProcess(task, diarizationFile, onProgress) {
     }
   }
 
+  appendPreview(event) {
+      const segments = (event.segments || []).map((segment) => ({ track: event.track, ...segment }));
+      this.preview = [...this.preview, ...segments].slice(-MAX_PREVIEW_SEGMENTS);
+      // Sin notifyUpdate aquí: el siguiente evento de progreso ya envía el estado
+  }
+
   updateProgress(percent, step) {
       if (this.activeTask) {
           dbService.updateTask(this.activeTask.id, 'processing', step, percent);
@@ -0,0 +1,78 @@
+/**
+ * Lector mínimo de archivos .npy (formato de numpy) para los embeddings de la
+ * diarización (`speaker_embeddings_file`, ver python/embedding_cache.py).
+ * Sin dependencias de Electron — se puede testear de forma aislada.
+ *
+ * Soporta matrices little-endian float32 (`<f4`) y float16 (`<f2`) en orden C,
+ * que es lo que escribe `np.save` en las plataformas soportadas.
+ */
+
+const fs = require('fs');
+const path = require('path');
+
+const MAGIC = Buffer.from([0x93, 0x4e, 0x55, 0x4d, 0x50, 0x59]); // \x93NUMPY
+
+function halfToFloat(bits) {
+  const sign = bits & 0x8000 ? -1 : 1;
+  const exponent = (bits >> 10) & 0x1f;
+  const fraction = bits & 0x3ff;
+  if (exponent === 0) return sign * 2 ** -14 * (fraction / 1024);
+  if (exponent === 0x1f) return fraction ? NaN : sign * Infinity;
+  return sign * 2 ** (exponent - 15) * (1 + fraction / 1024);
+}
+
+/**
+ * Parsea el contenido de un .npy.
+ * @param {Buffer} buffer
+ * @returns {{ shape: number[], data: Float32Array }}
+ */
+function parseNpy(buffer) {
+  if (buffer.length < 10 || !buffer.subarray(0, 6).equals(MAGIC)) {
+    throw new Error('No es un archivo .npy');
+  }
+  const major = buffer[6];
+  const headerLength = major === 1 ? buffer.readUInt16LE(8) : buffer.readUInt32LE(8);
+  const headerStart = major === 1 ? 10 : 12;
+  const header = buffer.toString('latin1', headerStart, headerStart + headerLength);
+
+  const descr = /'descr':\s*'([^']+)'/.exec(header)?.[1];
+  const fortranOrder = /'fortran_order':\s*True/.test(header);
+  const shapeText = /'shape':\s*\(([^)]*)\)/.exec(header)?.[1];
+  if (!descr || shapeText === undefined) throw new Error('Cabecera .npy inválida');
+  if (fortranOrder) throw new Error('Orden Fortran no soportado');
+
+  const shape = shapeText.split(',').map((d) => d.trim()).filter(Boolean).map(Number);
+  const count = shape.reduce((a, b) => a * b, 1);
+  const offset = headerStart + headerLength;
+  const data = new Float32Array(count);
+
+  if (descr === '<f4') {
+    for (let i = 0; i < count; i++) data[i] = buffer.readFloatLE(offset + i * 4);
+  } else if (descr === '<f2') {
+    for (let i = 0; i < count; i++) data[i] = halfToFloat(buffer.readUInt16LE(offset + i * 2));
+  } else {
+    throw new Error(`Tipo .npy no soportado: ${descr}`);
+  }
+  return { shape, data };
+}
+
+/**
+ * Carga los centroides referenciados por `speaker_embeddings_file` de un diarization.json.
+ * @param {string} diarizationPath - Ruta del JSON (la del .npy es relativa a él)
+ * @param {{ path: string, speakers: string[] }} reference
+ * @returns {Object<string, number[]>} { SPEAKER_XX: embedding }
+ */
+function readSpeakerEmbeddings(diarizationPath, reference) {
+  const { shape, data } = parseNpy(fs.readFileSync(path.join(path.dirname(diarizationPath), reference.path)));
+  const [rows, dim = 0] = shape;
+  if (rows !== reference.speakers.length) {
+    throw new Error(`El .npy tiene ${rows} filas para ${reference.speakers.length} hablantes`);
+  }
+  const embeddings = {};
+  reference.speakers.forEach((speaker, i) => {
+    embeddings[speaker] = Array.from(data.subarray(i * dim, (i + 1) * dim));
+  });
+  return embeddings;
+}
+
+module.exports = { parseNpy, readSpeakerEmbeddings };
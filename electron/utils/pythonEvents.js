@@ -0,0 +1,87 @@
+/**
+ * Lector del protocolo de eventos de los scripts Python (`--events`, ver python/events.py).
+ * Sin dependencias de Electron — se puede testear de forma aislada.
+ *
+ * Cada evento es una línea `EVENT:{json}` en stdout con `{ v, type, t, ...campos }`.
+ * Tipos: stage, progress, metric, partial_result, model_selection (modelo y ETA
+ * elegidos con --deadline/--target_rtf), draft_ready ({ model, elapsed_s } del
+ * borrador de --draft_model) y error.
+ * stdout llega en chunks arbitrarios, así que se acumula hasta cada salto de
+ * línea antes de parsear. Las líneas clásicas `PROGRESS:N`, `MODEL_SELECTION:{json}`
+ * y `DRAFT_READY:{json}` (scripts sin `--events`) se traducen a sus eventos para
+ * mantener compatibilidad.
+ */
+
+const EVENT_PREFIX = 'EVENT:';
+const PROTOCOL_VERSION = 1;
+const LEGACY_PROGRESS = /^PROGRESS:\s*(\d+)\s*$/;
+const LEGACY_JSON_LINES = { 'MODEL_SELECTION:': 'model_selection', 'DRAFT_READY:': 'draft_ready' };
+
+/**
+ * Parsea una línea de stdout.
+ * @returns {object|null} el evento, o null si la línea no es un evento (log u otro formato)
+ */
+function parseEventLine(line) {
+  const trimmed = line.trim();
+  if (trimmed.startsWith(EVENT_PREFIX)) {
+    let event;
+    try {
+      event = JSON.parse(trimmed.slice(EVENT_PREFIX.length));
+    } catch (_) {
+      return null;
+    }
+    if (!event || typeof event.type !== 'string') return null;
+    // Versiones mayores desconocidas se ignoran en lugar de malinterpretarse
+    if (typeof event.v === 'number' && event.v > PROTOCOL_VERSION) return null;
+    return event;
+  }
+  const progressMatch = trimmed.match(LEGACY_PROGRESS);
+  if (progressMatch) {
+    return { v: PROTOCOL_VERSION, type: 'progress', value: parseInt(progressMatch[1], 10) };
+  }
+  const legacyPrefix = Object.keys(LEGACY_JSON_LINES).find((prefix) => trimmed.startsWith(prefix));
+  if (legacyPrefix) {
+    try {
+      const fields = JSON.parse(trimmed.slice(legacyPrefix.length));
+      return { v: PROTOCOL_VERSION, type: LEGACY_JSON_LINES[legacyPrefix], ...fields };
+    } catch (_) {
+      return null;
+    }
+  }
+  return null;
+}
+
+/**
+ * Crea un lector incremental: `push(chunk)` con cada chunk de stdout y `end()`
+ * al cerrar el proceso. Llama a onEvent(evento) por cada evento y a
+ * onLine(línea) por cada línea que no lo es.
+ */
+function createEventReader({ onEvent, onLine } = {}) {
+  let buffer = '';
+
+  const handleLine = (line) => {
+    if (!line.trim()) return;
+    const event = parseEventLine(line);
+    if (event) {
+      if (onEvent) onEvent(event);
+    } else if (onLine) {
+      onLine(line);
+    }
+  };
+
+  return {
+    push(chunk) {
+      buffer += chunk.toString();
+      const lines = buffer.split(/\r?\n/);
+      buffer = lines.pop();
+      lines.forEach(handleLine);
+    },
+    end() {
+      const rest = buffer;
+      buffer = '';
+      handleLine(rest);
+    },
+  };
+}
+
+module.exports = { EVENT_PREFIX, PROTOCOL_VERSION, parseEventLine, createEventReader };
@@ -6,6 +6,8 @@ multiprocessing.freeze_support()
 import os
 import sys
 import tempfile
+import threading
+import time
 
 # Configurar matplotlib ANTES de importarlo
 os.environ["MPLCONFIGDIR"] = os.path.join(tempfile.gettempdir(), "matplotlib_cache")
@@ -39,6 +41,20 @@ import json
 from datetime import timedelta
 import argparse
 
+from perf_metrics import PerfRecorder
+import whisper_tuning
+import mixed_track
+import model_selection
+import preflight
+from background_task import BackgroundTask
+from stage_graph import DEFAULT_WORKERS, StageGraph
+from transcript_records import DiarizationIndex, Turn, Word, merge_turns
+import events
+import inline_diarization
+import raw_results
+import redecode
+import two_pass
+
 print("INIT:imports_ok", flush=True)
 
 BASE_DIR = "/Users/raul.garciad/Desktop/recorder/grabaciones"
@@ -49,10 +65,37 @@ CHUNK_SIZE_MS = 1000  # Tamaño de chunks en milisegundos
 WHISPER_MODEL = "large"  # Opciones: tiny, base, small, medium, large
 MIN_SIGNAL_RMS = 0.001
 SILENT_TRACK_THRESHOLD_PCT = 99.5
+TRANSCRIPTION_LANGUAGE = "es"
+CPU_THREADS = whisper_tuning.DEFAULT_WHISPER_CONFIG["cpu_threads"]
+COMPUTE_TYPE = whisper_tuning.DEFAULT_WHISPER_CONFIG["compute_type"]
+NUM_WORKERS = whisper_tuning.DEFAULT_WHISPER_CONFIG["num_workers"]
+# Overrides explícitos de CLI (compute_type/cpu_threads/num_workers); el resto sale del perfil
+WHISPER_OVERRIDES = {}
+# Pausa máxima entre segmentos del mismo hablante para unirlos en un turno (--merge_gap)
+MERGE_GAP_SECONDS = 3.0
+# Modo de pista mezclada por defecto (--mix_mode), el mismo para la CLI y la clase
+MIX_MODE_DEFAULT = "auto"
 
 
 class AudioSyncAnalyzer:
-    def __init__(self, mic_file, system_file, output_dir, diarization_file=None):
+    def __init__(
+        self,
+        mic_file,
+        system_file,
+        output_dir,
+        diarization_file=None,
+        profile=False,
+        deadline=None,
+        target_rtf=None,
+        max_model="large",
+        draft_model=None,
+        redecode_weak=False,
+        redecode_model=None,
+        redecode_beam=5,
+        mix_mode=MIX_MODE_DEFAULT,
+        merge_gap=MERGE_GAP_SECONDS,
+        diarizer=None,
+    ):
         self.mic_file = mic_file
         self.system_file = system_file
         self.output_dir = output_dir
@@ -62,7 +105,35 @@ class AudioSyncAnalyzer:
         self.mic_data = None
         self.system_data = None
         self.whisper_model = None
+        self.whisper_model_name = None
+        self._model_load = None
         self.audio_metrics = {}
+        self.preflight = {}
+        self.perf = PerfRecorder("audio_sync_analyzer", output_dir, profile=profile)
+        # Selección automática de modelo por plazo (--deadline / --target_rtf)
+        self.deadline = deadline
+        self.target_rtf = target_rtf
+        self.max_model = max_model
+        self.beam_size = None
+        self._started_at = None
+        # Transcripción en dos pasadas: borrador rápido y refinado (--draft_model)
+        self.draft_model = draft_model
+        self._temp_wavs = {}
+        self._diarization_index = None
+        # Segunda pasada selectiva sobre segmentos de baja confianza (--redecode)
+        self.redecode_weak = redecode_weak
+        self.redecode_model = redecode_model
+        self.redecode_beam = redecode_beam
+        self._redecode_whisper = None
+        self._redecode_lock = threading.Lock()
+        # Pista mezclada mic + sistema en una sola pasada (--mix_mode auto/on/off)
+        self.mix_mode = mix_mode
+        self.mixed_audio = None
+        self._attributor = None
+        self._mix_lag = 0.0
+        self.merge_gap = merge_gap
+        # Diarización en el mismo proceso, en paralelo con Whisper (--diarize)
+        self.diarizer = diarizer
 
     def _load_audio_track(self, file_path, label):
         """Carga una pista individual y la invalida de forma segura si está vacía o corrupta."""
@@ -103,25 +174,89 @@ class AudioSyncAnalyzer:
         print(f"📊 Sample rate {label.lower()}: {audio.frame_rate} Hz", flush=True)
         return audio
 
-    def load_whisper_model(self):
-        """Cargar el modelo Whisper para transcripción"""
+    def load_whisper_model(self, model_name=None):
+        """Cargar el modelo Whisper para transcripción (por defecto WHISPER_MODEL)"""
+        model_name = model_name or WHISPER_MODEL
         print(
-            f"🤖 Cargando modelo Whisper '{WHISPER_MODEL}' con {CPU_THREADS} hilos...",
+            f"🤖 Cargando modelo Whisper '{model_name}' con {CPU_THREADS} hilos "
+            f"({COMPUTE_TYPE}, {NUM_WORKERS} worker(s))...",
             flush=True,
         )
         try:
             self.whisper_model = WhisperModel(
-                WHISPER_MODEL,
+                model_name,
                 device="cpu",
-                compute_type="int8",
+                compute_type=COMPUTE_TYPE,
                 cpu_threads=CPU_THREADS,
+                num_workers=NUM_WORKERS,
             )
+            self.whisper_model_name = model_name
             print("✅ Modelo Whisper cargado correctamente", flush=True)
             return True
         except Exception as e:
             print(f"❌ Error cargando modelo Whisper: {e}")
             return False
 
+    def _start_model_load(self, model_name, stage_name="load_model"):
+        """Carga el modelo en segundo plano mientras se decodifica y analiza el audio."""
+
+        def load():
+            with self.perf.stage(stage_name) as stage:
+                stage["model"] = model_name
+                stage["cpu_threads"] = CPU_THREADS
+                stage["compute_type"] = COMPUTE_TYPE
+                stage["num_workers"] = NUM_WORKERS
+                stage["background"] = True
+                return self.load_whisper_model(model_name)
+
+        self._model_load = BackgroundTask(
+            load, name="whisper-load", on_discard=lambda _: self._discard_model()
+        ).start()
+
+    def _discard_model(self):
+        self.whisper_model = None
+        self.whisper_model_name = None
+
+    def _await_model_load(self):
+        """Espera a la carga en segundo plano (solo al empezar a transcribir)."""
+        if self._model_load is None:
+            return self.whisper_model is not None
+        with self.perf.stage("await_model") as stage:
+            stage["already_loaded"] = self._model_load.done()
+            loaded = self._model_load.result()
+        self._model_load = None
+        return bool(loaded)
+
+    def _cancel_model_load(self):
+        """Sin pistas útiles no hace falta el modelo: se descarta sin esperarlo."""
+        if self._model_load is None:
+            return
+        action = "descartado" if self._model_load.done() else "cancelada su carga"
+        print(f"⏹️  Modelo Whisper {action}: no hay audio que transcribir", flush=True)
+        self._model_load.cancel()
+        self._model_load = None
+
+    def preflight_tracks(self, mic_exists=True, sys_exists=True):
+        """Clasifica las pistas con ffprobe y decodificaciones muestreadas, sin decodificarlas enteras.
+        Devuelve (mic_usable, sys_usable)."""
+        print("🔎 Comprobando pistas (preflight)...", flush=True)
+        self.preflight = {}
+        for key, label, path, exists in (
+            ("mic", "Micrófono", self.mic_file, mic_exists),
+            ("system", "Sistema", self.system_file, sys_exists),
+        ):
+            if not exists:
+                continue
+            report = preflight.classify_track(path)
+            self.preflight[key] = report
+            icon = "✅" if report["status"] == preflight.USABLE else "⚠️ "
+            print(f"{icon} {label}: {report['status']} ({report['reason']})", flush=True)
+
+        return (
+            self.preflight.get("mic", {}).get("status") == preflight.USABLE,
+            self.preflight.get("system", {}).get("status") == preflight.USABLE,
+        )
+
     def load_audio_files(self, mic_exists=True, sys_exists=True):
         """Cargar los archivos de audio usando pydub"""
         print("🎵 Cargando archivos de audio...", flush=True)
@@ -528,11 +663,40 @@ class AudioSyncAnalyzer:
 
         return chunks_info
 
-    def _transcribe_with_fallback(self, audio_file, **kwargs):
-        """Llama a whisper_model.transcribe con los kwargs dados.
+    def prepare_mixed_track(self):
+        """Decide (según la actividad del usuario en el mic) si se transcribe una sola pista mezclada.
+        Usa su propio lag aproximado para no esperar a la correlación cruzada fina."""
+        mix_lag = mixed_track.estimate_lag(self.mic_data, self.system_data, SAMPLE_RATE)
+        attributor = mixed_track.EnergyAttributor(
+            self.mic_data, self.system_data, SAMPLE_RATE, lambda t: mix_lag
+        )
+        activity = attributor.user_activity()
+        use_mix = self.mix_mode == "on" or activity < mixed_track.USER_ACTIVITY_THRESHOLD
+        print(
+            f"🎚️  Voz del usuario en el micrófono: {activity * 100:.1f}% del tiempo → "
+            f"{'pista mezclada (una pasada)' if use_mix else 'pistas separadas'}",
+            flush=True,
+        )
+        if use_mix:
+            self._attributor = attributor
+            self._mix_lag = mix_lag
+            self.mixed_audio = mixed_track.mix_tracks(self.mic_audio, self.system_audio, -mix_lag)
+        return activity, use_mix, mix_lag
+
+    def _split_mixed_result(self, result):
+        mic_result, sys_result = mixed_track.split_result(
+            result,
+            self._attributor.is_user,
+            lambda t: t + self._mix_lag,
+        )
+        return {"mic": mic_result, "system": sys_result}
+
+    def _transcribe_with_fallback(self, audio_file, model=None, **kwargs):
+        """Llama a transcribe del modelo dado (por defecto whisper_model) con los kwargs dados.
         Si falla por un modelo ONNX/VAD no encontrado, reintenta sin vad_filter."""
+        model = model or self.whisper_model
         try:
-            return self.whisper_model.transcribe(audio_file, **kwargs)
+            return model.transcribe(audio_file, **kwargs)
         except Exception as e:
             err_str = str(e).lower()
             if (
@@ -547,11 +711,191 @@ class AudioSyncAnalyzer:
                 )
                 kwargs.pop("vad_filter", None)
                 kwargs.pop("vad_parameters", None)
-                return self.whisper_model.transcribe(audio_file, **kwargs)
+                return model.transcribe(audio_file, **kwargs)
             raise
 
-    def transcribe_audio_files(self, lag_seconds=0, mic_exists=True, sys_exists=True):
-        """Transcribir archivos de audio usando Whisper con parámetros avanzados"""
+    def _beam_size(self):
+        """Beam elegido por la selección automática o, si no, dinámico según el modelo"""
+        model_name = self.whisper_model_name or WHISPER_MODEL
+        if self.beam_size and model_name == WHISPER_MODEL:
+            return self.beam_size
+        return (
+            5
+            if model_name in ["tiny", "base"]
+            else (2 if model_name == "small" else 1)
+        )
+
+    def _select_and_load_model(self, mic_exists=True, sys_exists=True):
+        """Modo plazo: elige el mayor modelo/beam que termina a tiempo y lo carga."""
+        global WHISPER_MODEL, CPU_THREADS, COMPUTE_TYPE, NUM_WORKERS
+
+        durations = []
+        if mic_exists and self.mic_audio is not None:
+            durations.append(len(self.mic_audio) / 1000)
+        if sys_exists and self.system_audio is not None:
+            durations.append(len(self.system_audio) / 1000)
+        if not durations:
+            return False
+
+        # Con varios workers las pistas se transcriben en paralelo: cuenta la más larga
+        serial_audio = (
+            max(durations) if NUM_WORKERS > 1 and len(durations) > 1 else sum(durations)
+        )
+        if self.deadline:
+            budget = self.deadline
+        else:
+            budget = self.target_rtf * max(durations)
+        budget -= time.perf_counter() - self._started_at
+
+        def config_for(model):
+            return whisper_tuning.resolve_whisper_config(model, **WHISPER_OVERRIDES)[0]
+
+        choice = model_selection.choose_model(
+            serial_audio,
+            budget,
+            lambda model: config_for(model)["cpu_threads"],
+            max_model=self.max_model,
+        )
+
+        config = config_for(choice["model"])
+        WHISPER_MODEL = choice["model"]
+        CPU_THREADS = config["cpu_threads"]
+        COMPUTE_TYPE = config["compute_type"]
+        NUM_WORKERS = config["num_workers"]
+        self.beam_size = choice["beam_size"]
+
+        if choice["fits"]:
+            print(
+                f"🎯 Modelo elegido: {choice['model']} (beam {choice['beam_size']}) — "
+                f"ETA {choice['eta_s']:.0f}s de {choice['budget_s']:.0f}s disponibles ({choice['source']})",
+                flush=True,
+            )
+        else:
+            print(
+                f"⚠️  Ningún modelo cabe en {choice['budget_s']:.0f}s; se usa el más rápido: "
+                f"{choice['model']} (beam {choice['beam_size']}, ETA {choice['eta_s']:.0f}s)",
+                flush=True,
+            )
+        events.model_selection(choice)
+
+        with self.perf.stage("load_model") as stage:
+            stage["model"] = WHISPER_MODEL
+            stage["cpu_threads"] = CPU_THREADS
+            stage["compute_type"] = COMPUTE_TYPE
+            stage["num_workers"] = NUM_WORKERS
+            return self.load_whisper_model()
+
+    def _record_speed_history(self, timings):
+        """Guarda la velocidad real de cada pista en el historial del host (para --deadline)."""
+        for audio_seconds, wall_seconds in timings:
+            try:
+                model_selection.record_speed(
+                    self.whisper_model_name or WHISPER_MODEL,
+                    audio_seconds,
+                    wall_seconds,
+                    CPU_THREADS,
+                    self._beam_size(),
+                    COMPUTE_TYPE,
+                )
+            except Exception as e:
+                print(f"⚠️  No se pudo guardar el historial de velocidad: {e}", flush=True)
+
+    def _transcribe_track(
+        self, wav_path, beam_size, on_progress=None, on_segment=None, model=None, vad=True
+    ):
+        """Transcribe una pista (ruta o array a 16 kHz) y devuelve {text, segments, words}.
+        on_progress recibe la fracción procesada (0-1) tras cada segmento y
+        on_segment la lista de segmentos acumulados hasta el momento."""
+        options = dict(
+            word_timestamps=True,
+            language=TRANSCRIPTION_LANGUAGE,
+            no_speech_threshold=0.7,
+            condition_on_previous_text=False,
+            beam_size=beam_size,
+        )
+        if vad:
+            options.update(vad_filter=True, vad_parameters=dict(min_silence_duration_ms=500))
+        segments, info = self._transcribe_with_fallback(wav_path, model=model, **options)
+
+        track_segments = []
+        track_words = []
+        for segment in segments:
+            track_segments.append(
+                {
+                    "start": segment.start,
+                    "end": segment.end,
+                    "text": segment.text,
+                    "avg_logprob": segment.avg_logprob,
+                    "compression_ratio": segment.compression_ratio,
+                    "no_speech_prob": segment.no_speech_prob,
+                }
+            )
+            if segment.words:
+                track_words.extend(Word(w.start, w.end, w.word) for w in segment.words)
+
+            if on_progress and info.duration > 0:
+                on_progress(segment.end / info.duration)
+            if on_segment:
+                on_segment(track_segments)
+
+        return {
+            "text": " ".join(s["text"] for s in track_segments),
+            "segments": track_segments,
+            "words": track_words,
+        }
+
+    def _redecode_engine(self):
+        """Modelo para la segunda pasada: --redecode_model (cargado bajo demanda) o el actual."""
+        if not self.redecode_model or self.redecode_model == self.whisper_model_name:
+            return self.whisper_model
+        with self._redecode_lock:
+            if self._redecode_whisper is None:
+                print(f"🤖 Cargando modelo de re-decodificación '{self.redecode_model}'...", flush=True)
+                self._redecode_whisper = WhisperModel(
+                    self.redecode_model,
+                    device="cpu",
+                    compute_type=COMPUTE_TYPE,
+                    cpu_threads=CPU_THREADS,
+                )
+            return self._redecode_whisper
+
+    def _redecode_weak_segments(self, key, label, audio, result):
+        """Vuelve a decodificar con más beam (o modelo mayor) solo los segmentos dudosos."""
+        with self.perf.stage(f"redecode_{key}") as stage:
+            result, stats = redecode.redecode_track(
+                result,
+                audio,
+                lambda samples: self._transcribe_track(
+                    samples, self.redecode_beam, model=self._redecode_engine(), vad=False
+                ),
+            )
+            stage.update(stats)
+            stage["audio_seconds"] = stats["redecoded_s"]
+        if stats["weak"]:
+            print(
+                f"🔁 Re-decodificados {stats['windows']} tramos dudosos de {label} "
+                f"({stats['weak']}/{stats['segments']} segmentos, {stats['redecoded_s']:.0f}s); "
+                f"{stats['replaced']} mejorados",
+                flush=True,
+            )
+        return result
+
+    def transcribe_audio_files(
+        self,
+        lag_seconds=0,
+        mic_exists=True,
+        sys_exists=True,
+        progress_range=(20, 95),
+        on_segment=None,
+        keep_temp_files=False,
+        redecode_weak=None,
+    ):
+        """Transcribir archivos de audio usando Whisper con parámetros avanzados.
+
+        on_segment(pista, segmentos) recibe los segmentos parciales de cada pista;
+        con keep_temp_files los WAV temporales se reutilizan en otra pasada."""
+        if redecode_weak is None:
+            redecode_weak = self.redecode_weak
         print("\n🎙️ TRANSCRIBIENDO ARCHIVOS DE AUDIO")
         print("=" * 50)
 
@@ -570,143 +914,154 @@ class AudioSyncAnalyzer:
         )
 
         try:
-            if mic_exists and self.mic_audio is not None:
-                self.mic_audio.export(temp_mic_wav, format="wav")
-
-            if sys_exists and self.system_audio is not None:
-                self.system_audio.export(temp_sys_wav, format="wav")
-
-            # Configurar beam size dinámicamente según el modelo
-            dynamic_beam_size = (
-                5
-                if WHISPER_MODEL in ["tiny", "base"]
-                else (2 if WHISPER_MODEL == "small" else 1)
-            )
-
-            # Transcribir micrófono
-            mic_result = None
-            if mic_exists and temp_mic_wav and self.whisper_model:
-                print("🎤 Transcribiendo audio de micrófono...", flush=True)
-                segments, info = self._transcribe_with_fallback(
-                    temp_mic_wav,
-                    word_timestamps=True,
-                    language=TRANSCRIPTION_LANGUAGE,
-                    no_speech_threshold=0.7,
-                    condition_on_previous_text=False,
-                    beam_size=dynamic_beam_size,
-                    vad_filter=True,
-                    vad_parameters=dict(min_silence_duration_ms=500),
+            with self.perf.stage(
+                "export_wav", audio_seconds=self._audio_seconds(mic_exists, sys_exists)
+            ):
+                if self.mixed_audio is not None:
+                    if "mix" not in self._temp_wavs:
+                        temp_mix_wav = os.path.join(self.output_dir, "temp_mix.wav")
+                        self.mixed_audio.export(temp_mix_wav, format="wav")
+                        self._temp_wavs["mix"] = temp_mix_wav
+                elif mic_exists and self.mic_audio is not None and "mic" not in self._temp_wavs:
+                    self.mic_audio.export(temp_mic_wav, format="wav")
+                    self._temp_wavs["mic"] = temp_mic_wav
+
+                if (
+                    self.mixed_audio is None
+                    and sys_exists
+                    and self.system_audio is not None
+                    and "system" not in self._temp_wavs
+                ):
+                    self.system_audio.export(temp_sys_wav, format="wav")
+                    self._temp_wavs["system"] = temp_sys_wav
+
+            dynamic_beam_size = self._beam_size()
+
+            # (clave, etiqueta, wav, audio, emoji, rango de progreso)
+            low, high = progress_range
+            mid = (low + high) // 2
+            tracks = []
+            if self.mixed_audio is not None and self.whisper_model:
+                # Una sola pasada sobre la mezcla; el resultado se reparte después por energía
+                tracks.append(
+                    ("mix", "mezcla", self._temp_wavs["mix"], self.mixed_audio, "🎧", (low, high))
+                )
+                if on_segment:
+                    split_on_segment = on_segment
+                    # Solo se reparten los segmentos nuevos; cada pista acumula los suyos
+                    split_segments = {"mic": [], "system": []}
+                    split_done = [0]
+
+                    def on_segment(key, segments):
+                        new_segments = segments[split_done[0]:]
+                        split_done[0] = len(segments)
+                        parts = self._split_mixed_result({"segments": list(new_segments)})
+                        for part_key, part in parts.items():
+                            if part["segments"]:
+                                split_segments[part_key].extend(part["segments"])
+                                split_on_segment(part_key, split_segments[part_key])
+
+            elif mic_exists and temp_mic_wav and self.whisper_model:
+                tracks.append(
+                    ("mic", "micrófono", temp_mic_wav, self.mic_audio, "🎤",
+                     (low, mid) if sys_exists else (low, high))
+                )
+            if sys_exists and temp_sys_wav and self.whisper_model and self.mixed_audio is None:
+                tracks.append(
+                    ("system", "sistema", temp_sys_wav, self.system_audio, "🔊",
+                     (mid, high) if mic_exists else (low, high))
                 )
 
-                mic_segments = []
-                mic_words = []
-                base_progress = 10
-                progress_weight = 45 if sys_exists else 85
-
-                for segment in segments:
-                    mic_segments.append(
-                        {
-                            "start": segment.start,
-                            "end": segment.end,
-                            "text": segment.text,
-                        }
+            timings = []
+
+            def run_track(track, on_progress):
+                key, label, wav_path, audio, emoji, _ = track
+                print(f"{emoji} Transcribiendo audio de {label}...", flush=True)
+
+                def segment_callback(segments):
+                    # Con --events el último segmento se envía a la UI como resultado parcial
+                    events.partial_result(key, segments[-1:])
+                    if on_segment:
+                        on_segment(key, segments)
+
+                started = time.perf_counter()
+                with self.perf.stage(
+                    f"transcribe_{key}", audio_seconds=len(audio) / 1000
+                ) as stage:
+                    stage["model"] = self.whisper_model_name
+                    stage["beam_size"] = dynamic_beam_size
+                    result = self._transcribe_track(
+                        wav_path,
+                        dynamic_beam_size,
+                        on_progress,
+                        segment_callback,
                     )
-                    if segment.words:
-                        for word in segment.words:
-                            mic_words.append(
-                                {
-                                    "start": word.start,
-                                    "end": word.end,
-                                    "text": word.word,
-                                }
-                            )
-
-                    if info.duration > 0:
-                        current_progress = int(
-                            base_progress
-                            + (segment.end / info.duration) * progress_weight
-                        )
-                        print(
-                            f"PROGRESS:{min(95 if not sys_exists else 55, current_progress)}",
-                            flush=True,
-                        )
-
-                mic_result = {
-                    "text": " ".join(s["text"] for s in mic_segments),
-                    "segments": mic_segments,
-                    "words": mic_words,
-                }
+                timings.append((len(audio) / 1000, time.perf_counter() - started))
+                if redecode_weak and result["segments"]:
+                    result = self._redecode_weak_segments(key, label, audio, result)
                 print(
-                    f"🎤 Segmentos: {len(mic_segments)} | Palabras: {len(mic_words)} (micrófono)",
+                    f"{emoji} Segmentos: {len(result['segments'])} | Palabras: {len(result['words'])} ({label})",
                     flush=True,
                 )
+                return key, result
+
+            results = {}
+            if NUM_WORKERS > 1 and len(tracks) > 1:
+                # El perfil del host indica varios workers: ambas pistas en paralelo.
+                # El progreso combina las dos fracciones ponderadas por duración.
+                from concurrent.futures import ThreadPoolExecutor
+
+                total_ms = sum(len(t[3]) for t in tracks)
+                fractions = {t[0]: 0.0 for t in tracks}
+                last_reported = [low]
+                lock = threading.Lock()
+
+                def progress_for(track):
+                    def on_progress(fraction):
+                        with lock:
+                            fractions[track[0]] = fraction
+                            done = sum(
+                                fractions[t[0]] * len(t[3]) for t in tracks
+                            ) / total_ms
+                            current = min(high, int(low + done * (high - low)))
+                            if current > last_reported[0]:
+                                last_reported[0] = current
+                                events.progress(current)
+
+                    return on_progress
+
+                with ThreadPoolExecutor(max_workers=len(tracks)) as pool:
+                    futures = [
+                        pool.submit(run_track, t, progress_for(t)) for t in tracks
+                    ]
+                    for future in futures:
+                        key, result = future.result()
+                        results[key] = result
+            else:
+                for track in tracks:
+                    low, high = track[5]
 
-            if mic_exists:
-                print(f"PROGRESS:{55 if sys_exists else 95}", flush=True)
-
-            # Transcribir sistema
-            sys_result = None
-            if sys_exists and temp_sys_wav and self.whisper_model:
-                print("🔊 Transcribiendo audio de sistema...", flush=True)
-                segments, info = self._transcribe_with_fallback(
-                    temp_sys_wav,
-                    word_timestamps=True,
-                    language=TRANSCRIPTION_LANGUAGE,
-                    no_speech_threshold=0.7,
-                    condition_on_previous_text=False,
-                    beam_size=dynamic_beam_size,
-                    vad_filter=True,
-                    vad_parameters=dict(min_silence_duration_ms=500),
-                )
+                    def on_progress(fraction, low=low, high=high):
+                        events.progress(min(high, int(low + fraction * (high - low))))
 
-                sys_segments = []
-                sys_words = []
-                base_progress = 55 if mic_exists else 10
-                progress_weight = 40 if mic_exists else 85
-
-                for segment in segments:
-                    sys_segments.append(
-                        {
-                            "start": segment.start,
-                            "end": segment.end,
-                            "text": segment.text,
-                        }
-                    )
-                    if segment.words:
-                        for word in segment.words:
-                            sys_words.append(
-                                {
-                                    "start": word.start,
-                                    "end": word.end,
-                                    "text": word.word,
-                                }
-                            )
-
-                    if info.duration > 0:
-                        current_progress = int(
-                            base_progress
-                            + (segment.end / info.duration) * progress_weight
-                        )
-                        print(f"PROGRESS:{min(95, current_progress)}", flush=True)
-
-                sys_result = {
-                    "text": " ".join(s["text"] for s in sys_segments),
-                    "segments": sys_segments,
-                    "words": sys_words,
-                }
+                    key, result = run_track(track, on_progress)
+                    results[key] = result
+                    events.progress(high)
+
+            if "mix" in results:
+                results = self._split_mixed_result(results["mix"])
                 print(
-                    f"🔊 Segmentos: {len(sys_segments)} | Palabras: {len(sys_words)} (sistema)",
+                    f"🎧 Mezcla repartida: {len(results['mic']['segments'])} segmentos del usuario, "
+                    f"{len(results['system']['segments'])} del sistema",
                     flush=True,
                 )
-
-            if sys_exists:
-                print("PROGRESS:95", flush=True)
+            mic_result = results.get("mic")
+            sys_result = results.get("system")
+            self._record_speed_history(timings)
 
             # Limpiar archivos temporales
-            if temp_mic_wav and os.path.exists(temp_mic_wav):
-                os.remove(temp_mic_wav)
-            if temp_sys_wav and os.path.exists(temp_sys_wav):
-                os.remove(temp_sys_wav)
+            if not keep_temp_files:
+                self._remove_temp_wavs()
 
             print("✅ Transcripción completada")
 
@@ -718,9 +1073,74 @@ class AudioSyncAnalyzer:
             err_msg = traceback.format_exc()
             sys.stderr.write(f"TRANSCRIPTION_ERROR: {e}\n{err_msg}\n")
             sys.stderr.flush()
+            events.error(e, fatal=False)
             print(f"❌ Error en transcripción: {e}", flush=True)
             return None, None
 
+    def _remove_temp_wavs(self):
+        for wav_path in self._temp_wavs.values():
+            if os.path.exists(wav_path):
+                os.remove(wav_path)
+        self._temp_wavs = {}
+
+    def _transcribe_two_pass(self, lag_seconds, mic_exists, sys_exists, auto_model):
+        """Borrador completo con --draft_model y refinado progresivo con el modelo final.
+        Devuelve (mic_result, sys_result, calidad)."""
+        if not self._await_model_load():
+            return None, None, None
+
+        draft_mic, draft_sys = self.transcribe_audio_files(
+            lag_seconds,
+            mic_exists,
+            sys_exists,
+            progress_range=(20, 45),
+            keep_temp_files=True,
+            redecode_weak=False,
+        )
+        drafts = two_pass.tag_results({"mic": draft_mic, "system": draft_sys}, two_pass.DRAFT)
+
+        def write(results, quality):
+            self.combine_transcriptions(
+                results["mic"],
+                results["system"],
+                mic_exists=mic_exists,
+                sys_exists=sys_exists,
+                lag_seconds=lag_seconds,
+                quality=quality,
+            )
+
+        if draft_mic or draft_sys:
+            with self.perf.stage("write_draft"):
+                write(drafts, two_pass.DRAFT)
+            elapsed = time.perf_counter() - self._started_at
+            print(f"📝 Borrador listo en {elapsed:.1f}s ({self.draft_model}); refinando...", flush=True)
+            events.draft_ready(self.draft_model, round(elapsed, 2))
+
+        # Liberar el modelo del borrador antes de cargar el definitivo
+        self.whisper_model = None
+        if auto_model:
+            loaded = self._select_and_load_model(mic_exists, sys_exists)
+        else:
+            with self.perf.stage("load_model") as stage:
+                stage["model"] = WHISPER_MODEL
+                loaded = self.load_whisper_model()
+        if not loaded:
+            print("⚠️  No se pudo cargar el modelo final: se conserva el borrador.", flush=True)
+            self._remove_temp_wavs()
+            return drafts["mic"], drafts["system"], two_pass.DRAFT
+
+        writer = two_pass.RefinementWriter(drafts, lambda results: write(results, two_pass.REFINING))
+        mic_result, sys_result = self.transcribe_audio_files(
+            lag_seconds, mic_exists, sys_exists, progress_range=(45, 95), on_segment=writer.on_segment
+        )
+        self._remove_temp_wavs()
+        if not mic_result and not sys_result:
+            print("⚠️  El refinado falló: se conserva el borrador.", flush=True)
+            return drafts["mic"], drafts["system"], two_pass.DRAFT
+
+        refined = two_pass.tag_results({"mic": mic_result, "system": sys_result}, two_pass.REFINED)
+        return refined["mic"], refined["system"], two_pass.REFINED
+
     def merge_close_segments(self, segments, min_gap_seconds=1.2):
         """Unir segmentos que estén muy cerca temporalmente para crear bloques más grandes"""
         if not segments:
@@ -739,9 +1159,16 @@ class AudioSyncAnalyzer:
         return merged
 
     def combine_transcriptions(
-        self, mic_result, sys_result, mic_exists=True, sys_exists=True, lag_seconds=0
+        self,
+        mic_result,
+        sys_result,
+        mic_exists=True,
+        sys_exists=True,
+        lag_seconds=0,
+        quality=None,
     ):
-        """Combinar las transcripciones basadas en segmentos con una regla de unión de 3 segundos"""
+        """Combinar las transcripciones basadas en segmentos con una regla de unión de
+        `merge_gap` segundos (3 por defecto)"""
         print("\n📝 COMBINANDO TRANSCRIPCIONES (Nivel: Segmento)")
         print(f"   (Sincronización de lag: {lag_seconds:.3f}s)")
         print("=" * 50)
@@ -752,9 +1179,12 @@ class AudioSyncAnalyzer:
 
         all_segments_raw = []
 
-        # Cargar diarización si existe
-        external_diarization = None
-        if self.diarization_file and os.path.exists(self.diarization_file):
+        # Cargar diarización si existe (una sola vez: en dos pasadas se combina varias veces)
+        if (
+            self._diarization_index is None
+            and self.diarization_file
+            and os.path.exists(self.diarization_file)
+        ):
             try:
                 with open(self.diarization_file, "r", encoding="utf-8") as f:
                     raw = json.load(f)
@@ -767,8 +1197,11 @@ class AudioSyncAnalyzer:
                     external_diarization = raw
                 else:
                     external_diarization = None
+                if external_diarization:
+                    self._diarization_index = DiarizationIndex(external_diarization)
             except Exception:
                 pass
+        diarization = self._diarization_index
 
         # 1. Recolectar segmentos del micrófono
         if mic_exists and mic_result:
@@ -778,90 +1211,103 @@ class AudioSyncAnalyzer:
 
                 # El lag detectado es (tiempo_en_mic - tiempo_en_sys).
                 # Para volver a la referencia del sistema: T_sys = T_mic - lag.
+                # Con --mix_mode los segmentos del usuario llegan aquí en tiempo de
+                # micrófono (_split_mixed_result deshace el desplazamiento de la
+                # mezcla), así que la corrección se aplica una sola vez, igual que
+                # con pistas separadas.
                 # Aplicamos también el BIAS de latencia de hardware detectado automáticamente.
                 hw_bias = getattr(self, "hardware_bias", 0.0)
                 start_aligned = s["start"] - current_lag + hw_bias
                 end_aligned = s["end"] - current_lag + hw_bias
 
                 all_segments_raw.append(
-                    {
-                        "start": max(0, start_aligned),
-                        "end": max(0, end_aligned),
-                        "text": s["text"].strip(),
-                        "speaker": "USUARIO",
-                        "emoji": "🎤",
-                        "source": "micrófono",
-                    }
+                    Turn(
+                        max(0, start_aligned),
+                        max(0, end_aligned),
+                        s["text"].strip(),
+                        "USUARIO",
+                        "🎤",
+                        "micrófono",
+                        s.get("quality"),
+                    )
                 )
 
         # 2. Recolectar segmentos del sistema
         if sys_exists and sys_result:
             for s in sys_result.get("segments", []):
                 speaker = "SISTEMA"
-                if external_diarization:
-                    # Encontrar el segmento de diarización más cercano por midpoint.
+                if diarization:
+                    # Segmento de diarización más cercano por midpoint.
                     # Usamos distancia de midpoint en lugar de contención estricta
                     # para evitar que segmentos de Whisper en bordes o huecos de la
                     # diarización se queden con el label fantasma "SISTEMA".
-                    mid = (s["start"] + s["end"]) / 2
-                    closest = None
-                    closest_dist = float('inf')
-                    for d in external_diarization:
-                        d_mid = (d["start"] + d["end"]) / 2
-                        dist = abs(mid - d_mid)
-                        if dist < closest_dist:
-                            closest_dist = dist
-                            closest = d
-                    if closest:
-                        speaker = closest["speaker"]
+                    speaker = diarization.speaker_at((s["start"] + s["end"]) / 2, speaker)
 
                 all_segments_raw.append(
-                    {
-                        "start": s["start"],
-                        "end": s["end"],
-                        "text": s["text"].strip(),
-                        "speaker": speaker,
-                        "emoji": "🔊",
-                        "source": "sistema",
-                    }
+                    Turn(
+                        s["start"],
+                        s["end"],
+                        s["text"].strip(),
+                        speaker,
+                        "🔊",
+                        "sistema",
+                        s.get("quality"),
+                    )
                 )
 
         # 3. Ordenar cronológicamente
-        all_segments_raw.sort(key=lambda x: x["start"])
-
-        # 4. Unir segmentos del mismo hablante con el umbral de 3 segundos
-        combined_turns = []
-        if all_segments_raw:
-            current_turn = all_segments_raw[0].copy()
-
-            for next_seg in all_segments_raw[1:]:
-                gap = next_seg["start"] - current_turn["end"]
-
-                # REGLA: Unir si es el mismo speaker Y la pausa es < 3.0 segundos
-                if next_seg["speaker"] == current_turn["speaker"] and gap < 3.0:
-                    current_turn["end"] = next_seg["end"]
-                    # Añadir espacio si el texto no termina en uno
-                    if not current_turn["text"].endswith(" "):
-                        current_turn["text"] += " "
-                    current_turn["text"] += next_seg["text"]
-                else:
-                    # Cambio de speaker o pausa larga (> 3s) -> Nuevo bloque
-                    combined_turns.append(current_turn)
-                    current_turn = next_seg.copy()
+        all_segments_raw.sort(key=lambda x: x.start)
 
-            combined_turns.append(current_turn)
+        # 4. Unir segmentos del mismo hablante con el umbral de merge_gap segundos
+        # (en dos pasadas, sin mezclar turnos de borrador y refinados).
+        # El texto de cada turno se une una sola vez al pasar a dict.
+        combined_turns = merge_turns(all_segments_raw, max_gap=self.merge_gap)
 
         # Guardar resultados
-        self._save_combined_results(combined_turns, mic_exists, sys_exists)
+        self._save_combined_results(combined_turns, mic_exists, sys_exists, quality)
+
+    def sync_params(self, lag_seconds=0):
+        """Parámetros de sincronización que usa combine_transcriptions (para --recombine)."""
+        params = {
+            "base_lag": getattr(self, "base_lag", None),
+            "drift_slope": getattr(self, "drift_slope", None),
+            "hardware_bias": getattr(self, "hardware_bias", None),
+            "lag_seconds": lag_seconds,
+        }
+        return {k: (float(v) if v is not None else None) for k, v in params.items()}
+
+    def apply_sync_params(self, params):
+        for name in ("base_lag", "drift_slope", "hardware_bias"):
+            if params.get(name) is not None:
+                setattr(self, name, params[name])
+
+    def save_raw_results(self, mic_result, sys_result, mic_exists, sys_exists, lag_seconds, quality=None):
+        """Persiste los resultados crudos de Whisper para poder recombinar sin transcribir."""
+        try:
+            path = raw_results.save(
+                self.output_dir,
+                mic_result,
+                sys_result,
+                self.sync_params(lag_seconds),
+                mic_exists,
+                sys_exists,
+                quality=quality,
+                model=self.whisper_model_name,
+                diarization_file=self.diarization_file,
+            )
+            print(f"💾 Resultados crudos de Whisper guardados en: {path}", flush=True)
+        except Exception as e:
+            print(f"⚠️  No se pudieron guardar los resultados crudos: {e}", flush=True)
 
-    def _save_combined_results(self, all_segments, mic_exists, sys_exists):
-        """Guardar los resultados combinados en TXT y JSON"""
+    def _save_combined_results(self, all_segments, mic_exists, sys_exists, quality=None):
+        """Guardar los resultados combinados en TXT y JSON.
+        Se escriben de forma atómica: en dos pasadas la app puede leerlos a mitad del refinado."""
         # Calcular estadísticas de interlocutores
         speakers = set(s["speaker"] for s in all_segments)
 
         # Guardar TXT
         output_file = os.path.join(self.output_dir, "transcripcion_combinada.txt")
-        with open(output_file, "w", encoding="utf-8") as f:
+        with open(output_file + ".tmp", "w", encoding="utf-8") as f:
             f.write("TRANSCRIPCIÓN DE AUDIO (CHAT-MODE)\n")
             f.write("=" * 60 + "\n\n")
             f.write(f"👥 Interlocutores detectados: {len(speakers)}\n")
@@ -875,26 +1321,28 @@ class AudioSyncAnalyzer:
                     f"[{start_time} - {end_time}] {segment['emoji']} {segment['speaker']}:\n"
                 )
                 f.write(f"   {segment['text']}\n\n")
+        os.replace(output_file + ".tmp", output_file)
 
         # Guardar JSON
+        metadata = {
+            "total_segments": len(all_segments),
+            "detected_speakers": len(speakers),
+            "total_duration": max([s["end"] for s in all_segments])
+            if all_segments
+            else 0,
+            "mode": "granular_words",
+        }
+        if quality:
+            metadata["quality"] = quality
         json_file = os.path.join(self.output_dir, "transcripcion_combinada.json")
-        with open(json_file, "w", encoding="utf-8") as f:
+        with open(json_file + ".tmp", "w", encoding="utf-8") as f:
             json.dump(
-                {
-                    "metadata": {
-                        "total_segments": len(all_segments),
-                        "detected_speakers": len(speakers),
-                        "total_duration": max([s["end"] for s in all_segments])
-                        if all_segments
-                        else 0,
-                        "mode": "granular_words",
-                    },
-                    "segments": all_segments,
-                },
+                {"metadata": metadata, "segments": all_segments},
                 f,
                 ensure_ascii=False,
                 indent=2,
             )
+        os.replace(json_file + ".tmp", json_file)
 
         print(f"✅ Transcripción guardada: {len(all_segments)} turnos de palabra.")
 
@@ -976,9 +1424,31 @@ class AudioSyncAnalyzer:
 
         print(f"✅ Visualización guardada en: {output_file}")
 
+    def _audio_seconds(self, mic_exists=True, sys_exists=True):
+        """Segundos de audio cargados en las pistas activas (para el RTF de cada etapa)."""
+        total = 0.0
+        if mic_exists and self.mic_audio is not None:
+            total += len(self.mic_audio) / 1000
+        if sys_exists and self.system_audio is not None:
+            total += len(self.system_audio) / 1000
+        return total
+
     def run_full_analysis(self):
         """Ejecutar análisis completo incluyendo transcripción"""
-        print("PROGRESS:0", flush=True)
+        try:
+            return self._run_full_analysis()
+        finally:
+            # Cualquier salida temprana (pistas vacías o en silencio) descarta la carga pendiente
+            self._cancel_model_load()
+            if self.diarizer is not None:
+                self.diarizer.cancel()
+            metrics_file = self.perf.write()
+            if metrics_file:
+                print(f"⏱️  Métricas de rendimiento guardadas en: {metrics_file}")
+
+    def _run_full_analysis(self):
+        self._started_at = time.perf_counter()
+        events.progress(0)
         print("🚀 INICIANDO ANÁLISIS COMPLETO DE AUDIO DUAL")
         print("=" * 60)
 
@@ -1001,15 +1471,38 @@ class AudioSyncAnalyzer:
                 f"⚠️  Advertencia: No se encuentra archivo de sistema: {self.system_file}."
             )
 
-        # Cargar modelo Whisper
-        if not self.load_whisper_model():
+        # Preflight: metadatos + ventanas muestreadas; solo las pistas útiles se decodifican
+        with self.perf.stage("preflight") as stage:
+            mic_exists, sys_exists = self.preflight_tracks(mic_exists, sys_exists)
+            stage["tracks"] = {k: r["status"] for k, r in self.preflight.items()}
+            stage["probe_windows"] = sum(r["windows"] for r in self.preflight.values())
+
+        if not mic_exists and not sys_exists:
+            print("❌ Ninguna pista es utilizable (vacías o en silencio).", flush=True)
             return False
 
-        print("PROGRESS:5", flush=True)
+        # Cargar modelo Whisper en segundo plano mientras se decodifica (en modo
+        # plazo se elige tras conocer la duración; en dos pasadas se carga primero
+        # el del borrador). Se espera justo antes de transcribir.
+        auto_model = bool(self.deadline or self.target_rtf)
+        if self.draft_model:
+            self._start_model_load(self.draft_model, "load_draft_model")
+        elif not auto_model:
+            self._start_model_load(WHISPER_MODEL)
+        if self.diarizer is not None:
+            if sys_exists:
+                self.diarizer.start()
+            else:
+                print("⚠️  Sin pista de sistema útil: se omite la diarización.", flush=True)
+                self.diarizer = None
+
+        events.progress(5)
 
         # Ejecutar pasos del análisis
-        if not self.load_audio_files(mic_exists=mic_exists, sys_exists=sys_exists):
-            return False
+        with self.perf.stage("decode") as stage:
+            if not self.load_audio_files(mic_exists=mic_exists, sys_exists=sys_exists):
+                return False
+            stage["audio_seconds"] = self._audio_seconds()
 
         mic_exists = self.mic_audio is not None
         sys_exists = self.system_audio is not None
@@ -1018,12 +1511,15 @@ class AudioSyncAnalyzer:
             print("❌ No quedó ninguna pista válida tras la carga inicial.", flush=True)
             return False
 
-        print("PROGRESS:10", flush=True)
+        events.progress(10)
 
-        if not self.convert_to_numpy(mic_exists=mic_exists, sys_exists=sys_exists):
-            return False
+        audio_seconds = self._audio_seconds(mic_exists, sys_exists)
+        with self.perf.stage("resample", audio_seconds=audio_seconds):
+            if not self.convert_to_numpy(mic_exists=mic_exists, sys_exists=sys_exists):
+                return False
 
-        self.analyze_audio_properties(mic_exists=mic_exists, sys_exists=sys_exists)
+        with self.perf.stage("analyze_properties", audio_seconds=audio_seconds):
+            self.analyze_audio_properties(mic_exists=mic_exists, sys_exists=sys_exists)
 
         if sys_exists and self._is_silent_track("system"):
             print(
@@ -1043,47 +1539,149 @@ class AudioSyncAnalyzer:
             print("❌ Ambas pistas están en silencio o sin señal útil.", flush=True)
             return False
 
-        lag_seconds = 0
-        if mic_exists and sys_exists:
-            lag_seconds = self.detect_cross_correlation(mic_exists=mic_exists)
+        audio_seconds = self._audio_seconds(mic_exists, sys_exists)
+        events.progress(15)
+
+        # A partir de aquí las etapas forman un grafo de dependencias: la
+        # sincronización, los informes y la visualización corren en paralelo con
+        # la transcripción; solo la combinación final necesita el lag.
+        diarize = self.diarizer is not None and sys_exists
+        if self.diarizer is not None and not diarize:
+            self.diarizer.cancel()
+        graph = StageGraph(self.perf, max_workers=DEFAULT_WORKERS + (1 if diarize else 0))
+        both_tracks = mic_exists and sys_exists
+        use_mix_stage = self.mix_mode != "off" and both_tracks
+
+        def lag():
+            return graph.results.get("cross_correlation") or 0
+
+        def model_ready(stage):
+            if self.draft_model:
+                return True  # las dos pasadas cargan sus modelos por su cuenta
+            if auto_model:
+                return self._select_and_load_model(mic_exists, sys_exists)
+            return self._await_model_load()
+
+        def cross_correlation(stage):
+            return self.detect_cross_correlation(mic_exists=mic_exists)
+
+        def diarization(stage):
+            segments = self.diarizer.run(self.system_file)
+            stage["segments"] = len(segments) if segments else 0
+            if segments:
+                # combine_transcriptions usa el índice directamente; el archivo queda para --recombine
+                self._diarization_index = DiarizationIndex(segments)
+                self.diarization_file = self.diarizer.output_json
+            return segments
 
-        # Detectar latencia de hardware automática para compensar el "inicio lento" del micro
-        self.hardware_bias = self.detect_hardware_latency(
-            mic_exists=mic_exists, sys_exists=sys_exists
-        )
+        def hardware_latency(stage):
+            # Detectar latencia de hardware automática para compensar el "inicio lento" del micro
+            self.hardware_bias = self.detect_hardware_latency(
+                mic_exists=mic_exists, sys_exists=sys_exists
+            )
+            return self.hardware_bias
+
+        def mix_decision(stage):
+            activity, use_mix, mix_lag = self.prepare_mixed_track()
+            stage["user_activity"] = round(activity, 4)
+            stage["mixed"] = use_mix
+            stage["lag"] = round(mix_lag, 3)
+            return use_mix
+
+        def sync_chunks(stage):
+            return self.create_synchronized_chunks(
+                lag(), mic_exists=mic_exists, sys_exists=sys_exists
+            )
 
-        print("PROGRESS:15", flush=True)
+        def activity_report(stage):
+            self.generate_activity_report(graph.results["sync_chunks"], mic_exists=mic_exists)
 
-        chunks_info = self.create_synchronized_chunks(
-            lag_seconds, mic_exists=mic_exists, sys_exists=sys_exists
-        )
-        self.generate_activity_report(chunks_info, mic_exists=mic_exists)
-        self.create_waveform_visualization(mic_exists=mic_exists)
+        def waveform_visualization(stage):
+            self.create_waveform_visualization(mic_exists=mic_exists)
 
-        # Transcripción y combinación
-        print("PROGRESS:20", flush=True)
-        mic_result, sys_result = self.transcribe_audio_files(
-            lag_seconds, mic_exists=mic_exists, sys_exists=sys_exists
-        )
-
-        self.combine_transcriptions(
-            mic_result,
-            sys_result,
-            mic_exists=mic_exists,
-            sys_exists=sys_exists,
-            lag_seconds=lag_seconds,
+        def transcription(stage):
+            events.progress(20)
+            if self.draft_model:
+                return self._transcribe_two_pass(lag(), mic_exists, sys_exists, auto_model)
+            mic_result, sys_result = self.transcribe_audio_files(
+                lag(), mic_exists=mic_exists, sys_exists=sys_exists
+            )
+            return mic_result, sys_result, None
+
+        def combine_and_write(stage):
+            mic_result, sys_result, quality = graph.results["transcription"]
+            self.combine_transcriptions(
+                mic_result,
+                sys_result,
+                mic_exists=mic_exists,
+                sys_exists=sys_exists,
+                lag_seconds=lag(),
+                quality=quality,
+            )
+            if mic_result or sys_result:
+                self.save_raw_results(mic_result, sys_result, mic_exists, sys_exists, lag(), quality)
+
+        combine_deps = ["transcription"]
+        if diarize:
+            # Primera en registrarse: arranca en cuanto el grafo empieza
+            graph.add("diarization", diarization, audio_seconds=len(self.system_audio) / 1000)
+            combine_deps.append("diarization")
+        sync_stages = []
+        if both_tracks:
+            graph.add("cross_correlation", cross_correlation, audio_seconds=audio_seconds)
+            sync_stages.append("cross_correlation")
+        graph.add("hardware_latency", hardware_latency, audio_seconds=audio_seconds)
+        sync_stages.append("hardware_latency")
+        graph.add("model_ready", model_ready, required=True)
+        graph.add(
+            "sync_chunks",
+            sync_chunks,
+            deps=["cross_correlation"] if both_tracks else [],
+            audio_seconds=audio_seconds,
         )
+        graph.add("activity_report", activity_report, deps=["sync_chunks"])
+        graph.add("waveform_visualization", waveform_visualization)
+
+        transcription_deps = ["model_ready"]
+        if use_mix_stage:
+            graph.add("mix_decision", mix_decision, audio_seconds=audio_seconds)
+            transcription_deps.append("mix_decision")
+        if self.draft_model:
+            # El borrador se escribe ya combinado: necesita la sincronización
+            transcription_deps += sync_stages
+        graph.add("transcription", transcription, deps=transcription_deps, audio_seconds=audio_seconds)
+        graph.add("combine_and_write", combine_and_write, deps=combine_deps + sync_stages)
+
+        # Solo espera al grafo: el perfil es el de cada etapa
+        with self.perf.stage("stage_graph", audio_seconds=audio_seconds, profile=False) as stage:
+            completed = graph.run()
+            path = graph.critical_path()
+            stage["critical_path"] = [name for name, _ in path]
+            stage["serial_s"] = round(graph.busy_seconds(), 3)
+        if path:
+            print(
+                f"🧭 Ruta crítica ({graph.wall_seconds():.1f}s; en serie serían "
+                f"{graph.busy_seconds():.1f}s): "
+                + " → ".join(f"{name} {seconds:.1f}s" for name, seconds in path),
+                flush=True,
+            )
+        if not completed:
+            print(f"❌ Análisis interrumpido en la etapa '{graph.aborted_by}'", flush=True)
+            return False
 
         print(f"\n🎉 ANÁLISIS COMPLETADO")
         print(f"📁 Archivos de salida en: {self.output_dir}")
-        print("PROGRESS:100", flush=True)
+        events.progress(100)
         return True
 
 
 def parse_args():
     parser = argparse.ArgumentParser(description="Audio Sync Analyzer")
     parser.add_argument(
-        "--basename", type=str, required=True, help="Nombre base de la grabación"
+        "--basename",
+        type=str,
+        default=None,
+        help="Nombre base de la grabación (obligatorio salvo con --tune y --tune_clip)",
     )
     parser.add_argument(
         "--model",
@@ -1099,7 +1697,115 @@ def parse_args():
     )
     parser.add_argument("--base_dir", type=str, help="Directorio base de grabaciones")
     parser.add_argument(
-        "--threads", type=int, default=4, help="Hilos de CPU a utilizar"
+        "--threads",
+        type=int,
+        default=None,
+        help="Hilos de CPU a utilizar (por defecto: perfil del host o 4)",
+    )
+    parser.add_argument(
+        "--compute_type",
+        type=str,
+        default=None,
+        help="compute_type de Whisper (por defecto: perfil del host o int8)",
+    )
+    parser.add_argument(
+        "--num_workers",
+        type=int,
+        default=None,
+        help="Workers de Whisper; con 2+ se transcriben ambas pistas en paralelo",
+    )
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=None,
+        help="Plazo en segundos: elige el mayor modelo/beam que termine a tiempo (ignora --model)",
+    )
+    parser.add_argument(
+        "--target_rtf",
+        type=float,
+        default=None,
+        help="Como --deadline, expresado como fracción de la duración del audio (ej: 0.5)",
+    )
+    parser.add_argument(
+        "--max_model",
+        type=str,
+        default="large",
+        help="Modelo más grande permitido en modo --deadline/--target_rtf",
+    )
+    parser.add_argument(
+        "--draft_model",
+        type=str,
+        default=None,
+        help="Modelo rápido para un borrador inmediato (ej: tiny); después se refina con --model",
+    )
+    parser.add_argument(
+        "--redecode",
+        action="store_true",
+        help="Re-decodifica con más beam solo los segmentos de baja confianza",
+    )
+    parser.add_argument(
+        "--redecode_model",
+        type=str,
+        default=None,
+        help="Modelo para la re-decodificación (por defecto el mismo de la transcripción)",
+    )
+    parser.add_argument(
+        "--redecode_beam",
+        type=int,
+        default=5,
+        help="beam_size de la re-decodificación selectiva",
+    )
+    parser.add_argument(
+        "--mix_mode",
+        choices=["auto", "on", "off"],
+        default=MIX_MODE_DEFAULT,
+        help="Transcribir mic + sistema mezclados en una sola pasada (auto: si el usuario apenas habla)",
+    )
+    parser.add_argument(
+        "--merge_gap",
+        type=float,
+        default=MERGE_GAP_SECONDS,
+        help="Pausa máxima (s) entre segmentos del mismo hablante para unirlos en un turno",
+    )
+    parser.add_argument(
+        "--diarize",
+        action="store_true",
+        help="Diariza la pista de sistema en este mismo proceso, en paralelo con Whisper "
+        "(escribe --diarization_file o analysis/diarization.json)",
+    )
+    parser.add_argument(
+        "--hf_token", type=str, default=None, help="HuggingFace Access Token (para --diarize)"
+    )
+    parser.add_argument(
+        "--num_speakers", type=int, default=None, help="Número exacto de hablantes (para --diarize)"
+    )
+    parser.add_argument(
+        "--min_speakers", type=int, default=None, help="Mínimo de hablantes (para --diarize)"
+    )
+    parser.add_argument(
+        "--max_speakers", type=int, default=None, help="Máximo de hablantes (para --diarize)"
+    )
+    parser.add_argument(
+        "--recombine",
+        action="store_true",
+        help="Regenera transcripcion_combinada.* desde analysis/whisper_raw.json sin volver a transcribir",
+    )
+    parser.add_argument(
+        "--tune",
+        action="store_true",
+        help="Mide compute_type/hilos/workers para --model y guarda el más rápido en el perfil del host",
+    )
+    parser.add_argument(
+        "--tune_clip",
+        type=str,
+        default=None,
+        help="Clip de referencia para --tune (por defecto: la grabación de --basename)",
+    )
+    parser.add_argument(
+        "--tune_seconds",
+        type=float,
+        default=whisper_tuning.TUNE_CLIP_SECONDS,
+        help="Segundos del clip de referencia usados en --tune",
     )
     parser.add_argument(
         "--ffmpeg",
@@ -1119,12 +1825,24 @@ def parse_args():
         default=None,
         help="Ruta al archivo JSON de diarización externa",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Vuelca cProfile y tracemalloc por etapa en analysis/profile/",
+    )
+    parser.add_argument(
+        "--events",
+        action="store_true",
+        help="Emite eventos EVENT:{json} por stdout y los logs por stderr (ver events.py)",
+    )
     return parser.parse_args()
 
 
 def main():
     """Función principal"""
     args = parse_args()
+    if args.events:
+        events.enable()
 
     # Configurar ffmpeg y ffprobe bundled si se proporcionan las rutas
     if args.ffmpeg and os.path.isfile(args.ffmpeg):
@@ -1154,6 +1872,11 @@ def main():
     # Usar el directorio base proporcionado o el default
     base_dir = args.base_dir if args.base_dir else BASE_DIR
 
+    if not args.basename and not (args.tune and args.tune_clip):
+        sys.stderr.write("FATAL_ERROR: --basename es obligatorio\n")
+        events.error("--basename es obligatorio")
+        sys.exit(2)
+
     # Configurar modelo globalmente
     global WHISPER_MODEL
     WHISPER_MODEL = args.model
@@ -1162,16 +1885,105 @@ def main():
     global TRANSCRIPTION_LANGUAGE
     TRANSCRIPTION_LANGUAGE = args.language
 
-    global CPU_THREADS
-    CPU_THREADS = args.threads
+    mic_file, system_file = (
+        _find_recording_files(base_dir, args.basename)
+        if args.basename
+        else (None, None)
+    )
+
+    if args.tune:
+        run_tuning(args, mic_file, system_file)
+        return
+
+    if args.recombine:
+        run_recombine(args, mic_file, system_file, os.path.join(base_dir, args.basename, "analysis"))
+        return
+
+    # Configuración de Whisper: override explícito > perfil del host > defaults
+    global CPU_THREADS, COMPUTE_TYPE, NUM_WORKERS, WHISPER_OVERRIDES
+    WHISPER_OVERRIDES = {
+        "compute_type": args.compute_type,
+        "cpu_threads": args.threads,
+        "num_workers": args.num_workers,
+    }
+    whisper_config, config_source = whisper_tuning.resolve_whisper_config(
+        WHISPER_MODEL, **WHISPER_OVERRIDES
+    )
+    CPU_THREADS = whisper_config["cpu_threads"]
+    COMPUTE_TYPE = whisper_config["compute_type"]
+    NUM_WORKERS = whisper_config["num_workers"]
+
+    output_dir = os.path.join(base_dir, args.basename, "analysis")
+
+    diarizer = None
+    if args.diarize and not args.hf_token:
+        print("⚠️  --diarize requiere --hf_token: se transcribe sin diarización.")
+    elif args.diarize:
+        # Presupuesto de hilos compartido: --threads (o todos los núcleos) entre Whisper y torch
+        budget = int(args.threads) if args.threads else (os.cpu_count() or CPU_THREADS)
+        whisper_threads, torch_threads = inline_diarization.split_threads(budget)
+        CPU_THREADS = min(CPU_THREADS, whisper_threads)
+        WHISPER_OVERRIDES["cpu_threads"] = CPU_THREADS
+        diarizer = inline_diarization.InlineDiarizer(
+            args.hf_token,
+            args.diarization_file or os.path.join(output_dir, "diarization.json"),
+            torch_threads,
+            speaker_hints={
+                name: getattr(args, name)
+                for name in ("num_speakers", "min_speakers", "max_speakers")
+                if getattr(args, name) is not None
+            },
+        )
+
+    draft_model = args.draft_model
+    if draft_model and draft_model == WHISPER_MODEL and not (args.deadline or args.target_rtf):
+        print(f"⚠️  --draft_model igual a --model ({draft_model}): se hace una sola pasada.")
+        draft_model = None
 
+    model_label = (
+        f"auto (≤ {args.max_model})" if args.deadline or args.target_rtf else WHISPER_MODEL
+    )
     print(f"🎵 AUDIO SYNC ANALYZER & TRANSCRIBER")
     print(
-        f"Modelo: {WHISPER_MODEL} | Idioma: {TRANSCRIPTION_LANGUAGE} | Hilos: {CPU_THREADS} | Directorio: {base_dir}"
+        f"Modelo: {model_label} | Idioma: {TRANSCRIPTION_LANGUAGE} | Hilos: {CPU_THREADS} | "
+        f"Compute: {COMPUTE_TYPE} | Workers: {NUM_WORKERS} ({config_source}) | Directorio: {base_dir}"
     )
+    if draft_model:
+        print(f"Borrador: {draft_model} → refinado con {model_label}")
+    if diarizer:
+        print(f"Diarización en paralelo: {diarizer.torch_threads} hilos de torch")
     print("=" * 60)
 
-    basename = args.basename
+    analyzer = AudioSyncAnalyzer(
+        mic_file,
+        system_file,
+        output_dir,
+        diarization_file=None if diarizer else args.diarization_file,
+        profile=args.profile,
+        deadline=args.deadline,
+        target_rtf=args.target_rtf,
+        max_model=args.max_model,
+        draft_model=draft_model,
+        redecode_weak=args.redecode,
+        redecode_model=args.redecode_model,
+        redecode_beam=args.redecode_beam,
+        mix_mode=args.mix_mode,
+        merge_gap=args.merge_gap,
+        diarizer=diarizer,
+    )
+    success = analyzer.run_full_analysis()
+
+    if success:
+        print("\n✅ Análisis y transcripción completados exitosamente")
+        print(f"📋 Revisa los archivos en: {output_dir}")
+        print("📝 Archivo principal: transcripcion_combinada.txt")
+    else:
+        print("\n❌ Error durante el análisis")
+        events.error("Error durante el análisis", fatal=False)
+
+
+def _find_recording_files(base_dir, basename):
+    """Localiza las pistas de micrófono y sistema de una grabación (cualquier extensión soportada)."""
     import glob
 
     mic_pattern = os.path.join(base_dir, basename, f"{basename}-microphone.*")
@@ -1200,19 +2012,99 @@ def main():
         if sys_files
         else os.path.join(base_dir, basename, f"{basename}-system.webm")
     )
-    output_dir = os.path.join(base_dir, basename, "analysis")
+    return mic_file, system_file
+
 
+def run_recombine(args, mic_file, system_file, output_dir):
+    """Modo --recombine: rehace la transcripción combinada con los resultados crudos guardados.
+    Usa --diarization_file si se pasa (si no, la diarización del análisis original) y --merge_gap."""
+    try:
+        raw = raw_results.load(output_dir)
+    except FileNotFoundError:
+        sys.stderr.write(
+            f"FATAL_ERROR: no hay {raw_results.RAW_FILENAME} en {output_dir}; ejecuta antes el análisis completo\n"
+        )
+        events.error(f"no hay {raw_results.RAW_FILENAME}")
+        sys.exit(1)
+    except (ValueError, json.JSONDecodeError) as e:
+        # Archivo truncado, JSON inválido o versión no soportada
+        sys.stderr.write(f"FATAL_ERROR: no se pudo leer {raw_results.raw_path(output_dir)}: {e}\n")
+        events.error(f"{raw_results.RAW_FILENAME} no válido: {e}")
+        sys.exit(1)
+
+    diarization_file = args.diarization_file or raw.get("diarization_file")
+    if diarization_file and not os.path.exists(diarization_file):
+        print(f"⚠️  Diarización no encontrada: {diarization_file}; se recombina sin ella", flush=True)
+        diarization_file = None
+
+    print("♻️  RECOMBINANDO TRANSCRIPCIÓN (sin Whisper)")
+    print(
+        f"Modelo original: {raw.get('model') or '?'} | Unión de turnos: {args.merge_gap:.1f}s | "
+        f"Diarización: {diarization_file or 'no'}"
+    )
     analyzer = AudioSyncAnalyzer(
-        mic_file, system_file, output_dir, diarization_file=args.diarization_file
+        mic_file,
+        system_file,
+        output_dir,
+        diarization_file=diarization_file,
+        merge_gap=args.merge_gap,
     )
-    success = analyzer.run_full_analysis()
+    analyzer.perf = PerfRecorder("recombine", output_dir)
+    analyzer.apply_sync_params(raw["sync"])
+    with analyzer.perf.stage("recombine") as stage:
+        analyzer.combine_transcriptions(
+            raw["mic"],
+            raw["system"],
+            mic_exists=raw.get("mic_exists", True),
+            sys_exists=raw.get("sys_exists", True),
+            lag_seconds=raw["sync"].get("lag_seconds") or 0,
+            quality=raw.get("quality"),
+        )
+        stage["merge_gap"] = args.merge_gap
+        stage["diarization"] = bool(diarization_file)
+    analyzer.perf.write()
+    events.progress(100)
+
+
+def run_tuning(args, mic_file=None, system_file=None):
+    """Modo --tune: mide configuraciones de Whisper y guarda la más rápida en el perfil del host."""
+    clip_path = args.tune_clip
+    if not clip_path:
+        # Preferimos la pista de sistema: suele tener más voz que el micrófono
+        clip_path = next(
+            (f for f in (system_file, mic_file) if f and os.path.exists(f)), None
+        )
+    if not clip_path or not os.path.exists(clip_path):
+        sys.stderr.write("FATAL_ERROR: no hay clip de referencia para --tune\n")
+        events.error("no hay clip de referencia para --tune")
+        sys.exit(1)
 
-    if success:
-        print("\n✅ Análisis y transcripción completados exitosamente")
-        print(f"📋 Revisa los archivos en: {output_dir}")
-        print("📝 Archivo principal: transcripcion_combinada.txt")
-    else:
-        print("\n❌ Error durante el análisis")
+    print(f"🧪 AUTO-AJUSTE DE WHISPER — modelo '{WHISPER_MODEL}'")
+    print(f"📎 Clip de referencia: {clip_path} ({args.tune_seconds:.0f}s)")
+    print("=" * 60)
+
+    clip = whisper_tuning.load_reference_clip(clip_path, args.tune_seconds)
+
+    def on_result(candidate):
+        print(
+            f"   {candidate['compute_type']:<13} hilos={candidate['cpu_threads']:<3} "
+            f"workers={candidate['num_workers']} → {candidate['audio_s_per_s']:.2f} audio-s/s",
+            flush=True,
+        )
+
+    result = whisper_tuning.tune_whisper(
+        WHISPER_MODEL,
+        clip,
+        model_cls=WhisperModel,
+        language=TRANSCRIPTION_LANGUAGE,
+        on_result=on_result,
+    )
+    print(
+        f"✅ Mejor configuración: {result['compute_type']} | hilos={result['cpu_threads']} | "
+        f"workers={result['num_workers']} ({result['audio_s_per_s']:.2f} audio-s/s)"
+    )
+    print(f"📝 Perfil guardado en: {result['profile_path']}")
+    print(f"TUNE_RESULT:{json.dumps({k: v for k, v in result.items() if k != 'candidates'})}")
 
 
 if __name__ == "__main__":
@@ -1225,4 +2117,5 @@ if __name__ == "__main__":
         sys.stderr.write(f"FATAL_ERROR: {e}\n")
         sys.stderr.write(traceback.format_exc())
         sys.stderr.flush()
+        events.error(e)
         sys.exit(1)
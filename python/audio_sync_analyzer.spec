@@ -53,6 +53,8 @@ a = Analysis(
         'sklearn.utils',
         'numba',
         'soxr',
+        # Métricas de memoria (perf_metrics en Windows, sin el módulo resource)
+        'psutil',
         # Visualizacion
         'matplotlib',
         'matplotlib.backends.backend_agg',
@@ -0,0 +1,60 @@
+"""
+background_task.py — Trabajo en un hilo daemon cuyo resultado se recoge más tarde.
+
+Se usa para solapar la carga del modelo Whisper con la decodificación y el
+análisis de señal. Si al final ninguna pista es útil, la tarea se cancela: una
+carga nativa en curso no se puede interrumpir, pero su resultado se descarta
+(`on_discard`) y el proceso no la espera al terminar.
+"""
+
+import threading
+
+
+class BackgroundTask:
+    def __init__(self, fn, name="background-task", on_discard=None):
+        self._fn = fn
+        self._on_discard = on_discard
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._lock = threading.Lock()
+        self._value = None
+        self._error = None
+        self._finished = False
+        self._cancelled = False
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def done(self):
+        return self._finished
+
+    def result(self, timeout=None):
+        """Espera a que termine y devuelve su valor (relanza su excepción si falló)."""
+        self._thread.join(timeout)
+        if self._error is not None:
+            raise self._error
+        return self._value
+
+    def cancel(self):
+        """Descarta el resultado: ahora si ya terminó, o en cuanto termine."""
+        with self._lock:
+            self._cancelled = True
+            finished = self._finished
+        if finished:
+            self._discard()
+
+    def _run(self):
+        try:
+            value, error = self._fn(), None
+        except BaseException as e:  # se relanza en result()
+            value, error = None, e
+        with self._lock:
+            self._value, self._error = value, error
+            self._finished = True
+            cancelled = self._cancelled
+        if cancelled:
+            self._discard()
+
+    def _discard(self):
+        if self._on_discard and self._error is None:
+            self._on_discard(self._value)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+bench_dsp.py — Micro-benchmarks de las rutas numéricas de audio_sync_analyzer.
+
+Genera pares micrófono/sistema sintéticos con lag, deriva, fuga y silencio
+conocidos (ver synthetic.py) y mide, por caso:
+  - detect_cross_correlation   → tiempo + error de lag (ms) y de deriva (s/h)
+  - detect_hardware_latency    → tiempo + error de latencia de arranque (ms)
+  - analyze_audio_properties   → tiempo
+  - create_synchronized_chunks → tiempo
+  - combine_transcriptions     → tiempo (con transcripción y diarización sintéticas)
+
+Uso:
+  python python/benchmarks/bench_dsp.py [--durations 60,600,3600,14400]
+      [--scenarios clean,drift] [--repeat 3]
+      [--output FILE] [--baseline FILE] [--save-baseline]
+
+Los resultados se escriben en JSON. Con --baseline se comparan contra un
+resultado previo y el script sale con código 1 si algún caso pierde más de
+--tolerance de throughput o su error de lag empeora más de --lag-tolerance-ms.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import numpy as np
+
+from synthetic import (
+    fake_diarization,
+    fake_transcription,
+    make_dual_track,
+    to_audio_segment,
+)
+
+RESULTS_VERSION = 1
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+DEFAULT_OUTPUT = os.path.join(RESULTS_DIR, "dsp-latest.json")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "dsp-baseline.json")
+
+# Escenarios: parámetros de make_dual_track
+SCENARIOS = {
+    "clean": dict(lag=0.12, drift_per_hour=0.0, bleed=0.3, silence_ratio=0.3),
+    "drift": dict(lag=0.35, drift_per_hour=0.5, bleed=0.3, silence_ratio=0.3),
+    "low_bleed": dict(lag=0.08, drift_per_hour=0.0, bleed=0.05, silence_ratio=0.3),
+    "sparse": dict(lag=0.2, drift_per_hour=0.0, bleed=0.3, silence_ratio=0.8),
+    "late_mic": dict(lag=0.1, drift_per_hour=0.0, bleed=0.3, silence_ratio=0.3, mic_onset=1.5),
+}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="DSP micro-benchmarks (audio_sync_analyzer)")
+    parser.add_argument(
+        "--durations",
+        type=str,
+        default="60,600",
+        help="Duraciones en segundos separadas por comas (ej: 60,600,3600,14400)",
+    )
+    parser.add_argument(
+        "--scenarios",
+        type=str,
+        default=",".join(SCENARIOS),
+        help=f"Escenarios a ejecutar ({', '.join(SCENARIOS)})",
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Repeticiones por función (se toma el mínimo)")
+    parser.add_argument("--seed", type=int, default=0, help="Semilla del generador sintético")
+    parser.add_argument("--output", type=str, default=DEFAULT_OUTPUT, help="Fichero JSON de resultados")
+    parser.add_argument("--baseline", type=str, default=None, help="Resultados previos contra los que comparar")
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help=f"Guarda también los resultados como baseline ({DEFAULT_BASELINE})",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Pérdida de throughput tolerada respecto al baseline (0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--lag-tolerance-ms",
+        type=float,
+        default=5.0,
+        help="Empeoramiento tolerado del error de lag/latencia en ms",
+    )
+    return parser.parse_args()
+
+
+def _timed(fn, repeat):
+    """Ejecuta fn `repeat` veces silenciando stdout; devuelve (mejor_tiempo, último_resultado)."""
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            t0 = time.perf_counter()
+            result = fn()
+            elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _entry(wall, duration, **extra):
+    entry = {
+        "wall_s": round(wall, 5),
+        "audio_s_per_s": round(duration / wall, 2) if wall > 0 else None,
+    }
+    entry.update(extra)
+    return entry
+
+
+def run_case(analyzer_module, scenario, duration, repeat, seed):
+    params = SCENARIOS[scenario]
+    sample_rate = analyzer_module.SAMPLE_RATE
+    t0 = time.perf_counter()
+    pair = make_dual_track(duration, sample_rate=sample_rate, seed=seed, **params)
+    generate_s = time.perf_counter() - t0
+
+    workdir = tempfile.mkdtemp(prefix="bench_dsp_")
+    try:
+        diarization_file = os.path.join(workdir, "diarization.json")
+        with open(diarization_file, "w", encoding="utf-8") as f:
+            json.dump(fake_diarization(pair.system_intervals, seed=seed), f)
+
+        analyzer = analyzer_module.AudioSyncAnalyzer(
+            None,
+            None,
+            workdir,
+            diarization_file=diarization_file,
+            mix_mode=analyzer_module.MIX_MODE_DEFAULT,
+        )
+        analyzer.mic_data = pair.mic
+        analyzer.system_data = pair.system
+        analyzer.mic_audio = to_audio_segment(pair.mic, sample_rate)
+        analyzer.system_audio = to_audio_segment(pair.system, sample_rate)
+
+        functions = {}
+
+        wall, _ = _timed(analyzer.analyze_audio_properties, repeat)
+        functions["analyze_audio_properties"] = _entry(wall, duration)
+
+        wall, lag = _timed(analyzer.detect_cross_correlation, repeat)
+        drift_per_hour = float(getattr(analyzer, "drift_slope", 0.0)) * 3600
+        functions["detect_cross_correlation"] = _entry(
+            wall,
+            duration,
+            lag=round(float(lag), 5),
+            lag_error_ms=round(abs(float(lag) - pair.truth["lag"]) * 1000, 3),
+            drift_error_s_per_h=round(abs(drift_per_hour - pair.truth["drift_per_hour"]), 4),
+        )
+
+        wall, bias = _timed(analyzer.detect_hardware_latency, repeat)
+        analyzer.hardware_bias = bias
+        functions["detect_hardware_latency"] = _entry(
+            wall,
+            duration,
+            hardware_bias=round(float(bias), 5),
+            lag_error_ms=round(abs(float(bias) - pair.truth["hardware_bias"]) * 1000, 3),
+        )
+
+        wall, chunks = _timed(lambda: analyzer.create_synchronized_chunks(lag), repeat)
+        functions["create_synchronized_chunks"] = _entry(wall, duration, chunks=len(chunks))
+
+        mic_result = fake_transcription(pair.mic_intervals)
+        sys_result = fake_transcription(pair.system_intervals)
+        wall, _ = _timed(
+            lambda: analyzer.combine_transcriptions(mic_result, sys_result, lag_seconds=lag),
+            repeat,
+        )
+        functions["combine_transcriptions"] = _entry(
+            wall,
+            duration,
+            input_segments=len(mic_result["segments"]) + len(sys_result["segments"]),
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "id": f"{scenario}-{int(duration)}s",
+        "scenario": scenario,
+        "duration": duration,
+        "params": params,
+        "truth": pair.truth,
+        "generate_s": round(generate_s, 3),
+        "functions": functions,
+    }
+
+
+def compare(results, baseline, tolerance, lag_tolerance_ms):
+    """Devuelve la lista de regresiones (textos) respecto al baseline."""
+    regressions = []
+    base_cases = {c["id"]: c for c in baseline.get("cases", [])}
+    for case in results["cases"]:
+        base = base_cases.get(case["id"])
+        if not base:
+            continue
+        for name, current in case["functions"].items():
+            previous = base["functions"].get(name)
+            if not previous:
+                continue
+            cur_tp = current.get("audio_s_per_s")
+            prev_tp = previous.get("audio_s_per_s")
+            if cur_tp and prev_tp and cur_tp < prev_tp * (1.0 - tolerance):
+                regressions.append(
+                    f"{case['id']} {name}: throughput {cur_tp:.1f} < {prev_tp:.1f} audio-s/s"
+                )
+            cur_err = current.get("lag_error_ms")
+            prev_err = previous.get("lag_error_ms")
+            if cur_err is not None and prev_err is not None and cur_err > prev_err + lag_tolerance_ms:
+                regressions.append(
+                    f"{case['id']} {name}: error {cur_err:.1f} ms > {prev_err:.1f} ms"
+                )
+    return regressions
+
+
+def _print_table(results):
+    print(f"{'caso':<20} {'función':<28} {'wall_s':>10} {'audio-s/s':>12} {'error_ms':>10}")
+    print("-" * 84)
+    for case in results["cases"]:
+        for name, entry in case["functions"].items():
+            err = entry.get("lag_error_ms")
+            print(
+                f"{case['id']:<20} {name:<28} {entry['wall_s']:>10.4f} "
+                f"{(entry['audio_s_per_s'] or 0):>12.1f} {'' if err is None else f'{err:.2f}':>10}"
+            )
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    args = parse_args()
+    durations = [float(d) for d in args.durations.split(",") if d.strip()]
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        print(f"Escenarios desconocidos: {unknown}", file=sys.stderr)
+        sys.exit(2)
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        import audio_sync_analyzer
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created_at": time.time(),
+        "host": {
+            "node": platform.node(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+        "cases": [],
+    }
+
+    for duration in durations:
+        for scenario in scenarios:
+            print(f"▶️  {scenario} ({duration:.0f}s)...", flush=True)
+            results["cases"].append(
+                run_case(audio_sync_analyzer, scenario, duration, args.repeat, args.seed)
+            )
+
+    _print_table(results)
+    _write_json(args.output, results)
+    print(f"\n📝 Resultados guardados en: {args.output}")
+
+    if args.save_baseline:
+        _write_json(DEFAULT_BASELINE, results)
+        print(f"📌 Baseline actualizado: {DEFAULT_BASELINE}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance, args.lag_tolerance_ms)
+        if regressions:
+            print("\n❌ Regresiones respecto al baseline:")
+            for r in regressions:
+                print(f"   - {r}")
+            sys.exit(1)
+        print("\n✅ Sin regresiones respecto al baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+#!/usr/bin/env python3
+"""
+bench_pipeline.py — Benchmark end-to-end del pipeline con backends falsos.
+
+Genera una grabación sintética (carpeta <basename>/ con -microphone.wav y
+-system.wav), ejecuta la diarización (diarization_analyzer) y el análisis
+completo (AudioSyncAnalyzer.run_full_analysis) con FakeWhisperModel/FakePipeline
+y reporta por flujo:
+  - rtf:              tiempo de pared / duración del audio
+  - peak_rss_mb:      memoria pico del proceso
+  - model_s / outside_model_s: tiempo de pared con algún modelo simulado en
+                      marcha (unión de intervalos) y sin ninguno
+  - model_overlap_s:  tiempo de modelo que se solapó entre hilos (suma − unión)
+  - io:               bytes leídos/escritos por el proceso y tamaño de las salidas
+  - stages:           métricas por etapa (perf_metrics)
+
+Cada flujo se ejecuta en un subproceso propio para que la memoria pico y la E/S
+no se mezclen. El flujo de diarización necesita torch instalado; si no está,
+se omite.
+
+Uso:
+  python python/benchmarks/bench_pipeline.py [--duration 120] [--scenario clean]
+      [--model small] [--whisper-speed 200] [--pyannote-speed 100] [--mix-mode auto]
+      [--flows diarization,transcription] [--output FILE] [--keep]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PYTHON_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, PYTHON_DIR)
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+DEFAULT_OUTPUT = os.path.join(RESULTS_DIR, "pipeline-latest.json")
+RECORDING_SAMPLE_RATE = 48000
+BASENAME = "bench"
+FLOWS = ("diarization", "transcription")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark (fake backends)")
+    parser.add_argument("--duration", type=float, default=120, help="Duración del audio sintético (s)")
+    parser.add_argument("--scenario", type=str, default="clean", help="Escenario de bench_dsp.SCENARIOS")
+    parser.add_argument("--model", type=str, default="small", help="Modelo Whisper simulado")
+    parser.add_argument("--threads", type=int, default=4, help="Hilos de CPU para Whisper")
+    parser.add_argument("--whisper-speed", type=float, default=200.0, help="audio-s/s de tiny con 4 hilos")
+    parser.add_argument("--pyannote-speed", type=float, default=100.0, help="audio-s/s del pipeline de diarización")
+    parser.add_argument(
+        "--mix-mode",
+        choices=["auto", "on", "off"],
+        default="auto",
+        help="--mix_mode del análisis (auto, como la CLI)",
+    )
+    parser.add_argument("--flows", type=str, default=",".join(FLOWS), help="Flujos a ejecutar")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=str, default=DEFAULT_OUTPUT, help="Fichero JSON de resultados")
+    parser.add_argument("--keep", action="store_true", help="No borrar el directorio de trabajo")
+    parser.add_argument("--verbose", action="store_true", help="Mostrar los logs de los scripts")
+    parser.add_argument("--child", type=str, default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", type=str, default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+# ---------------------------------------------------------------------------
+# Medición de E/S y salidas
+# ---------------------------------------------------------------------------
+
+
+def read_io_counters():
+    """Bytes de E/S del proceso: /proc/self/io en Linux, psutil si está disponible."""
+    try:
+        with open("/proc/self/io", "r") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return {
+            "read_bytes": int(fields.get("rchar", 0)),
+            "write_bytes": int(fields.get("wchar", 0)),
+            "disk_read_bytes": int(fields.get("read_bytes", 0)),
+            "disk_write_bytes": int(fields.get("write_bytes", 0)),
+        }
+    except (OSError, ValueError):
+        pass
+    try:
+        import psutil
+
+        io = psutil.Process().io_counters()
+        return {"read_bytes": io.read_bytes, "write_bytes": io.write_bytes}
+    except Exception:
+        return None
+
+
+def _io_delta(before, after):
+    if not before or not after:
+        return None
+    return {k: after[k] - before.get(k, 0) for k in after}
+
+
+def _dir_bytes(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Flujos (se ejecutan en el subproceso hijo)
+# ---------------------------------------------------------------------------
+
+
+def _recording_paths(workdir):
+    folder = os.path.join(workdir, BASENAME)
+    return {
+        "mic": os.path.join(folder, f"{BASENAME}-microphone.wav"),
+        "system": os.path.join(folder, f"{BASENAME}-system.wav"),
+        "output_dir": os.path.join(folder, "analysis"),
+        "diarization": os.path.join(folder, "analysis", "diarization.json"),
+    }
+
+
+def run_diarization(args, paths):
+    import fake_backends
+
+    fake_backends.install_pyannote(speed=args.pyannote_speed)
+    import diarization_analyzer
+    import embedding_batches
+    from perf_metrics import PerfRecorder
+
+    ns = argparse.Namespace(
+        audio_file=paths["system"],
+        hf_token="fake-token",
+        output_json=paths["diarization"],
+        ffmpeg=None,
+        ffprobe=None,
+        profile=False,
+        embedding_batch_size=embedding_batches.DEFAULT_BATCH_SIZE,
+        chunk_minutes=None,
+        num_speakers=None,
+        min_speakers=None,
+        max_speakers=None,
+        merge_similarity=0.0,
+        speaker_index=None,
+        speaker_top_k=3,
+        embeddings_format="both",
+        embedding_dtype="float32",
+    )
+    perf = PerfRecorder("diarization_analyzer", paths["output_dir"])
+    diarization_analyzer._run(ns, perf)
+    perf.write()
+    return True, perf.stages
+
+
+def run_transcription(args, paths):
+    import fake_backends
+    import audio_sync_analyzer
+
+    fake_backends.install_whisper(audio_sync_analyzer, speed=args.whisper_speed)
+    audio_sync_analyzer.WHISPER_MODEL = args.model
+    audio_sync_analyzer.CPU_THREADS = args.threads
+
+    diarization_file = paths["diarization"] if os.path.exists(paths["diarization"]) else None
+    analyzer = audio_sync_analyzer.AudioSyncAnalyzer(
+        paths["mic"],
+        paths["system"],
+        paths["output_dir"],
+        diarization_file=diarization_file,
+        mix_mode=args.mix_mode,
+    )
+    ok = analyzer.run_full_analysis()
+    return ok, analyzer.perf.stages
+
+
+def run_child(args):
+    import fake_backends
+    from perf_metrics import peak_rss_mb
+
+    paths = _recording_paths(args.workdir)
+    with open(os.path.join(args.workdir, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+
+    io_before = read_io_counters()
+    output_before = _dir_bytes(paths["output_dir"])
+    t0 = time.perf_counter()
+    if args.child == "diarization":
+        ok, stages = run_diarization(args, paths)
+    else:
+        ok, stages = run_transcription(args, paths)
+    wall = time.perf_counter() - t0
+    io_after = read_io_counters()
+
+    # Los modelos pueden correr a la vez: sumar sus tiempos daría más que la pared
+    model_s = fake_backends.MODEL_CLOCK.busy()
+    outside_s = max(0.0, wall - model_s)
+    result = {
+        "flow": args.child,
+        "ok": bool(ok),
+        "audio_s": meta["duration"],
+        "wall_s": round(wall, 4),
+        "rtf": round(wall / meta["duration"], 5),
+        "peak_rss_mb": peak_rss_mb(),
+        "model_s": round(model_s, 4),
+        "model_overlap_s": round(fake_backends.MODEL_CLOCK.total() - model_s, 4),
+        "outside_model_s": round(outside_s, 4),
+        "outside_model_pct": round(outside_s / wall * 100, 1) if wall > 0 else None,
+        "model_clock": fake_backends.MODEL_CLOCK.as_dict(),
+        "io": _io_delta(io_before, io_after),
+        "output_bytes": _dir_bytes(paths["output_dir"]) - output_before,
+        "stages": stages,
+    }
+    print("RESULT:" + json.dumps(result, ensure_ascii=False), flush=True)
+
+
+# ---------------------------------------------------------------------------
+# Proceso padre
+# ---------------------------------------------------------------------------
+
+
+def prepare_recording(args, workdir):
+    import soundfile as sf
+    from bench_dsp import SCENARIOS
+    from synthetic import make_dual_track
+
+    pair = make_dual_track(
+        args.duration,
+        sample_rate=RECORDING_SAMPLE_RATE,
+        seed=args.seed,
+        **SCENARIOS[args.scenario],
+    )
+    paths = _recording_paths(workdir)
+    os.makedirs(os.path.dirname(paths["mic"]), exist_ok=True)
+    sf.write(paths["mic"], pair.mic, RECORDING_SAMPLE_RATE, subtype="PCM_16")
+    sf.write(paths["system"], pair.system, RECORDING_SAMPLE_RATE, subtype="PCM_16")
+    meta = {"duration": args.duration, "scenario": args.scenario, "truth": pair.truth}
+    with open(os.path.join(workdir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return meta
+
+
+def run_flow(args, flow, workdir):
+    cmd = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "--child", flow,
+        "--workdir", workdir,
+        "--model", args.model,
+        "--threads", str(args.threads),
+        "--whisper-speed", str(args.whisper_speed),
+        "--pyannote-speed", str(args.pyannote_speed),
+        "--mix-mode", args.mix_mode,
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True, encoding="utf-8")
+    if args.verbose:
+        sys.stdout.write(proc.stdout)
+    sys.stderr.write(proc.stderr if (args.verbose or proc.returncode) else "")
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT:"):
+            return json.loads(line[len("RESULT:"):])
+    return {"flow": flow, "ok": False, "returncode": proc.returncode}
+
+
+def main():
+    args = parse_args()
+    if args.child:
+        run_child(args)
+        return
+
+    flows = [f.strip() for f in args.flows.split(",") if f.strip()]
+    if "diarization" in flows:
+        try:
+            import torch  # noqa: F401
+        except ImportError:
+            print("⚠️  torch no está instalado: se omite el flujo de diarización.")
+            flows.remove("diarization")
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    try:
+        print(f"🎛️  Generando grabación sintética de {args.duration:.0f}s ({args.scenario})...")
+        meta = prepare_recording(args, workdir)
+        results = {
+            "version": 1,
+            "created_at": time.time(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("child", "workdir")},
+            "meta": meta,
+            "flows": [],
+        }
+        for flow in flows:
+            print(f"▶️  Flujo: {flow}", flush=True)
+            results["flows"].append(run_flow(args, flow, workdir))
+
+        for r in results["flows"]:
+            if not r.get("ok"):
+                print(f"❌ {r['flow']}: falló (código {r.get('returncode')})")
+                continue
+            io = r.get("io") or {}
+            print(
+                f"✅ {r['flow']:<14} RTF {r['rtf']:.4f} | pared {r['wall_s']:.2f}s | "
+                f"modelo {r['model_s']:.2f}s (solapado {r['model_overlap_s']:.2f}s) | "
+                f"fuera del modelo {r['outside_model_s']:.2f}s "
+                f"({r['outside_model_pct']}%) | RSS pico {r['peak_rss_mb']:.0f} MB | "
+                f"E/S {io.get('read_bytes', 0) / 1e6:.1f} MB leídos, "
+                f"{io.get('write_bytes', 0) / 1e6:.1f} MB escritos"
+            )
+
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"📝 Resultados guardados en: {args.output}")
+        if args.keep:
+            print(f"📁 Directorio de trabajo: {workdir}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+"""
+fake_backends.py — Backends falsos de Whisper y pyannote para medir el pipeline sin modelos.
+
+FakeWhisperModel imita la API de faster_whisper.WhisperModel y FakePipeline la
+de pyannote.audio.Pipeline (incluido `_embedding`). Ambos:
+  - producen segmentos/palabras/embeddings deterministas a partir de la energía
+    del audio (las mismas entradas dan siempre las mismas salidas),
+  - simulan una velocidad configurable (segundos de audio por segundo) que
+    escala con el tamaño del modelo, los hilos, el compute_type y el beam,
+  - anotan en MODEL_CLOCK los intervalos pasados "dentro del modelo", para que
+    el harness pueda calcular cuánto tiempo se va fuera de él. Los modelos
+    pueden correr a la vez (carga en segundo plano, pistas en paralelo, grafo
+    de etapas, diarización en línea): lo que cuenta es la unión de intervalos.
+
+Uso:
+    import fake_backends
+    fake_backends.install_whisper(audio_sync_analyzer, speed=200)
+    fake_backends.install_pyannote(speed=100)   # antes de importar pyannote
+"""
+
+import sys
+import threading
+import time
+import types
+import zlib
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+WHISPER_SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+MAX_SEGMENT_SECONDS = 10.0
+EMBEDDING_DIM = 256
+
+# Coste relativo por modelo / compute_type (1.0 = tiny int8)
+MODEL_COST = {"tiny": 1.0, "base": 1.8, "small": 4.0, "medium": 10.0, "large": 20.0}
+COMPUTE_COST = {"int8": 1.0, "int8_float32": 1.2, "int16": 1.4, "float16": 1.6, "float32": 2.0}
+
+_WORDS = (
+    "hola vale entonces reunión proyecto cliente semana revisar datos equipo "
+    "correo informe presupuesto tarea plazo cambio versión prueba despliegue"
+).split()
+
+
+class ModelClock:
+    """Registro (thread-safe) de los intervalos pasados dentro de los modelos falsos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.seconds = {}
+        self.calls = {}
+        self.intervals = []
+
+    def add(self, key, start, end):
+        """Anota una llamada de `key` entre dos instantes de time.perf_counter()."""
+        with self._lock:
+            self.seconds[key] = self.seconds.get(key, 0.0) + (end - start)
+            self.calls[key] = self.calls.get(key, 0) + 1
+            self.intervals.append((start, end))
+
+    def total(self):
+        """Suma de lo que duró cada llamada (cuenta dos veces las que se solapan)."""
+        return sum(self.seconds.values())
+
+    def busy(self):
+        """Tiempo de pared con al menos un modelo en marcha (unión de intervalos)."""
+        with self._lock:
+            intervals = sorted(self.intervals)
+        busy = 0.0
+        current_start = current_end = None
+        for start, end in intervals:
+            if current_end is None or start > current_end:
+                if current_end is not None:
+                    busy += current_end - current_start
+                current_start, current_end = start, end
+            else:
+                current_end = max(current_end, end)
+        if current_end is not None:
+            busy += current_end - current_start
+        return busy
+
+    def as_dict(self):
+        return {
+            "seconds": {k: round(v, 4) for k, v in self.seconds.items()},
+            "calls": dict(self.calls),
+            "total_s": round(self.total(), 4),
+            "busy_s": round(self.busy(), 4),
+        }
+
+
+MODEL_CLOCK = ModelClock()
+
+
+def _simulate(key, seconds):
+    start = time.perf_counter()
+    if seconds > 0:
+        time.sleep(seconds)
+    MODEL_CLOCK.add(key, start, time.perf_counter())
+
+
+def _load_audio(audio, sample_rate=WHISPER_SAMPLE_RATE):
+    """Acepta ruta (wav/flac vía soundfile) o ndarray float32 mono a 16 kHz."""
+    if isinstance(audio, np.ndarray):
+        return audio.astype(np.float32, copy=False).reshape(-1), sample_rate
+    import soundfile as sf
+
+    data, sr = sf.read(audio, dtype="float32", always_2d=True)
+    return data.mean(axis=1), sr
+
+
+def speech_intervals(samples, sample_rate, threshold_ratio=0.15, min_gap=0.5):
+    """Intervalos con voz según la energía por trama (determinista, sin modelos)."""
+    frame = max(1, int(sample_rate * FRAME_SECONDS))
+    n_frames = len(samples) // frame
+    if n_frames == 0:
+        return []
+    rms = np.sqrt(np.mean(samples[: n_frames * frame].reshape(n_frames, frame) ** 2, axis=1))
+    peak = float(np.percentile(rms, 99)) if n_frames else 0.0
+    if peak <= 1e-4:
+        return []
+    active = rms > max(1e-3, peak * threshold_ratio)
+
+    intervals = []
+    start = None
+    last_active = None
+    for i, is_active in enumerate(active):
+        t = i * FRAME_SECONDS
+        if is_active:
+            if start is None:
+                start = t
+            elif t - last_active > min_gap:
+                intervals.append((start, last_active + FRAME_SECONDS))
+                start = t
+            last_active = t
+    if start is not None:
+        intervals.append((start, last_active + FRAME_SECONDS))
+    return [(s, e) for s, e in intervals if e - s >= 0.2]
+
+
+def _stable_unit(*values):
+    """Número pseudoaleatorio estable en [0, 1) derivado de los valores dados."""
+    return (zlib.crc32(repr(values).encode("utf-8")) % 10_000) / 10_000.0
+
+
+# ---------------------------------------------------------------------------
+# Whisper
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class FakeWord:
+    start: float
+    end: float
+    word: str
+    probability: float
+
+
+@dataclass
+class FakeSegment:
+    id: int
+    seek: int
+    start: float
+    end: float
+    text: str
+    tokens: List[int]
+    avg_logprob: float
+    compression_ratio: float
+    no_speech_prob: float
+    words: Optional[List[FakeWord]]
+    temperature: Optional[float] = 0.0
+
+
+@dataclass
+class FakeTranscriptionInfo:
+    language: str
+    language_probability: float
+    duration: float
+    duration_after_vad: float
+    all_language_probs: Optional[list] = None
+    transcription_options: Optional[dict] = field(default=None)
+    vad_options: Optional[dict] = None
+
+
+class FakeWhisperModel:
+    """Sustituto de faster_whisper.WhisperModel con velocidad simulada."""
+
+    base_speed = 200.0  # audio-s/s de tiny int8 con 4 hilos y beam 1
+    load_seconds = 0.2
+
+    def __init__(
+        self,
+        model_size_or_path,
+        device="auto",
+        compute_type="default",
+        cpu_threads=0,
+        num_workers=1,
+        **kwargs,
+    ):
+        self.model_size = str(model_size_or_path)
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads or 4
+        self.num_workers = num_workers
+        cost = MODEL_COST.get(self.model_size, 4.0)
+        _simulate("whisper_load", self.load_seconds * cost ** 0.5)
+
+    def _speed(self, beam_size):
+        cost = MODEL_COST.get(self.model_size, 4.0) * COMPUTE_COST.get(self.compute_type, 1.0)
+        threads = (self.cpu_threads / 4.0) ** 0.7
+        beam = 1.0 + 0.15 * (max(1, beam_size) - 1)
+        return self.base_speed * threads / (cost * beam)
+
+    def transcribe(self, audio, language=None, beam_size=5, word_timestamps=False, **kwargs):
+        samples, sr = _load_audio(audio)
+        duration = len(samples) / sr
+        intervals = speech_intervals(samples, sr)
+        info = FakeTranscriptionInfo(
+            language=language or "es",
+            language_probability=1.0,
+            duration=duration,
+            duration_after_vad=sum(e - s for s, e in intervals),
+        )
+        speed = self._speed(beam_size)
+        return self._segments(intervals, speed, word_timestamps), info
+
+    def _segments(self, intervals, speed, word_timestamps):
+        seg_id = 0
+        for start, end in intervals:
+            t = start
+            while t < end:
+                seg_end = min(end, t + MAX_SEGMENT_SECONDS)
+                _simulate("whisper_infer", (seg_end - t) / speed)
+                n_words = max(1, int((seg_end - t) * 2.5))
+                step = (seg_end - t) / n_words
+                words = [
+                    FakeWord(
+                        start=round(t + i * step, 3),
+                        end=round(t + (i + 1) * step, 3),
+                        word=" " + _WORDS[(seg_id * 7 + i) % len(_WORDS)],
+                        probability=0.9,
+                    )
+                    for i in range(n_words)
+                ]
+                u = _stable_unit(self.model_size, round(t, 2))
+                seg_id += 1
+                yield FakeSegment(
+                    id=seg_id,
+                    seek=int(t * 100),
+                    start=round(t, 3),
+                    end=round(seg_end, 3),
+                    text="".join(w.word for w in words),
+                    tokens=[],
+                    # ~10% de segmentos "dudosos", más en modelos pequeños
+                    avg_logprob=-0.2 - u * (1.2 if MODEL_COST.get(self.model_size, 4) < 4 else 0.8),
+                    compression_ratio=1.4 + u,
+                    no_speech_prob=0.05 + 0.3 * u,
+                    words=words if word_timestamps else None,
+                )
+                t = seg_end
+
+
+def install_whisper(analyzer_module, speed=None):
+    """Sustituye WhisperModel en el módulo del analizador (audio_sync_analyzer)."""
+    if speed is not None:
+        FakeWhisperModel.base_speed = float(speed)
+    analyzer_module.WhisperModel = FakeWhisperModel
+    return FakeWhisperModel
+
+
+# ---------------------------------------------------------------------------
+# pyannote
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class FakeTurn:
+    start: float
+    end: float
+
+
+class FakeAnnotation:
+    def __init__(self, tracks):
+        self._tracks = tracks
+
+    def itertracks(self, yield_label=False):
+        for i, (start, end, label) in enumerate(self._tracks):
+            if yield_label:
+                yield FakeTurn(start, end), i, label
+            else:
+                yield FakeTurn(start, end), i
+
+    def labels(self):
+        return sorted({label for _, _, label in self._tracks})
+
+
+class FakeEmbedding:
+    """Imita PretrainedSpeakerEmbedding: (batch, 1, n) → (batch, EMBEDDING_DIM)."""
+
+    speed = 400.0  # audio-s/s
+    sample_rate = WHISPER_SAMPLE_RATE
+
+    def __init__(self):
+        self.device = "cpu"
+        rng = np.random.default_rng(0)
+        self._projection = rng.standard_normal((64, EMBEDDING_DIM)).astype(np.float32)
+
+    def __call__(self, waveforms, masks=None):
+        batch = np.asarray(waveforms.cpu() if hasattr(waveforms, "cpu") else waveforms, dtype=np.float32)
+        batch = batch.reshape(batch.shape[0], -1)
+        _simulate("embedding", batch.size / self.sample_rate / self.speed)
+        # Energía logarítmica en 64 bandas → proyección fija: audio parecido, vector parecido
+        spectrum = np.abs(np.fft.rfft(batch, axis=1))
+        bands = np.array_split(spectrum, 64, axis=1)
+        features = np.log1p(np.stack([b.mean(axis=1) for b in bands], axis=1))
+        features -= features.mean(axis=1, keepdims=True)
+        return features @ self._projection
+
+
+class FakePipeline:
+    """Imita pyannote.audio.Pipeline para speaker-diarization-3.1."""
+
+    speed = 100.0  # audio-s/s
+    default_speakers = 3
+
+    def __init__(self):
+        self.device = "cpu"
+        self._embedding = FakeEmbedding()
+
+    @classmethod
+    def from_pretrained(cls, checkpoint, token=None, use_auth_token=None, **kwargs):
+        _simulate("pyannote_load", 0.3)
+        return cls()
+
+    def to(self, device):
+        self.device = str(device)
+        self._embedding.device = self.device
+        return self
+
+    def __call__(self, file, hook=None, num_speakers=None, min_speakers=None, max_speakers=None):
+        if "waveform" in file:
+            waveform = file["waveform"]
+            samples = np.asarray(waveform.cpu() if hasattr(waveform, "cpu") else waveform, dtype=np.float32)
+            samples, sr = samples.reshape(-1), int(file["sample_rate"])
+        else:
+            samples, sr = _load_audio(file["audio"])
+        duration = len(samples) / sr
+
+        speakers = num_speakers or self.default_speakers
+        if min_speakers:
+            speakers = max(speakers, min_speakers)
+        if max_speakers:
+            speakers = min(speakers, max_speakers)
+        speakers = max(1, speakers)
+
+        steps = ("segmentation", "speaker_counting", "embeddings", "discrete_diarization")
+        weights = (0.35, 0.05, 0.5, 0.1)
+        for step, weight in zip(steps, weights):
+            _simulate("pyannote_infer", duration * weight / self.speed)
+            if hook is not None:
+                hook(step, None, file=file, total=1, completed=1)
+
+        tracks = []
+        for i, (start, end) in enumerate(speech_intervals(samples, sr)):
+            label = int(_stable_unit("speaker", i) * speakers)
+            tracks.append((start, end, f"SPEAKER_{label:02d}"))
+        return FakeAnnotation(tracks)
+
+
+def install_pyannote(speed=None, embedding_speed=None):
+    """Registra módulos falsos `pyannote.audio` en sys.modules (antes de importarlo)."""
+    if speed is not None:
+        FakePipeline.speed = float(speed)
+    if embedding_speed is not None:
+        FakeEmbedding.speed = float(embedding_speed)
+
+    pyannote = types.ModuleType("pyannote")
+    audio = types.ModuleType("pyannote.audio")
+    core = types.ModuleType("pyannote.audio.core")
+    core_pipeline = types.ModuleType("pyannote.audio.core.pipeline")
+    audio.Pipeline = FakePipeline
+    core_pipeline.Pipeline = FakePipeline
+    pyannote.audio = audio
+    audio.core = core
+    core.pipeline = core_pipeline
+    sys.modules.update(
+        {
+            "pyannote": pyannote,
+            "pyannote.audio": audio,
+            "pyannote.audio.core": core,
+            "pyannote.audio.core.pipeline": core_pipeline,
+        }
+    )
+    return FakePipeline
@@ -0,0 +1,205 @@
+"""
+synthetic.py — Generador de pares sintéticos micrófono/sistema con verdad conocida.
+
+Cada par simula una reunión: el canal de sistema contiene "locutores" remotos
+(ruido modulado a ritmo silábico + un armónico por locución) separados por
+silencios; el micrófono contiene la voz del usuario, la fuga (bleed) del
+altavoz con lag y deriva conocidos, un retardo de arranque del hardware y ruido
+de fondo. Se devuelven también los intervalos de voz, que sirven para fabricar
+transcripciones y diarizaciones de prueba con timestamps coherentes.
+
+Las señales se generan por bloques en float32 para que un caso de 4 h no
+necesite varias copias completas en memoria.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from transcript_records import Word  # los scripts de benchmark añaden python/ al sys.path
+
+BLOCK_SECONDS = 60
+SYLLABLE_HZ = 4.0
+
+
+@dataclass
+class SyntheticPair:
+    mic: np.ndarray
+    system: np.ndarray
+    sample_rate: int
+    duration: float
+    truth: dict
+    system_intervals: list = field(default_factory=list)
+    mic_intervals: list = field(default_factory=list)
+
+
+def _speech_intervals(rng, duration, silence_ratio, mean_speech=4.0, start=0.5):
+    """Alterna locuciones y pausas hasta cubrir `duration` con la proporción de silencio pedida."""
+    silence_ratio = min(max(silence_ratio, 0.0), 0.95)
+    mean_gap = mean_speech * silence_ratio / max(1e-3, 1.0 - silence_ratio)
+    intervals = []
+    t = start
+    while t < duration:
+        length = float(np.clip(rng.exponential(mean_speech), 0.4, 15.0))
+        end = min(duration, t + length)
+        intervals.append((t, end))
+        t = end + (float(rng.exponential(mean_gap)) if mean_gap > 0 else 0.05)
+    return intervals
+
+
+def _render(intervals, n_samples, sample_rate, rng, amplitude):
+    """Dibuja las locuciones como ruido modulado + armónico, por bloques."""
+    out = np.zeros(n_samples, dtype=np.float32)
+    for start, end in intervals:
+        a = int(start * sample_rate)
+        b = min(n_samples, int(end * sample_rate))
+        if b <= a:
+            continue
+        f0 = float(rng.uniform(90, 260))
+        phase = float(rng.uniform(0, 2 * np.pi))
+        block = BLOCK_SECONDS * sample_rate
+        for s in range(a, b, block):
+            e = min(b, s + block)
+            t = np.arange(s, e, dtype=np.float64) / sample_rate
+            envelope = 0.5 * (1.0 + np.sin(2 * np.pi * SYLLABLE_HZ * t + phase))
+            noise = rng.standard_normal(e - s).astype(np.float32)
+            tone = np.sin(2 * np.pi * f0 * t).astype(np.float32)
+            out[s:e] = amplitude * envelope.astype(np.float32) * (0.7 * noise + 0.3 * tone)
+    return out
+
+
+def _delayed(signal, sample_rate, lag_s, drift_s_per_s):
+    """signal(t - lag(t)) con lag(t) = lag_s + drift * t, interpolando por bloques."""
+    n = len(signal)
+    out = np.zeros(n, dtype=np.float32)
+    block = BLOCK_SECONDS * sample_rate
+    for s in range(0, n, block):
+        e = min(n, s + block)
+        t = np.arange(s, e, dtype=np.float64) / sample_rate
+        src = (t - (lag_s + drift_s_per_s * t)) * sample_rate
+        i0 = np.floor(src).astype(np.int64)
+        frac = (src - i0).astype(np.float32)
+        valid = (i0 >= 0) & (i0 < n - 1)
+        i0 = np.where(valid, i0, 0)
+        chunk = signal[i0] * (1.0 - frac) + signal[i0 + 1] * frac
+        out[s:e] = np.where(valid, chunk, 0.0)
+    return out
+
+
+def _first_onset(intervals, offset=0.0):
+    return intervals[0][0] + offset if intervals else 0.0
+
+
+def make_dual_track(
+    duration,
+    sample_rate=44100,
+    lag=0.12,
+    drift_per_hour=0.0,
+    bleed=0.3,
+    silence_ratio=0.3,
+    mic_onset=0.0,
+    user_talk_ratio=0.2,
+    noise_floor=0.002,
+    seed=0,
+):
+    """Genera un par sintético.
+
+    lag:             segundos que la fuga del sistema llega tarde al micrófono
+                     (misma convención que detect_cross_correlation: mic - sistema)
+    drift_per_hour:  deriva del lag en segundos por hora
+    bleed:           ganancia de la fuga del altavoz en el micrófono
+    silence_ratio:   fracción de silencio del canal de sistema
+    mic_onset:       segundos iniciales en los que el micrófono no captura nada
+    user_talk_ratio: fracción del tiempo en la que habla el usuario
+    """
+    rng = np.random.default_rng(seed)
+    n = int(duration * sample_rate)
+    drift = drift_per_hour / 3600.0
+
+    system_intervals = _speech_intervals(rng, duration, silence_ratio)
+    system = _render(system_intervals, n, sample_rate, rng, amplitude=0.2)
+
+    user_silence = 1.0 - min(max(user_talk_ratio, 0.01), 0.95)
+    mic_intervals = _speech_intervals(rng, duration, user_silence, start=1.0)
+    mic = _render(mic_intervals, n, sample_rate, rng, amplitude=0.25)
+    if bleed > 0:
+        mic += bleed * _delayed(system, sample_rate, lag, drift)
+    if noise_floor > 0:
+        mic += (noise_floor * rng.standard_normal(n)).astype(np.float32)
+    onset_samples = int(mic_onset * sample_rate)
+    if onset_samples > 0:
+        mic[:onset_samples] = 0.0
+
+    sys_onset = _first_onset(system_intervals)
+    mic_signal_onset = max(
+        mic_onset,
+        min(
+            _first_onset(mic_intervals),
+            _first_onset(system_intervals, lag) if bleed > 0 else duration,
+        ),
+    )
+    truth = {
+        "lag": lag,
+        "drift_per_hour": drift_per_hour,
+        "hardware_bias": max(0.0, min(5.0, mic_signal_onset - sys_onset)),
+        "bleed": bleed,
+        "silence_ratio": silence_ratio,
+        "mic_onset": mic_onset,
+    }
+    return SyntheticPair(
+        mic=mic,
+        system=system,
+        sample_rate=sample_rate,
+        duration=duration,
+        truth=truth,
+        system_intervals=system_intervals,
+        mic_intervals=mic_intervals,
+    )
+
+
+def to_audio_segment(samples, sample_rate):
+    """Convierte float32 [-1, 1] a un AudioSegment PCM16 mono (lo que produce pydub al decodificar)."""
+    from pydub import AudioSegment
+
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    return AudioSegment(
+        data=pcm.tobytes(), sample_width=2, frame_rate=sample_rate, channels=1
+    )
+
+
+def fake_transcription(intervals, max_segment=8.0, words_per_second=2.5):
+    """Resultado con el formato de transcribe_audio_files a partir de intervalos de voz."""
+    segments = []
+    words = []
+    for start, end in intervals:
+        t = start
+        while t < end:
+            seg_end = min(end, t + max_segment)
+            n_words = max(1, int((seg_end - t) * words_per_second))
+            step = (seg_end - t) / n_words
+            text_words = []
+            for i in range(n_words):
+                word = f" palabra{len(words) % 97}"
+                words.append(Word(t + i * step, t + (i + 1) * step, word))
+                text_words.append(word)
+            segments.append({"start": t, "end": seg_end, "text": "".join(text_words)})
+            t = seg_end
+    return {
+        "text": " ".join(s["text"] for s in segments),
+        "segments": segments,
+        "words": words,
+    }
+
+
+def fake_diarization(intervals, speakers=3, seed=0):
+    """Diarización v2.0 sintética: cada locución del sistema se asigna a un locutor."""
+    rng = np.random.default_rng(seed)
+    labels = [f"SPEAKER_{i:02d}" for i in range(max(1, speakers))]
+    return {
+        "version": "2.0",
+        "segments": [
+            {"start": s, "end": e, "speaker": labels[int(rng.integers(len(labels)))]}
+            for s, e in intervals
+        ],
+        "speaker_embeddings": {},
+    }
@@ -0,0 +1,204 @@
+"""
+chunked_diarization.py — Diarización por ventanas para grabaciones muy largas (--chunk_minutes).
+
+pyannote procesa la grabación entera de una vez y la memoria y el clustering
+crecen más que linealmente con la duración: una sesión de 3–4 h puede agotar
+la RAM. En modo troceado:
+  1. El waveform se divide en ventanas iguales de como mucho `chunk_seconds`
+     que se solapan OVERLAP_SECONDS; cada una se diariza por separado sobre una
+     vista del tensor (sin copiarlo), una tras otra: el Pipeline de pyannote y
+     su modelo de embedding no son seguros entre hilos.
+  2. De cada ventana se calcula el centroide de cada locutor local con los
+     segmentos más largos (embedding_batches, por lotes).
+  3. Los locutores locales se enlazan con los globales por similitud coseno de
+     centroides (emparejamiento voraz uno a uno por encima de LINK_SIMILARITY);
+     los que no se parecen a ninguno pasan a ser locutores nuevos.
+  4. Las ventanas se cosen en el punto medio de cada solape: cada segmento se
+     queda en la ventana que contiene su punto medio.
+
+El resultado es la misma lista de segmentos {start, end, speaker} que produce
+la diarización completa, así el post-procesado y el JSON v2.0 no cambian.
+"""
+
+import math
+
+import numpy as np
+
+import embedding_batches
+
+CHUNK_SECONDS = 1800.0
+OVERLAP_SECONDS = 30.0
+# Por encima de esta duración el modo troceado se activa solo (si no se indica --chunk_minutes)
+AUTO_CHUNK_SECONDS = 2 * 3600.0
+LINK_SIMILARITY = 0.5
+LINK_SEGMENTS_PER_SPEAKER = 12
+
+
+def chunk_bounds(total_seconds, chunk_seconds=CHUNK_SECONDS, overlap=OVERLAP_SECONDS):
+    """[(inicio, fin)] de ventanas de igual longitud (≤ chunk_seconds) solapadas `overlap` segundos."""
+    if total_seconds <= chunk_seconds:
+        return [(0.0, float(total_seconds))]
+    overlap = min(overlap, chunk_seconds / 2)
+    count = math.ceil((total_seconds - overlap) / (chunk_seconds - overlap))
+    step = (total_seconds - overlap) / count
+    return [(i * step, min(total_seconds, i * step + step + overlap)) for i in range(count)]
+
+
+def chunk_hints(hints):
+    """Límites de hablantes válidos para una ventana: el total solo acota por arriba."""
+    limit = hints.get("num_speakers") or hints.get("max_speakers")
+    return {"max_speakers": limit} if limit else {}
+
+
+def annotation_segments(diarization):
+    """[{start, end, speaker}] de la salida del pipeline (Annotation o envoltorios de pyannote 3.x/4.x)."""
+    annotation = None
+    if hasattr(diarization, "itertracks"):
+        annotation = diarization
+    elif hasattr(diarization, "speaker_diarization"):
+        annotation = diarization.speaker_diarization
+    elif hasattr(diarization, "diarization"):
+        annotation = diarization.diarization
+    elif hasattr(diarization, "annotation"):
+        annotation = diarization.annotation
+
+    if annotation is None:
+        raise AttributeError("No se pudo extraer la anotación del resultado.")
+    return [
+        {"start": turn.start, "end": turn.end, "speaker": speaker}
+        for turn, _, speaker in annotation.itertracks(yield_label=True)
+    ]
+
+
+class SpeakerLinker:
+    """Mantiene los centroides globales y asigna a cada locutor local uno global."""
+
+    def __init__(self, threshold=LINK_SIMILARITY):
+        self.threshold = threshold
+        self.sums = []
+
+    def _centroids(self):
+        if not self.sums:
+            return np.zeros((0, 0), dtype=np.float32)
+        stacked = np.stack(self.sums)
+        norms = np.linalg.norm(stacked, axis=1, keepdims=True)
+        return stacked / np.maximum(norms, 1e-8)
+
+    def link(self, local_centroids):
+        """{etiqueta local: centroide} → {etiqueta local: índice global}."""
+        labels = list(local_centroids)
+        mapping = {}
+        if labels and self.sums:
+            local = np.stack([local_centroids[label] for label in labels])
+            local = local / np.maximum(np.linalg.norm(local, axis=1, keepdims=True), 1e-8)
+            similarity = local @ self._centroids().T
+            used = set()
+            for flat in np.argsort(similarity, axis=None)[::-1]:
+                i, j = np.unravel_index(flat, similarity.shape)
+                if similarity[i, j] < self.threshold:
+                    break
+                if labels[i] in mapping or j in used:
+                    continue
+                mapping[labels[i]] = int(j)
+                used.add(int(j))
+        for label in labels:
+            vector = np.asarray(local_centroids[label], dtype=np.float64)
+            vector = vector / max(np.linalg.norm(vector), 1e-8)
+            if label in mapping:
+                self.sums[mapping[label]] = self.sums[mapping[label]] + vector
+            else:
+                mapping[label] = len(self.sums)
+                self.sums.append(vector)
+        return mapping
+
+
+def _local_centroids(embedding_model, waveform, sample_rate, segments, batch_size):
+    """Centroide de cada locutor local usando sus LINK_SEGMENTS_PER_SPEAKER segmentos más largos."""
+    by_speaker = {}
+    for seg in segments:
+        by_speaker.setdefault(seg["speaker"], []).append(seg)
+    sample = []
+    for segs in by_speaker.values():
+        segs.sort(key=lambda s: s["end"] - s["start"], reverse=True)
+        sample.extend(segs[:LINK_SEGMENTS_PER_SPEAKER])
+    vectors, _ = embedding_batches.extract(
+        embedding_model, waveform, sample_rate, sample, batch_size=batch_size, log=lambda msg: None
+    )
+    return {
+        spk: np.asarray(centroid, dtype=np.float32)
+        for spk, centroid in embedding_batches.speaker_centroids(sample, vectors).items()
+    }
+
+
+def _stitch_cuts(bounds):
+    """Puntos de corte entre ventanas consecutivas (mitad del solape)."""
+    cuts = [0.0]
+    for (_, prev_end), (next_start, _) in zip(bounds[:-1], bounds[1:]):
+        cuts.append((prev_end + next_start) / 2)
+    cuts.append(math.inf)
+    return cuts
+
+
+def diarize_chunked(
+    pipeline,
+    waveform,
+    sample_rate,
+    embedding_model,
+    chunk_seconds=CHUNK_SECONDS,
+    overlap=OVERLAP_SECONDS,
+    batch_size=embedding_batches.DEFAULT_BATCH_SIZE,
+    pipeline_kwargs=None,
+    on_chunk=None,
+):
+    """Diariza `waveform` (1, n) por ventanas y devuelve (segmentos globales, estadísticas).
+
+    on_chunk(hechas, total) se llama al terminar cada ventana."""
+    total_seconds = waveform.shape[-1] / sample_rate
+    bounds = chunk_bounds(total_seconds, chunk_seconds, overlap)
+    pipeline_kwargs = pipeline_kwargs or {}
+
+    results = []
+    for index, (start, end) in enumerate(bounds):
+        view = waveform[:, int(start * sample_rate): int(end * sample_rate)]
+        local = annotation_segments(
+            pipeline({"waveform": view, "sample_rate": sample_rate, "uri": f"chunk{index}"}, **pipeline_kwargs)
+        )
+        for seg in local:
+            seg["start"] += start
+            seg["end"] += start
+        results.append((local, _local_centroids(embedding_model, waveform, sample_rate, local, batch_size)))
+        if on_chunk:
+            on_chunk(index + 1, len(bounds))
+
+    # Enlace en orden temporal: cada ventana se compara con los centroides acumulados
+    linker = SpeakerLinker()
+    cuts = _stitch_cuts(bounds)
+    linked = []
+    unlinked = 0
+    for index, (local, centroids) in enumerate(results):
+        mapping = linker.link(centroids)
+        for seg in local:
+            mid = (seg["start"] + seg["end"]) / 2
+            if not cuts[index] <= mid < cuts[index + 1]:
+                continue
+            if seg["speaker"] not in mapping:
+                # Locutor sin segmentos embebibles (todos < 0.5 s): se queda con su etiqueta local
+                mapping[seg["speaker"]] = f"c{index}_{seg['speaker']}"
+                unlinked += 1
+            linked.append(dict(seg, speaker=mapping[seg["speaker"]]))
+    linked.sort(key=lambda s: s["start"])
+
+    # Etiquetas globales en orden de primera aparición, con el formato de pyannote
+    names = {}
+    for seg in linked:
+        names.setdefault(seg["speaker"], f"SPEAKER_{len(names):02d}")
+        seg["speaker"] = names[seg["speaker"]]
+
+    stats = {
+        "chunks": len(bounds),
+        "chunk_seconds": round(bounds[0][1] - bounds[0][0], 1),
+        "local_speakers": sum(len(c) for _, c in results),
+        "global_speakers": len(names),
+        "unlinked_speakers": unlinked,
+    }
+    return linked, stats
@@ -3,6 +3,7 @@ import os
 import sys
 import json
 import argparse
+import time
 import traceback
 from unittest.mock import MagicMock
 
@@ -31,17 +32,26 @@ os.environ["PYANNOTE_TELEMETRY"] = "off"
 
 import torch
 
+import chunked_diarization
+import embedding_batches
+import embedding_cache
+import events
+import pipeline_steps
+import speaker_consolidation
+import speaker_index
+from perf_metrics import PerfRecorder
 
-def parse_args():
+
+def parse_args(argv=None):
     parser = argparse.ArgumentParser(description="Pyannote Speaker Diarization Script")
     parser.add_argument(
         "--audio_file",
         type=str,
-        required=True,
+        default=None,
         help="Ruta al archivo de audio (sistema)",
     )
     parser.add_argument(
-        "--hf_token", type=str, required=True, help="HuggingFace Access Token"
+        "--hf_token", type=str, default=None, help="HuggingFace Access Token"
     )
     parser.add_argument(
         "--output_json", type=str, required=True, help="Ruta de salida del JSON"
@@ -52,35 +62,170 @@ def parse_args():
     parser.add_argument(
         "--ffprobe", type=str, default=None, help="Ruta al binario de ffprobe"
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Vuelca cProfile y tracemalloc por etapa junto al JSON de salida",
+    )
+    parser.add_argument(
+        "--embedding_batch_size",
+        type=int,
+        default=embedding_batches.DEFAULT_BATCH_SIZE,
+        help="Ventanas por lote al extraer los embeddings de hablante",
+    )
+    parser.add_argument(
+        "--chunk_minutes",
+        type=float,
+        default=None,
+        help="Diariza por ventanas solapadas de N minutos (0 = nunca; por defecto solo "
+        "en grabaciones de más de 2 h)",
+    )
+    parser.add_argument(
+        "--num_speakers",
+        type=int,
+        default=None,
+        help="Número exacto de hablantes, si se conoce (pyannote no lo estima)",
+    )
+    parser.add_argument(
+        "--min_speakers", type=int, default=None, help="Mínimo de hablantes esperado"
+    )
+    parser.add_argument(
+        "--max_speakers",
+        type=int,
+        default=None,
+        help="Máximo de hablantes, solo si se conoce con certeza: por encima se unen "
+        "los más parecidos aunque no lleguen a --merge_similarity",
+    )
+    parser.add_argument(
+        "--merge_similarity",
+        type=float,
+        default=0.0,
+        help="Similitud coseno de centroides a partir de la cual dos etiquetas se unen "
+        "como el mismo hablante (0 = no unir, por defecto; "
+        f"{speaker_consolidation.MERGE_SIMILARITY} suele funcionar)",
+    )
+    parser.add_argument(
+        "--speaker_index",
+        type=str,
+        default=None,
+        help="Directorio de un índice de hablantes (speaker_index.py) para identificar a los hablantes",
+    )
+    parser.add_argument(
+        "--speaker_top_k",
+        type=int,
+        default=speaker_index.DEFAULT_TOP_K,
+        help="Candidatos por hablante al consultar --speaker_index",
+    )
+    parser.add_argument(
+        "--embeddings_format",
+        choices=("both", "npy", "inline"),
+        default="both",
+        help="Centroides en <salida>.embeddings.npy (npy), como listas en el JSON (inline) "
+        "o ambos para lectores antiguos de v2.0 (both)",
+    )
+    parser.add_argument(
+        "--embedding_dtype",
+        choices=embedding_cache.SIDECAR_DTYPES,
+        default="float32",
+        help="Tipo de los centroides en el .npy",
+    )
+    parser.add_argument(
+        "--recluster",
+        action="store_true",
+        help="Reasigna hablantes desde la caché de embeddings (<salida>.segments.npz) "
+        "con los umbrales actuales, sin volver a ejecutar pyannote",
+    )
+    parser.add_argument(
+        "--events",
+        action="store_true",
+        help="Emite eventos EVENT:{json} por stdout y los logs por stderr (ver events.py)",
+    )
+    args = parser.parse_args(argv)
+    if not args.recluster and not (args.audio_file and args.hf_token):
+        parser.error("--audio_file y --hf_token son obligatorios salvo con --recluster")
+    hints = speaker_hints(args)
+    if any(value < 1 for value in hints.values()):
+        parser.error("el número de hablantes debe ser al menos 1")
+    if args.num_speakers is not None and len(hints) > 1:
+        parser.error("--num_speakers no se combina con --min_speakers/--max_speakers")
+    if hints.get("min_speakers", 0) > hints.get("max_speakers", float("inf")):
+        parser.error("--min_speakers no puede ser mayor que --max_speakers")
+    return args
+
+
+def speaker_hints(args):
+    """Límites de hablantes indicados ({num_speakers|min_speakers|max_speakers: n}) para el pipeline."""
+    return {
+        name: getattr(args, name)
+        for name in ("num_speakers", "min_speakers", "max_speakers")
+        if getattr(args, name, None) is not None
+    }
 
 
 def main():
     args = parse_args()
-
-    print(f"🚀 Iniciando Diarización para: {args.audio_file}", flush=True)
-    print("PROGRESS:5", flush=True)
-
-    if not os.path.exists(args.audio_file):
-        print(f"❌ Error: El archivo de audio no existe: {args.audio_file}", flush=True)
-        sys.exit(1)
-
+    if args.events:
+        events.enable()
+    perf = PerfRecorder(
+        "recluster" if args.recluster else "diarization_analyzer",
+        os.path.dirname(args.output_json) or ".",
+        profile=args.profile,
+    )
     try:
-        # Importar pyannote aquí (ya con el parche aplicado en sys.modules)
-        from pyannote.audio import Pipeline
-
-        # Una capa extra de seguridad por si acaso
-        try:
-            import pyannote.audio.core.pipeline as p_mod
+        if args.recluster:
+            _recluster(args, perf)
+        else:
+            _run(args, perf)
+    finally:
+        perf.write()
+
+
+def _find_embedding_model(pipeline):
+    """Modelo de embedding interno del pipeline de diarización, o None.
+
+    En pyannote/speaker-diarization-3.1 el sub-pipeline de embedding está
+    expuesto como `pipeline._embedding` (modelo SpeechBrain/ECAPA-TDNN)."""
+    for attr in ("_embedding", "embedding_model", "embedding"):
+        if hasattr(pipeline, attr):
+            candidate = getattr(pipeline, attr)
+            # Verificamos que sea callable (un modelo Inference, no un dict)
+            if callable(candidate):
+                print(f"🔍 Modelo de embedding encontrado en pipeline.{attr}", flush=True)
+                return candidate
+    return None
+
+
+def _chunk_seconds(args, audio_seconds):
+    """Longitud de ventana del modo troceado, o 0 si la grabación se diariza entera."""
+    if not audio_seconds:
+        return 0
+    if args.chunk_minutes is None:
+        if audio_seconds <= chunked_diarization.AUTO_CHUNK_SECONDS:
+            return 0
+        chunk_seconds = chunked_diarization.CHUNK_SECONDS
+    else:
+        chunk_seconds = args.chunk_minutes * 60
+    return chunk_seconds if 0 < chunk_seconds < audio_seconds else 0
+
+
+def load_pipeline(hf_token, perf, progress=events.progress):
+    """Carga pyannote/speaker-diarization-3.1 en el mejor dispositivo disponible."""
+    # Importar pyannote aquí (ya con el parche aplicado en sys.modules)
+    from pyannote.audio import Pipeline
+
+    # Una capa extra de seguridad por si acaso
+    try:
+        import pyannote.audio.core.pipeline as p_mod
 
-            p_mod.track_pipeline_apply = lambda *args, **kwargs: None
-            print("🛡️  Parche secundario aplicado a core.pipeline.", flush=True)
-        except Exception:
-            pass
+        p_mod.track_pipeline_apply = lambda *args, **kwargs: None
+        print("🛡️  Parche secundario aplicado a core.pipeline.", flush=True)
+    except Exception:
+        pass
 
-        print("🤖 Cargando Pipeline de pyannote.audio...", flush=True)
-        print("PROGRESS:15", flush=True)
+    print("🤖 Cargando Pipeline de pyannote.audio...", flush=True)
+    progress(15)
 
+    with perf.stage("load_pipeline") as stage:
         # Determinar dispositivo (GPU si está disponible)
         device = torch.device(
             "cuda"
@@ -88,9 +233,10 @@ def main():
             else ("mps" if torch.backends.mps.is_available() else "cpu")
         )
         print(f"💻 Usando dispositivo: {device}", flush=True)
+        stage["device"] = str(device)
 
         pipeline = Pipeline.from_pretrained(
-            "pyannote/speaker-diarization-3.1", token=args.hf_token
+            "pyannote/speaker-diarization-3.1", token=hf_token
         )
 
         if pipeline is None:
@@ -99,142 +245,166 @@ def main():
             )
 
         pipeline.to(device)
-        print("✅ Pipeline cargado exitosamente", flush=True)
-        print("PROGRESS:30", flush=True)
-
-        print("🎙️ Procesando audio (esto puede tardar varios minutos)...", flush=True)
-        print("PROGRESS:40", flush=True)
-
-        # --- CARGA DE AUDIO ROBUSTA ---
-        # En lugar de dejar que pyannote lea el archivo (que falla en .webm),
-        # lo cargamos nosotros con pydub y le pasamos el waveform directamente.
-        # waveform/sample_rate se usan después para extraer embeddings por segmento.
-        waveform = None
-        sample_rate = None
-        try:
+    print("✅ Pipeline cargado exitosamente", flush=True)
+    progress(30)
+    return pipeline
+
+
+def diarize(pipeline, args, perf, progress=events.progress):
+    """Diariza args.audio_file, escribe args.output_json y devuelve el resultado (v2.0)."""
+    print("🎙️ Procesando audio (esto puede tardar varios minutos)...", flush=True)
+    progress(40)
+
+    # --- CARGA DE AUDIO ROBUSTA ---
+    # En lugar de dejar que pyannote lea el archivo (que falla en .webm),
+    # lo cargamos nosotros y le pasamos el waveform directamente.
+    # ffmpeg entrega float32 mono a 16 kHz (el estándar para diarización)
+    # directamente sobre un buffer numpy que torch envuelve sin copiar.
+    # waveform/sample_rate se usan después para extraer embeddings por segmento.
+    waveform = None
+    sample_rate = None
+    try:
+        with perf.stage("decode") as stage:
             from pydub import AudioSegment
-            import numpy as np
+
+            import ffmpeg_io
 
             if args.ffmpeg and os.path.isfile(args.ffmpeg):
                 AudioSegment.converter = args.ffmpeg
                 AudioSegment.ffmpeg = args.ffmpeg
+            if args.ffprobe and os.path.isfile(args.ffprobe):
+                AudioSegment.ffprobe = args.ffprobe
 
             print("📏 Cargando audio en memoria...", flush=True)
-            # Forzamos 16kHz y Mono que es el estándar para diarización
-            audio = (
-                AudioSegment.from_file(args.audio_file)
-                .set_frame_rate(16000)
-                .set_channels(1)
-            )
-
-            # Convertir a numpy y luego a tensor de torch
-            samples = np.array(audio.get_array_of_samples()).astype(np.float32)
-            # Normalizar a [-1, 1]
-            samples = samples / (2**15)
-
-            waveform = torch.from_numpy(samples).unsqueeze(0)  # Forma: (1, num_samples)
             sample_rate = 16000
+            started = time.perf_counter()
+            samples = ffmpeg_io.decode_stream(args.audio_file, sample_rate)
+            waveform = torch.from_numpy(samples).unsqueeze(0)  # Forma: (1, num_samples)
 
-            print(f"⏱️  Audio cargado: {len(samples) / sample_rate:.2f}s", flush=True)
+            decoded_seconds = len(samples) / sample_rate
+            elapsed = time.perf_counter() - started
+            print(
+                f"⏱️  Audio cargado: {decoded_seconds:.2f}s "
+                f"({decoded_seconds / max(elapsed, 1e-6):.0f}x tiempo real, "
+                f"{samples.nbytes / 2**20:.0f} MB)",
+                flush=True,
+            )
+            stage["audio_seconds"] = decoded_seconds
+            stage["waveform_mb"] = round(samples.nbytes / 2**20, 1)
 
             input_data = {
                 "waveform": waveform,
                 "sample_rate": sample_rate,
                 "uri": "audio",
             }
-        except Exception as e:
+    except Exception as e:
+        print(
+            f"⚠️  Error cargando waveform con ffmpeg: {e}. Reintentando con ruta de archivo...",
+            flush=True,
+        )
+        # En este path no tenemos waveform en memoria; los embeddings no
+        # podrán extraerse directamente, pero la diarización sigue.
+        input_data = {"uri": "audio", "audio": args.audio_file}
+
+    audio_seconds = (
+        waveform.shape[-1] / sample_rate if waveform is not None else None
+    )
+
+    # EJECUCIÓN DEL PIPELINE (Inferencia real)
+    raw_segments = None
+    chunk_seconds = _chunk_seconds(args, audio_seconds)
+    embedding_model = _find_embedding_model(pipeline) if chunk_seconds else None
+    # Con el número de hablantes acotado pyannote no estima cuántos hay al agrupar
+    hints = speaker_hints(args)
+    if hints:
+        print(
+            "👥 Hablantes: " + ", ".join(f"{k.split('_')[0]}={v}" for k, v in hints.items()),
+            flush=True,
+        )
+    with perf.stage("diarize", audio_seconds=audio_seconds) as stage:
+        stage.update(hints)
+        if embedding_model is not None:
+            # Grabación muy larga: ventanas solapadas enlazadas por embeddings
             print(
-                f"⚠️  Error cargando waveform con pydub: {e}. Reintentando con ruta de archivo...",
+                f"✂️  Diarización por ventanas de {chunk_seconds / 60:.0f} min",
                 flush=True,
             )
-            # En este path no tenemos waveform en memoria; los embeddings no
-            # podrán extraerse directamente, pero la diarización sigue.
-            input_data = {"uri": "audio", "audio": args.audio_file}
-
-        # EJECUCIÓN DEL PIPELINE (Inferencia real)
-        diarization = pipeline(input_data)
-
-        print("✅ Diarización completada", flush=True)
-        print("PROGRESS:75", flush=True)
-
-        print("📊 Procesando y unificando resultados...", flush=True)
-
-        annotation = None
-        if hasattr(diarization, "itertracks"):
-            annotation = diarization
-        elif hasattr(diarization, "speaker_diarization"):
-            annotation = diarization.speaker_diarization
-        elif hasattr(diarization, "diarization"):
-            annotation = diarization.diarization
-        elif hasattr(diarization, "annotation"):
-            annotation = diarization.annotation
-
-        if annotation is None:
-            raise AttributeError("No se pudo extraer la anotación del resultado.")
-
-        # Extraer segmentos originales
-        raw_segments = []
-        for turn, _, speaker in annotation.itertracks(yield_label=True):
-            raw_segments.append(
-                {"start": turn.start, "end": turn.end, "speaker": speaker}
+            raw_segments, chunk_stats = chunked_diarization.diarize_chunked(
+                pipeline,
+                waveform,
+                sample_rate,
+                embedding_model,
+                chunk_seconds=chunk_seconds,
+                batch_size=args.embedding_batch_size,
+                # Una ventana puede no contener a todos: solo vale como máximo
+                pipeline_kwargs=chunked_diarization.chunk_hints(hints),
+                on_chunk=lambda done, total: progress(
+                    40 + int(35 * done / total)
+                ),
             )
-
-        # --- Lógica de unificación opcional (clustering threshold) ---
-        # pyannote a veces separa a la misma persona si cambia el tono o hay ruido.
-        # Primero limpiamos segmentos extremadamente cortos que causan confusión.
-
-        final_segments = []
-        if raw_segments:
-            # Eliminar segmentos de menos de 0.2s (ruido/respiraciones)
-            filtered = [s for s in raw_segments if (s["end"] - s["start"]) > 0.2]
-
-            # Unir segmentos consecutivos del mismo hablante si el hueco es < 0.5s
-            if filtered:
-                current = filtered[0].copy()
-                for next_seg in filtered[1:]:
-                    if (
-                        next_seg["speaker"] == current["speaker"]
-                        and (next_seg["start"] - current["end"]) < 0.5
-                    ):
-                        current["end"] = next_seg["end"]
-                    else:
-                        final_segments.append(current)
-                        current = next_seg.copy()
-                final_segments.append(current)
-
-        print("PROGRESS:80", flush=True)
-
-        # --- EXTRACCIÓN DE EMBEDDINGS POR HABLANTE ---
-        # Para cada speaker único identificado, calculamos el embedding centroide
-        # promediando los vectores de todos sus segmentos de audio.
-        # Esto permite re-identificar al mismo hablante en sesiones futuras.
-        # NOTA: Solo es posible si el waveform fue cargado en memoria (pydub path).
-        # Si el fallback de ruta de archivo se usó, speaker_embeddings queda vacío.
+            stage.update(chunk_stats)
+            print(
+                f"🔗 {chunk_stats['chunks']} ventanas, {chunk_stats['local_speakers']} "
+                f"hablantes locales → {chunk_stats['global_speakers']} globales",
+                flush=True,
+            )
+        else:
+            if chunk_seconds:
+                print(
+                    "⚠️  Modelo de embedding no accesible; se diariza la grabación entera.",
+                    flush=True,
+                )
+            # El hook mide segmentation/embeddings/clustering y avanza el progreso por lotes
+            hook = pipeline_steps.StepHook(
+                perf, progress, start=40, end=75, device=getattr(pipeline, "device", None)
+            )
+            try:
+                diarization = pipeline(input_data, hook=hook, **hints)
+            finally:
+                steps = hook.finish()
+            stage["steps"] = [step["stage"] for step in steps]
+
+    print("✅ Diarización completada", flush=True)
+    progress(75)
+
+    print("📊 Procesando y unificando resultados...", flush=True)
+
+    with perf.stage("postprocess") as stage:
+        # Extraer segmentos originales (el modo troceado ya los devuelve enlazados)
+        if raw_segments is None:
+            raw_segments = chunked_diarization.annotation_segments(diarization)
+
+        # --- Limpieza de segmentos ---
+        # pyannote a veces separa a la misma persona si cambia el tono o hay ruido
+        # (eso se corrige con los embeddings, ver speaker_consolidation). Aquí solo
+        # limpiamos segmentos extremadamente cortos que causan confusión.
+
+        # Eliminar segmentos de menos de 0.2s (ruido/respiraciones)
+        filtered = [s for s in raw_segments if (s["end"] - s["start"]) > 0.2]
+
+        # Unir segmentos consecutivos del mismo hablante si el hueco es < 0.5s
+        final_segments = speaker_consolidation.merge_adjacent(filtered)
+        stage["segments"] = len(final_segments)
+
+    progress(80)
+
+    # --- EXTRACCIÓN DE EMBEDDINGS POR HABLANTE ---
+    # Para cada speaker único identificado, calculamos el embedding centroide
+    # promediando los vectores de todos sus segmentos de audio.
+    # Esto permite re-identificar al mismo hablante en sesiones futuras.
+    # NOTA: Solo es posible si el waveform fue cargado en memoria (decodificación con ffmpeg).
+    # Si el fallback de ruta de archivo se usó, speaker_embeddings queda vacío.
+    with perf.stage("embeddings", audio_seconds=audio_seconds) as stage:
         speaker_embeddings = {}
         try:
-            import numpy as np
-
             if waveform is None or sample_rate is None:
                 print(
                     "⚠️  Waveform no disponible en memoria; no se pueden extraer embeddings.",
                     flush=True,
                 )
             else:
-                # Obtener el modelo de embedding interno del pipeline de diarización.
-                # En pyannote/speaker-diarization-3.1, el sub-pipeline de embedding
-                # está expuesto como `pipeline._embedding` (modelo SpeechBrain/ECAPA-TDNN).
-                embedding_model = None
-                for attr in ("_embedding", "embedding_model", "embedding"):
-                    if hasattr(pipeline, attr):
-                        candidate = getattr(pipeline, attr)
-                        # Verificamos que sea callable (un modelo Inference, no un dict)
-                        if callable(candidate):
-                            embedding_model = candidate
-                            print(
-                                f"🔍 Modelo de embedding encontrado en pipeline.{attr}",
-                                flush=True,
-                            )
-                            break
+                if embedding_model is None:
+                    embedding_model = _find_embedding_model(pipeline)
 
                 if embedding_model is not None:
                     # Logear el device del modelo para diagnóstico
@@ -243,75 +413,45 @@ def main():
                             f"💻 Device del modelo de embedding: {embedding_model.device}",
                             flush=True,
                         )
-
-                    # Agrupar los segmentos (post-filtrado) por hablante para extraer
-                    # el embedding de cada ventana y calcular el centroide.
-                    # Recorte manual del waveform: PretrainedSpeakerEmbedding espera
-                    # tensor (batch, channel, samples) — NO un dict con Segment.
-
-                    # Diccionario: speaker -> lista de vectores numpy
-                    speaker_vectors: dict[str, list] = {}
-                    first_emb_logged = False
-                    for seg in final_segments:
-                        spk = seg["speaker"]
-
-                        # 1.1 — Filtrar segmentos demasiado cortos (< 0.5s)
-                        duration = seg["end"] - seg["start"]
-                        if duration < 0.5:
-                            print(
-                                f"⏭️  Segmento descartado por duración corta ({duration:.3f}s): {spk} [{seg['start']:.2f}s-{seg['end']:.2f}s]",
-                                flush=True,
-                            )
-                            continue
-
-                        try:
-                            # 1.2 — Recorte manual del waveform
-                            start_sample = int(seg["start"] * sample_rate)
-                            end_sample   = int(seg["end"]   * sample_rate)
-                            segment = waveform[:, start_sample:end_sample]   # (1, n_seg)
-
-                            # 3.1 — Guard de tensor vacío
-                            if segment.shape[-1] == 0:
-                                print(
-                                    f"⚠️  Segmento vacío tras recorte; descartando: {spk} [{seg['start']:.2f}s-{seg['end']:.2f}s]",
-                                    flush=True,
-                                )
-                                continue
-
-                            segment = segment.unsqueeze(0)                   # (1, 1, n_seg)
-                            if hasattr(embedding_model, "device"):
-                                segment = segment.to(embedding_model.device)
-
-                            emb = embedding_model(segment)
-
-                            # 1.3 — Post-procesamiento del vector resultante
-                            vec = np.squeeze(np.asarray(emb, dtype=np.float32))
-                            if not first_emb_logged:
-                                print(
-                                    f"🔬 Shape del embedding (diagnóstico primer segmento): {np.asarray(emb, dtype=np.float32).shape}",
-                                    flush=True,
-                                )
-                                first_emb_logged = True
-
-                            if vec.ndim == 0 or vec.size == 0:
-                                continue
-                            speaker_vectors.setdefault(spk, []).append(vec)
-                        except Exception as e_seg:
-                            # Un segmento fallido no cancela el proceso completo
-                            print(
-                                f"⚠️  Error extrayendo embedding de {spk} [{seg['start']:.2f}s-{seg['end']:.2f}s]: {e_seg}",
-                                flush=True,
-                            )
-
-                    # Calcular centroide (promedio normalizado) por hablante
-                    for spk, vecs in speaker_vectors.items():
-                        centroid = np.mean(np.stack(vecs, axis=0), axis=0)
-                        # Normalizar a longitud unitaria (necesario para similitud coseno)
-                        norm = np.linalg.norm(centroid)
-                        if norm > 1e-8:
-                            centroid = centroid / norm
-                        # Convertir a lista Python de floats para serialización JSON
-                        speaker_embeddings[spk] = centroid.tolist()
+                        stage["device"] = str(embedding_model.device)
+
+                    # Ventanas acotadas de cada segmento (post-filtrado), agrupadas
+                    # por longitud y embebidas por lotes; el centroide de cada
+                    # hablante es la media normalizada de sus segmentos.
+                    with perf.stage("embedding_extract", audio_seconds=audio_seconds):
+                        vectors, emb_stats = embedding_batches.extract(
+                            embedding_model,
+                            waveform,
+                            sample_rate,
+                            final_segments,
+                            batch_size=args.embedding_batch_size,
+                            log=lambda msg: print(msg, flush=True),
+                            on_batch=lambda done, total: progress(80 + int(8 * done / total)),
+                        )
+                    stage.update(emb_stats)
+                    if emb_stats["skipped_short"]:
+                        print(
+                            f"⏭️  {emb_stats['skipped_short']} segmento(s) descartado(s) por duración corta "
+                            f"(< {embedding_batches.MIN_SEGMENT_SECONDS}s)",
+                            flush=True,
+                        )
+                    if vectors is not None:
+                        print(
+                            f"🔬 {emb_stats['windows']} ventanas en {emb_stats['batches']} lotes "
+                            f"(dimensión {vectors.shape[1]})",
+                            flush=True,
+                        )
+                        # Caché para --recluster: segmentos antes de unir locutores
+                        embedding_cache.save(
+                            embedding_cache.cache_path(args.output_json),
+                            final_segments,
+                            vectors,
+                        )
+                    with perf.stage("assign_speakers") as assign_stage:
+                        final_segments, speaker_embeddings = _assign_speakers(
+                            args, assign_stage, final_segments, vectors
+                        )
+                        assign_stage["speakers"] = len(speaker_embeddings)
 
                     print(
                         f"✅ Embeddings extraídos para {len(speaker_embeddings)} hablante(s): {list(speaker_embeddings.keys())}",
@@ -333,35 +473,151 @@ def main():
                 flush=True,
             )
             speaker_embeddings = {}
+        stage["speakers"] = len(speaker_embeddings)
+
+    progress(90)
+
+    output = _write_result(args, perf, final_segments, speaker_embeddings)
+    progress(100)
+    return output
+
+
+def _assign_speakers(args, stage, segments, vectors):
+    """Une locutores sobre-segmentados (--merge_similarity) y calcula los centroides.
+    Devuelve (segmentos, {locutor: centroide})."""
+    # Límites de hablantes: el modo troceado solo los aplica por ventana, así que
+    # el máximo se impone aquí también (uniendo los más parecidos). Solo llega
+    # por flags explícitos: una cifra dudosa uniría a personas distintas
+    max_speakers = args.num_speakers or args.max_speakers
+    if vectors is None or (args.merge_similarity <= 0 and not max_speakers):
+        return segments, embedding_batches.speaker_centroids(segments, vectors)
+    # Une etiquetas de la misma persona por similitud de centroides
+    segments, speaker_embeddings, merge_stats = speaker_consolidation.consolidate(
+        segments,
+        vectors,
+        args.merge_similarity if args.merge_similarity > 0 else float("inf"),
+        min_speakers=args.num_speakers or args.min_speakers or 1,
+        max_speakers=max_speakers,
+    )
+    stage["speakers_merged"] = len(merge_stats["merged"])
+    stage["speakers_forced"] = len(merge_stats["forced"])
+    for label, target in merge_stats["merged"].items():
+        if label in merge_stats["forced"]:
+            print(
+                f"⚠️  {label} unido a {target} por el límite de {max_speakers} hablantes "
+                "(similitud por debajo del umbral)",
+                flush=True,
+            )
+        else:
+            print(f"🧩 {label} unido a {target} (misma voz)", flush=True)
+    return segments, speaker_embeddings
+
+
+def _write_result(args, perf, final_segments, speaker_embeddings):
+    """Compone el JSON v2.0 (con speaker_matches si hay --speaker_index) y lo escribe."""
+    # --- COMPOSICIÓN DEL RESULTADO FINAL ---
+    # Mantenemos retrocompatibilidad: si no hay embeddings, el nodo puede
+    # seguir leyendo el JSON antiguo. La presencia de "version" y
+    # "speaker_embeddings" indica el nuevo formato.
+    # Con el .npy los lectores antiguos ven "speaker_embeddings" vacío (sin
+    # embeddings) salvo en el modo "both", que mantiene también las listas.
+    output = {
+        "version": OUTPUT_VERSION,
+        "segments": final_segments,
+        "speaker_embeddings": speaker_embeddings if args.embeddings_format != "npy" else {},
+    }
+    if speaker_embeddings and args.embeddings_format != "inline":
+        with perf.stage("write_embeddings") as stage:
+            output["speaker_embeddings_file"] = embedding_cache.save_centroids(
+                args.output_json, speaker_embeddings, dtype=args.embedding_dtype
+            )
+            stage["dtype"] = args.embedding_dtype
+
+    # --- IDENTIFICACIÓN CONTRA PERFILES CONOCIDOS (opcional) ---
+    # Todos los hablantes se consultan a la vez contra el índice persistente;
+    # "speaker_matches" es un campo extra, los lectores de v2.0 lo ignoran.
+    if args.speaker_index and speaker_embeddings:
+        with perf.stage("resolve_speakers") as stage:
+            try:
+                index = speaker_index.SpeakerIndex(args.speaker_index)
+                output["speaker_matches"] = index.resolve(speaker_embeddings, args.speaker_top_k)
+                stage["enrolled"] = len(index)
+                print(
+                    f"🪪 Hablantes consultados contra {len(index)} embeddings enrolados",
+                    flush=True,
+                )
+            except Exception as e:
+                print(f"⚠️  No se pudo consultar el índice de hablantes: {e}", flush=True)
 
-        print("PROGRESS:90", flush=True)
-
-        # --- COMPOSICIÓN DEL RESULTADO FINAL ---
-        # Mantenemos retrocompatibilidad: si no hay embeddings, el nodo puede
-        # seguir leyendo el JSON antiguo. La presencia de "version" y
-        # "speaker_embeddings" indica el nuevo formato.
-        output = {
-            "version": OUTPUT_VERSION,
-            "segments": final_segments,
-            "speaker_embeddings": speaker_embeddings,
-        }
-
+    with perf.stage("write_output"):
         # Guardar resultados
         os.makedirs(os.path.dirname(args.output_json), exist_ok=True)
         with open(args.output_json, "w", encoding="utf-8") as f:
             json.dump(output, f, indent=2)
 
-        print(f"📝 Resultados guardados en: {args.output_json}", flush=True)
-        print("PROGRESS:100", flush=True)
+    print(f"📝 Resultados guardados en: {args.output_json}", flush=True)
+    return output
+
+
+def run_recluster(args, perf):
+    """Modo --recluster: hablantes, centroides y JSON desde la caché, sin pyannote ni audio."""
+    path = embedding_cache.cache_path(args.output_json)
+    print(f"♻️  Reasignando hablantes desde {path}", flush=True)
+    with perf.stage("load_cache") as stage:
+        segments, vectors = embedding_cache.load(path)
+        stage["segments"] = len(segments)
+    events.progress(30)
+    with perf.stage("assign_speakers") as stage:
+        segments, speaker_embeddings = _assign_speakers(args, stage, segments, vectors)
+        stage["speakers"] = len(speaker_embeddings)
+    events.progress(60)
+    _write_result(args, perf, segments, speaker_embeddings)
+    print(
+        f"✅ {len(speaker_embeddings)} hablante(s) con similitud de unión {args.merge_similarity}",
+        flush=True,
+    )
+    events.progress(100)
+
+
+def _recluster(args, perf):
+    try:
+        run_recluster(args, perf)
+    except FileNotFoundError:
+        message = (
+            f"No hay caché de embeddings en {embedding_cache.cache_path(args.output_json)}: "
+            "diariza la grabación una vez antes de usar --recluster"
+        )
+        sys.stderr.write(f"FATAL_ERROR: {message}\n")
+        events.error(message)
+        sys.exit(1)
+    except Exception as e:
+        sys.stderr.write(f"FATAL_ERROR: {str(e)}\n")
+        sys.stderr.write(traceback.format_exc())
+        events.error(e)
+        sys.exit(1)
+
 
+def _run(args, perf):
+    print(f"🚀 Iniciando Diarización para: {args.audio_file}", flush=True)
+    events.progress(5)
+
+    if not os.path.exists(args.audio_file):
+        print(f"❌ Error: El archivo de audio no existe: {args.audio_file}", flush=True)
+        sys.exit(1)
+
+    try:
+        pipeline = load_pipeline(args.hf_token, perf)
+        diarize(pipeline, args, perf)
     except ImportError:
         sys.stderr.write(
             "FATAL_ERROR: pyannote.audio no está instalado. Ejecuta 'pip install pyannote.audio'\n"
         )
+        events.error("pyannote.audio no está instalado")
         sys.exit(1)
     except Exception as e:
         sys.stderr.write(f"FATAL_ERROR: {str(e)}\n")
         sys.stderr.write(traceback.format_exc())
+        events.error(e)
         sys.exit(1)
 
 
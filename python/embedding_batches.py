@@ -0,0 +1,192 @@
+"""
+embedding_batches.py — Extracción de embeddings de locutor por lotes (diarization_analyzer).
+
+Antes cada segmento diarizado pasaba por el modelo de embedding por separado
+(lote de 1). Ahora:
+  1. Cada segmento de al menos MIN_SEGMENT_SECONDS se divide en ventanas de
+     como mucho MAX_WINDOW_SECONDS (partes iguales), así la memoria del lote
+     está acotada.
+  2. Las ventanas se ordenan por longitud y se agrupan en lotes de hasta
+     `batch_size` cuya longitud no varía más de BUCKET_RATIO, para que el
+     relleno con ceros sea mínimo.
+  3. Cada lote se pasa al modelo con `masks` (PretrainedSpeakerEmbedding de
+     pyannote ignora las muestras enmascaradas). Si el modelo no acepta
+     máscaras, el lote se recorta a la ventana más corta.
+  4. El vector de un segmento es la media de sus ventanas y el centroide de
+     cada locutor la media de sus segmentos, normalizado a norma 1: mismo
+     formato que antes en `speaker_embeddings` del JSON v2.0.
+"""
+
+import math
+
+import numpy as np
+
+MIN_SEGMENT_SECONDS = 0.5
+MAX_WINDOW_SECONDS = 10.0
+BUCKET_RATIO = 1.25
+DEFAULT_BATCH_SIZE = 32
+
+
+def segment_windows(segments, sample_rate, total_samples, max_window=MAX_WINDOW_SECONDS):
+    """[(índice de segmento, muestra inicial, muestra final)] de las ventanas a embeber."""
+    windows = []
+    for idx, seg in enumerate(segments):
+        if seg["end"] - seg["start"] < MIN_SEGMENT_SECONDS:
+            continue
+        start = max(0, int(seg["start"] * sample_rate))
+        end = min(total_samples, int(seg["end"] * sample_rate))
+        if end <= start:
+            continue
+        count = max(1, math.ceil((end - start) / (max_window * sample_rate)))
+        bounds = np.linspace(start, end, count + 1).astype(int)
+        windows.extend((idx, int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a)
+    return windows
+
+
+def length_buckets(lengths, batch_size=DEFAULT_BATCH_SIZE, ratio=BUCKET_RATIO):
+    """Agrupa índices (ordenados por longitud) en lotes de longitud parecida."""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batch = []
+    for i in order:
+        if batch and (len(batch) >= batch_size or lengths[i] > lengths[batch[0]] * ratio):
+            yield batch
+            batch = []
+        batch.append(i)
+    if batch:
+        yield batch
+
+
+def _to_numpy(embeddings):
+    if hasattr(embeddings, "detach"):
+        embeddings = embeddings.detach().cpu().numpy()
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+class BatchEmbedder:
+    """Ejecuta el modelo de embedding sobre lotes de ventanas de un waveform (1, n) de torch."""
+
+    def __init__(self, model, waveform, batch_size=DEFAULT_BATCH_SIZE, log=print, on_batch=None):
+        self.model = model
+        self.waveform = waveform
+        self.batch_size = max(1, int(batch_size))
+        self.log = log
+        # on_batch(ventanas hechas, total) tras cada lote
+        self.on_batch = on_batch
+        self.use_masks = True
+        self.batches = 0
+        self.failed = 0
+
+    def _batch_tensors(self, windows, crop):
+        import torch
+
+        lengths = [end - start for _, start, end in windows]
+        width = min(lengths) if crop else max(lengths)
+        batch = torch.zeros((len(windows), 1, width), dtype=self.waveform.dtype)
+        masks = torch.zeros((len(windows), width), dtype=torch.float32)
+        for row, (_, start, end) in enumerate(windows):
+            n = min(end - start, width)
+            batch[row, 0, :n] = self.waveform[0, start: start + n]
+            masks[row, :n] = 1.0
+        device = getattr(self.model, "device", None)
+        if device is not None:
+            batch = batch.to(device)
+            masks = masks.to(device)
+        return batch, masks
+
+    def _run(self, windows):
+        if self.use_masks:
+            batch, masks = self._batch_tensors(windows, crop=False)
+            try:
+                return _to_numpy(self.model(batch, masks=masks))
+            except TypeError:
+                self.use_masks = False
+                self.log("ℹ️  El modelo de embedding no acepta máscaras: los lotes se recortan a la ventana más corta")
+        batch, _ = self._batch_tensors(windows, crop=True)
+        return _to_numpy(self.model(batch))
+
+    def embed(self, windows):
+        """Matriz (n_ventanas, dim) con NaN en las ventanas que fallaron."""
+        vectors = None
+        done = 0
+        lengths = [end - start for _, start, end in windows]
+        for bucket in length_buckets(lengths, self.batch_size):
+            group = [windows[i] for i in bucket]
+            try:
+                result = self._run(group).reshape(len(group), -1)
+            except Exception as e:
+                # Un lote fallido no cancela el resto: reintento ventana a ventana
+                self.log(f"⚠️  Lote de {len(group)} ventanas falló ({e}); reintentando una a una")
+                result = None
+                rows = []
+                for window in group:
+                    try:
+                        rows.append(self._run([window]).reshape(-1))
+                    except Exception:
+                        rows.append(None)
+                        self.failed += 1
+                dim = next((r.size for r in rows if r is not None), None)
+                if dim is not None:
+                    result = np.stack([r if r is not None else np.full(dim, np.nan, np.float32) for r in rows])
+            self.batches += 1
+            done += len(group)
+            if self.on_batch is not None:
+                self.on_batch(done, len(windows))
+            if result is None:
+                continue
+            if vectors is None:
+                vectors = np.full((len(windows), result.shape[1]), np.nan, dtype=np.float32)
+            vectors[bucket] = result
+        return vectors
+
+
+def segment_vectors(segments, windows, window_vectors):
+    """Media de las ventanas de cada segmento: matriz (n_segmentos, dim), NaN si no hay ninguna válida."""
+    if window_vectors is None:
+        return None
+    sums = np.zeros((len(segments), window_vectors.shape[1]), dtype=np.float64)
+    counts = np.zeros(len(segments), dtype=np.int64)
+    for (idx, _, _), vec in zip(windows, window_vectors):
+        if np.all(np.isfinite(vec)):
+            sums[idx] += vec
+            counts[idx] += 1
+    out = np.full(sums.shape, np.nan, dtype=np.float32)
+    valid = counts > 0
+    out[valid] = (sums[valid] / counts[valid, None]).astype(np.float32)
+    return out
+
+
+def speaker_centroids(segments, vectors):
+    """{locutor: centroide normalizado (lista de floats)} a partir de los vectores por segmento."""
+    grouped = {}
+    if vectors is None:
+        return grouped
+    for seg, vec in zip(segments, vectors):
+        if np.all(np.isfinite(vec)):
+            grouped.setdefault(seg["speaker"], []).append(vec)
+    centroids = {}
+    for spk, vecs in grouped.items():
+        centroid = np.mean(np.stack(vecs, axis=0), axis=0)
+        # Normalizar a longitud unitaria (necesario para similitud coseno)
+        norm = np.linalg.norm(centroid)
+        if norm > 1e-8:
+            centroid = centroid / norm
+        centroids[spk] = centroid.tolist()
+    return centroids
+
+
+def extract(model, waveform, sample_rate, segments, batch_size=DEFAULT_BATCH_SIZE, log=print, on_batch=None):
+    """Devuelve (vectores por segmento | None, estadísticas)."""
+    windows = segment_windows(segments, sample_rate, waveform.shape[-1])
+    embedder = BatchEmbedder(model, waveform, batch_size, log=log, on_batch=on_batch)
+    window_vectors = embedder.embed(windows) if windows else None
+    vectors = segment_vectors(segments, windows, window_vectors)
+    stats = {
+        "segments": len(segments),
+        "skipped_short": sum(1 for s in segments if s["end"] - s["start"] < MIN_SEGMENT_SECONDS),
+        "windows": len(windows),
+        "batches": embedder.batches,
+        "batch_size": embedder.batch_size,
+        "masked": embedder.use_masks,
+        "failed_windows": embedder.failed,
+    }
+    return vectors, stats
@@ -0,0 +1,99 @@
+"""
+embedding_cache.py — Archivos binarios de embeddings de la diarización.
+
+Extraer los embeddings es, junto con pyannote, lo más caro de la diarización,
+y todo lo que viene después (unión de locutores por similitud, centroides,
+identificación contra el índice) solo necesita los segmentos y sus vectores.
+Al terminar la extracción se guardan junto al JSON de salida, en
+`<salida>.segments.npz`:
+
+  starts, ends   float64 (n,)    límites de cada segmento (ya filtrados y unidos)
+  speakers       str (n,)        etiqueta de pyannote, antes de unir locutores
+  vectors        float32 (n, d)  embedding medio del segmento (NaN si es demasiado corto)
+
+Con --recluster, diarization_analyzer.py reasigna hablantes desde este archivo
+con umbrales nuevos en segundos, sin cargar pyannote ni el audio.
+
+Los centroides por hablante se escriben además en `<salida>.embeddings.npy`
+(matriz hablantes × dim en float32 o float16) en lugar de como listas de
+decimales en el JSON, que con indent=2 ocupan una línea por número. El JSON
+los referencia con:
+
+  "speaker_embeddings_file": {"path", "format": "npy", "dtype", "dim", "speakers": [...]}
+
+donde `path` es relativo al JSON y la fila i es el centroide de speakers[i].
+"""
+
+import os
+
+import numpy as np
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".segments.npz"
+SIDECAR_SUFFIX = ".embeddings.npy"
+SIDECAR_DTYPES = ("float32", "float16")
+
+
+def cache_path(output_json):
+    return os.path.splitext(output_json)[0] + CACHE_SUFFIX
+
+
+def save(path, segments, vectors):
+    """Escribe la caché de forma atómica y devuelve su ruta."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(
+            f,
+            version=np.array(CACHE_VERSION),
+            starts=np.array([s["start"] for s in segments], dtype=np.float64),
+            ends=np.array([s["end"] for s in segments], dtype=np.float64),
+            speakers=np.array([s["speaker"] for s in segments], dtype=str),
+            vectors=np.asarray(vectors, dtype=np.float32),
+        )
+    os.replace(tmp, path)
+    return path
+
+
+def load(path):
+    """(segmentos [{start, end, speaker}], vectores). Lanza FileNotFoundError si no existe
+    y ValueError si la versión no es compatible."""
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data["version"]) if "version" in data else None
+        if version != CACHE_VERSION:
+            raise ValueError(f"versión de caché de embeddings no soportada: {version}")
+        segments = [
+            {"start": float(start), "end": float(end), "speaker": str(speaker)}
+            for start, end, speaker in zip(data["starts"], data["ends"], data["speakers"])
+        ]
+        vectors = data["vectors"]
+    return segments, vectors
+
+
+def sidecar_path(output_json):
+    return os.path.splitext(output_json)[0] + SIDECAR_SUFFIX
+
+
+def save_centroids(output_json, centroids, dtype="float32"):
+    """Escribe {locutor: centroide} en el .npy junto a output_json y devuelve la referencia para el JSON."""
+    speakers = list(centroids)
+    matrix = np.asarray([centroids[s] for s in speakers], dtype=dtype)
+    path = sidecar_path(output_json)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".tmp", "wb") as f:
+        np.save(f, matrix)
+    os.replace(path + ".tmp", path)
+    return {
+        "path": os.path.basename(path),
+        "format": "npy",
+        "dtype": dtype,
+        "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+        "speakers": speakers,
+    }
+
+
+def load_centroids(output_json, reference):
+    """{locutor: centroide float32} a partir de la referencia `speaker_embeddings_file` del JSON."""
+    path = os.path.join(os.path.dirname(output_json), reference["path"])
+    matrix = np.load(path, allow_pickle=False).astype(np.float32)
+    return dict(zip(reference["speakers"], matrix))
@@ -0,0 +1,168 @@
+"""
+events.py — Protocolo de eventos JSON-lines entre los scripts Python y Electron (--events).
+
+Con `--events`, cada evento es una línea `EVENT:{json}` en stdout (mismo estilo
+que `METRIC:{json}` / `METADATA:{json}`) y todo lo demás (logs con emojis,
+warnings de librerías) se redirige a stderr, así Electron no tiene que buscar
+patrones en texto libre. Cada evento lleva la versión del protocolo y el tiempo
+desde el arranque:
+
+  {"v": 1, "type": "progress", "t": 12.3, "value": 42}
+
+Tipos:
+  - stage:          {name, state: start|end, status?}
+  - progress:       {value} 0-100, monótono; como mucho uno cada PROGRESS_INTERVAL
+                    segundos (los intermedios se fusionan en el último valor)
+  - metric:         {metric} la misma métrica por etapa de perf_metrics
+  - partial_result: {track, segments: [{start, end, text}]} agrupados cada
+                    PARTIAL_INTERVAL segundos
+  - model_selection: la elección de --deadline/--target_rtf {model, beam_size,
+                    cpu_threads, eta_s, speed, source, budget_s, audio_s, fits}
+  - draft_ready:    {model, elapsed_s} el borrador de --draft_model ya está escrito
+  - error:          {message, fatal}
+
+Sin `--events` se mantiene el formato clásico (`PROGRESS:N`, `METRIC:{json}`,
+`MODEL_SELECTION:{json}`, `DRAFT_READY:{json}` en stdout), y los eventos sin
+equivalente clásico no se emiten.
+"""
+
+import atexit
+import json
+import sys
+import threading
+import time
+
+PROTOCOL_VERSION = 1
+PREFIX = "EVENT:"
+PROGRESS_INTERVAL = 0.25
+PARTIAL_INTERVAL = 1.0
+
+
+class EventStream:
+    def __init__(self, progress_interval=PROGRESS_INTERVAL, partial_interval=PARTIAL_INTERVAL):
+        self.enabled = False
+        self.stream = None
+        self.progress_interval = progress_interval
+        self.partial_interval = partial_interval
+        self._lock = threading.RLock()
+        self._t0 = time.perf_counter()
+        self._last_progress = -1
+        self._last_progress_at = 0.0
+        self._pending_progress = None
+        self._partials = {}
+        self._last_partial_at = 0.0
+
+    def enable(self):
+        """Activa el protocolo: stdout queda para eventos y los prints pasan a stderr."""
+        with self._lock:
+            if self.enabled:
+                return
+            self.stream = sys.stdout
+            sys.stdout = sys.stderr
+            self.enabled = True
+            atexit.register(self.close)
+
+    def _write(self, type_, fields):
+        event = {"v": PROTOCOL_VERSION, "type": type_, "t": round(time.perf_counter() - self._t0, 3)}
+        event.update(fields)
+        self.stream.write(PREFIX + json.dumps(event, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
+    def emit(self, type_, **fields):
+        """Emite un evento tras vaciar el progreso y los parciales pendientes (mantiene el orden)."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._flush_pending()
+            self._write(type_, fields)
+
+    def _flush_pending(self):
+        if self._pending_progress is not None:
+            value, self._pending_progress = self._pending_progress, None
+            self._last_progress_at = time.perf_counter()
+            self._write("progress", {"value": value})
+        for track, segments in self._partials.items():
+            if segments:
+                self._write("partial_result", {"track": track, "segments": segments})
+        self._partials = {}
+        self._last_partial_at = time.perf_counter()
+
+    def progress(self, value):
+        value = max(0, min(100, int(value)))
+        if not self.enabled:
+            with self._lock:
+                if value != self._last_progress:
+                    self._last_progress = value
+                    print(f"PROGRESS:{value}", flush=True)
+            return
+        with self._lock:
+            if value <= self._last_progress:
+                return
+            self._last_progress = value
+            now = time.perf_counter()
+            if value >= 100 or now - self._last_progress_at >= self.progress_interval:
+                self._pending_progress = None
+                self._last_progress_at = now
+                self._write("progress", {"value": value})
+            else:
+                self._pending_progress = value
+
+    def partial_result(self, track, segments):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._partials.setdefault(track, []).extend(
+                {"start": round(s["start"], 2), "end": round(s["end"], 2), "text": s["text"]}
+                for s in segments
+            )
+            if time.perf_counter() - self._last_partial_at >= self.partial_interval:
+                self._flush_pending()
+
+    def metric(self, metric):
+        if self.enabled:
+            self.emit("metric", metric=metric)
+        else:
+            print(f"METRIC:{json.dumps(metric, ensure_ascii=False)}", flush=True)
+
+    def model_selection(self, choice):
+        if self.enabled:
+            self.emit("model_selection", **choice)
+        else:
+            print(f"MODEL_SELECTION:{json.dumps(choice)}", flush=True)
+
+    def draft_ready(self, model, elapsed_s):
+        if self.enabled:
+            self.emit("draft_ready", model=model, elapsed_s=elapsed_s)
+        else:
+            print(f"DRAFT_READY:{json.dumps({'model': model, 'elapsed_s': elapsed_s})}", flush=True)
+
+    def stage(self, name, state, **fields):
+        self.emit("stage", name=name, state=state, **fields)
+
+    def error(self, message, fatal=True):
+        """Los errores siguen saliendo por stderr (FATAL_ERROR:...) además del evento."""
+        self.emit("error", message=str(message), fatal=fatal)
+
+    def close(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._flush_pending()
+
+
+_stream = EventStream()
+
+enable = _stream.enable
+emit = _stream.emit
+progress = _stream.progress
+partial_result = _stream.partial_result
+metric = _stream.metric
+model_selection = _stream.model_selection
+draft_ready = _stream.draft_ready
+stage = _stream.stage
+error = _stream.error
+close = _stream.close
+
+
+def is_enabled():
+    return _stream.enabled
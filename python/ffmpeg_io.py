@@ -0,0 +1,191 @@
+"""
+ffmpeg_io.py — Acceso directo a ffprobe/ffmpeg: metadatos, decodificación parcial y completa.
+
+Usa los mismos binarios que pydub (`AudioSegment.ffprobe` / `AudioSegment.converter`),
+que main() apunta a los bundled cuando se pasan --ffmpeg/--ffprobe.
+"""
+
+import json
+import re
+import subprocess
+import tempfile
+
+import numpy as np
+
+PROBE_TIMEOUT_SECONDS = 30
+DECODE_TIMEOUT_SECONDS = 60
+# Pasada completa de volumedetect (solo se decodifica, sin copiar el audio a Python)
+LEVELS_TIMEOUT_SECONDS = 600
+_RE_VOLUME = re.compile(r"(mean|max)_volume:\s*(-?inf|-?[\d.]+) dB")
+# Margen sobre la duración declarada (los contenedores redondean) y crecimiento si se queda corto
+STREAM_SLACK_SECONDS = 1.0
+STREAM_GROWTH = 1.5
+STREAM_INITIAL_SECONDS = 600  # sin duración declarada (webm de MediaRecorder)
+
+
+def ffmpeg_binary():
+    from pydub import AudioSegment
+
+    return AudioSegment.converter
+
+
+def ffprobe_binary():
+    # AudioSegment.ffprobe solo existe si main() lo configuró con --ffprobe
+    from pydub import AudioSegment
+    from pydub.utils import get_prober_name
+
+    return getattr(AudioSegment, "ffprobe", None) or get_prober_name()
+
+
+def _float_or_none(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value == value else None  # descarta NaN
+
+
+def probe(path):
+    """Metadatos del primer stream de audio sin decodificar.
+
+    Devuelve {has_audio, duration, sample_rate, channels, codec}; `duration` es
+    None cuando el contenedor no la declara (p. ej. webm de MediaRecorder).
+    Lanza FileNotFoundError si no hay ffprobe y RuntimeError si ffprobe falla."""
+    cmd = [
+        ffprobe_binary(),
+        "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "format=duration:stream=codec_name,sample_rate,channels,duration",
+        "-of", "json",
+        path,
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=PROBE_TIMEOUT_SECONDS)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or f"ffprobe terminó con código {proc.returncode}")
+
+    data = json.loads(proc.stdout or "{}")
+    streams = data.get("streams") or []
+    stream = streams[0] if streams else {}
+    duration = _float_or_none(stream.get("duration"))
+    if duration is None:
+        duration = _float_or_none(data.get("format", {}).get("duration"))
+    return {
+        "has_audio": bool(streams),
+        "duration": duration,
+        "sample_rate": int(stream["sample_rate"]) if stream.get("sample_rate") else None,
+        "channels": stream.get("channels"),
+        "codec": stream.get("codec_name"),
+    }
+
+
+def levels(path):
+    """(pico, RMS) lineales del archivo completo (mono) con el filtro volumedetect de ffmpeg.
+
+    Lanza RuntimeError si ffmpeg falla o no informa los niveles."""
+    cmd = [
+        ffmpeg_binary(),
+        "-nostdin",
+        "-v", "info",
+        "-i", path,
+        "-vn",
+        "-ac", "1",
+        "-af", "volumedetect",
+        "-f", "null",
+        "-",
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True, timeout=LEVELS_TIMEOUT_SECONDS)
+    found = dict((kind, value) for kind, value in _RE_VOLUME.findall(proc.stderr))
+    if proc.returncode != 0 or len(found) < 2:
+        raise RuntimeError(
+            proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"ffmpeg terminó con código {proc.returncode}"
+        )
+
+    def linear(db):
+        return 0.0 if "inf" in db else 10 ** (float(db) / 20)
+
+    return linear(found["max"]), linear(found["mean"])
+
+
+def decode_window(path, start, seconds, sample_rate=16000):
+    """Decodifica [start, start + seconds) como float32 mono a `sample_rate`.
+
+    El -ss va antes de -i para que ffmpeg busque en el contenedor en lugar de
+    decodificar todo lo anterior."""
+    cmd = [
+        ffmpeg_binary(),
+        "-nostdin",
+        "-v", "error",
+        "-ss", f"{max(0.0, start):.3f}",
+        "-t", f"{seconds:.3f}",
+        "-i", path,
+        "-vn",
+        "-ac", "1",
+        "-ar", str(sample_rate),
+        "-f", "f32le",
+        "-",
+    ]
+    proc = subprocess.run(cmd, capture_output=True, timeout=DECODE_TIMEOUT_SECONDS)
+    if proc.returncode != 0:
+        raise RuntimeError(
+            proc.stderr.decode("utf-8", "replace").strip()
+            or f"ffmpeg terminó con código {proc.returncode}"
+        )
+    return np.frombuffer(proc.stdout, dtype=np.float32)
+
+
+def decode_stream(path, sample_rate=16000, duration=None):
+    """Decodifica el archivo completo a float32 mono leyendo la salida de ffmpeg
+    directamente sobre un buffer numpy reservado de antemano.
+
+    Con la duración de ffprobe el buffer se reserva una sola vez (pico de memoria
+    ≈ una copia de la forma de onda); si no se conoce, crece por bloques. Devuelve
+    una vista del buffer con las muestras decodificadas."""
+    if duration is None:
+        try:
+            duration = probe(path)["duration"]
+        except Exception:
+            duration = None
+    seconds = duration + STREAM_SLACK_SECONDS if duration else STREAM_INITIAL_SECONDS
+    buffer = np.empty(int(seconds * sample_rate), dtype=np.float32)
+
+    cmd = [
+        ffmpeg_binary(),
+        "-nostdin",
+        "-v", "error",
+        "-i", path,
+        "-vn",
+        "-ac", "1",
+        "-ar", str(sample_rate),
+        "-f", "f32le",
+        "-",
+    ]
+    # stderr a un fichero temporal: con una tubería ffmpeg podría bloquearse si la llena
+    with tempfile.TemporaryFile() as errors:
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=errors)
+        filled = 0  # bytes escritos en el buffer
+        try:
+            while True:
+                view = memoryview(buffer).cast("B")
+                if filled == len(view):
+                    buffer = _grow(buffer)
+                    continue
+                read = proc.stdout.readinto(view[filled:])
+                if not read:
+                    break
+                filled += read
+        finally:
+            proc.stdout.close()
+            returncode = proc.wait()
+        if returncode != 0:
+            errors.seek(0)
+            raise RuntimeError(
+                errors.read().decode("utf-8", "replace").strip()
+                or f"ffmpeg terminó con código {returncode}"
+            )
+    return buffer[: filled // buffer.itemsize]
+
+
+def _grow(buffer):
+    grown = np.empty(int(len(buffer) * STREAM_GROWTH) + 1, dtype=buffer.dtype)
+    grown[: len(buffer)] = buffer
+    return grown
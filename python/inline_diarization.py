@@ -0,0 +1,109 @@
+"""
+inline_diarization.py — Diarización dentro del proceso de transcripción (--diarize).
+
+Sin este modo, Electron ejecuta diarization_analyzer.py hasta el final (0–50 %)
+y solo entonces lanza audio_sync_analyzer.py (50–100 %): la pista de sistema se
+decodifica dos veces y pyannote y Whisper nunca se solapan, aunque Whisper no
+necesita la diarización hasta `combine_transcriptions`. Con --diarize:
+  1. El pipeline de pyannote se carga en segundo plano al arrancar, igual que
+     el modelo Whisper.
+  2. La diarización es una etapa más del grafo (stage_graph.py) que corre en
+     paralelo con la transcripción. La pista de sistema se decodifica con
+     ffmpeg_io.decode_stream, como en el script independiente: float32 mono a
+     16 kHz directamente sobre un único buffer, sin convertir el AudioSegment
+     del analizador (que dejaría varias copias intermedias de la pista entera).
+  3. Solo `combine_and_write` la espera; el JSON v2.0 se escribe igual que con
+     el script independiente, con los embeddings en el .npy (`npy`, igual que
+     cuando Electron lanza diarization_analyzer.py).
+
+Los hilos de CPU se reparten entre los dos modelos: torch recibe
+DIARIZATION_THREAD_SHARE del presupuesto y Whisper el resto. Si pyannote no
+está disponible o la diarización falla, la transcripción sigue sin ella.
+"""
+
+import os
+
+from background_task import BackgroundTask
+from perf_metrics import PerfRecorder
+
+DIARIZATION_THREAD_SHARE = 1 / 3
+
+
+def split_threads(budget):
+    """(hilos de Whisper, hilos de torch) para un presupuesto total de hilos de CPU."""
+    budget = max(2, int(budget))
+    torch_threads = max(1, round(budget * DIARIZATION_THREAD_SHARE))
+    return budget - torch_threads, torch_threads
+
+
+def _no_progress(value):
+    # El progreso global lo marca Whisper; la diarización solo emite sus etapas
+    pass
+
+
+class InlineDiarizer:
+    def __init__(self, hf_token, output_json, torch_threads, speaker_hints=None):
+        self.hf_token = hf_token
+        self.output_json = output_json
+        self.torch_threads = torch_threads
+        # {num_speakers|min_speakers|max_speakers: n}, como en diarization_analyzer.py
+        self.speaker_hints = speaker_hints or {}
+        # Métricas en la sección "diarization_analyzer" de metrics.json, como el script
+        self.perf = PerfRecorder("diarization_analyzer", os.path.dirname(output_json) or ".")
+        self._module = None
+        self._load = None
+
+    def start(self):
+        """Importa pyannote (y torch) y carga el pipeline en segundo plano."""
+
+        def load():
+            import torch
+
+            import diarization_analyzer
+
+            torch.set_num_threads(self.torch_threads)
+            self._module = diarization_analyzer
+            return diarization_analyzer.load_pipeline(
+                self.hf_token, self.perf, progress=_no_progress
+            )
+
+        self._load = BackgroundTask(load, name="pyannote-load").start()
+        return self
+
+    def cancel(self):
+        """Sin pista de sistema útil la diarización no se usa: se descarta sin esperarla."""
+        if self._load is not None:
+            self._load.cancel()
+            self._load = None
+
+    def run(self, audio_file):
+        """Diariza `audio_file` y devuelve sus segmentos, o None si falla."""
+        if self._load is None:
+            return None
+        try:
+            pipeline = self._load.result()
+            self._load = None
+            args = self._module.parse_args(
+                [
+                    "--audio_file", audio_file,
+                    "--hf_token", self.hf_token,
+                    "--output_json", self.output_json,
+                    "--embeddings_format", "npy",
+                    *[
+                        arg
+                        for name, value in self.speaker_hints.items()
+                        for arg in (f"--{name}", str(value))
+                    ],
+                ]
+            )
+            output = self._module.diarize(pipeline, args, self.perf, progress=_no_progress)
+            return output["segments"]
+        except SystemExit:
+            # parse_args ya explicó el error (límites de hablantes no válidos)
+            print("⚠️  Argumentos de diarización no válidos. Continuando sin diarización.", flush=True)
+            return None
+        except Exception as e:
+            print(f"⚠️  Diarización falló: {e}. Continuando sin diarización.", flush=True)
+            return None
+        finally:
+            self.perf.write()
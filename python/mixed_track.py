@@ -0,0 +1,157 @@
+"""
+mixed_track.py — Modo de pista mezclada (--mix_mode): una sola pasada de Whisper para mic + sistema.
+
+Cuando el usuario apenas habla, transcribir el micrófono por separado casi
+duplica el coste (el micro también capta el audio del sistema por el altavoz).
+En este modo el micrófono se alinea, se mezcla con la pista de sistema y se
+transcribe una vez. Cada segmento se atribuye a USUARIO o al sistema comparando,
+frame a frame, la energía del micrófono con la que explicaría el acople del
+sistema (el mismo razonamiento mic/sistema de `create_synchronized_chunks`, pero
+alineado y a 100 ms).
+
+El lag se estima aquí mismo correlando envolventes de energía a 10 ms (FFT sobre
+unos pocos miles de frames por minuto), así la decisión no espera a la
+correlación cruzada fina y la transcripción puede empezar en paralelo con ella.
+Los segmentos atribuidos al usuario se devuelven en tiempo de micrófono para que
+`combine_transcriptions` les aplique la corrección de lag precisa como en modo normal.
+"""
+
+import bisect
+
+import numpy as np
+from pydub import AudioSegment
+
+FRAME_SECONDS = 0.1
+# Energía media mínima para considerar que un frame tiene señal (RMS ≈ 0.003)
+ACTIVE_ENERGY = 1e-5
+# Un frame es del usuario si el mic supera en 6 dB lo que explica el acople del sistema
+USER_DOMINANCE = 4.0
+# Por debajo de esta fracción de frames con voz del usuario, el modo auto mezcla
+USER_ACTIVITY_THRESHOLD = 0.10
+MIX_GAIN_DB = -3.0
+LAG_FRAME_SECONDS = 0.01
+MAX_LAG_SECONDS = 10.0  # mismo límite que la correlación cruzada
+_BLOCK_FRAMES = 100_000
+
+
+def frame_energy(data, sample_rate, frame_seconds=FRAME_SECONDS):
+    """Energía media por frame, por bloques para no duplicar en memoria pistas de horas."""
+    hop = max(1, int(sample_rate * frame_seconds))
+    n_frames = len(data) // hop
+    energy = np.empty(n_frames, dtype=np.float64)
+    for first in range(0, n_frames, _BLOCK_FRAMES):
+        last = min(n_frames, first + _BLOCK_FRAMES)
+        block = np.asarray(data[first * hop: last * hop], dtype=np.float32).reshape(-1, hop)
+        energy[first:last] = np.einsum("ij,ij->i", block, block) / hop
+    return energy
+
+
+def estimate_lag(mic_data, sys_data, sample_rate, max_lag=MAX_LAG_SECONDS):
+    """Lag (s) con el que la fuga del sistema llega al micrófono, por correlación de envolventes."""
+    mic = np.sqrt(frame_energy(mic_data, sample_rate, LAG_FRAME_SECONDS))
+    sys = np.sqrt(frame_energy(sys_data, sample_rate, LAG_FRAME_SECONDS))
+    n = min(len(mic), len(sys))
+    if n < 2:
+        return 0.0
+    mic = mic[:n] - mic[:n].mean()
+    sys = sys[:n] - sys[:n].mean()
+    size = 1 << int(np.ceil(np.log2(2 * n)))
+    corr = np.fft.irfft(np.fft.rfft(mic, size) * np.conj(np.fft.rfft(sys, size)), size)
+    max_shift = min(n - 1, int(max_lag / LAG_FRAME_SECONDS))
+    # corr[k] = Σ mic[t + k]·sys[t]; los desplazamientos negativos están al final
+    candidates = np.concatenate([corr[-max_shift:], corr[: max_shift + 1]]) if max_shift else corr[:1]
+    return float((int(np.argmax(candidates)) - max_shift) * LAG_FRAME_SECONDS)
+
+
+class EnergyAttributor:
+    """Atribuye tramos (en tiempo de sistema) al usuario o al sistema por energía alineada.
+
+    mic_offset(t_sys) devuelve los segundos a sumar a un instante del sistema para
+    obtener el instante equivalente en el micrófono (lag dinámico)."""
+
+    def __init__(self, mic_data, sys_data, sample_rate, mic_offset):
+        self.mic = frame_energy(mic_data, sample_rate)
+        self.sys = frame_energy(sys_data, sample_rate)
+        self.mic_offset = mic_offset
+        mic_aligned, sys_frames = self._aligned(0, len(self.sys))
+        self.noise = float(np.percentile(mic_aligned, 10)) if mic_aligned.size else 0.0
+        # Acople sistema→mic: mediana del ratio en frames donde suena el sistema
+        active = sys_frames > ACTIVE_ENERGY
+        self.bleed = (
+            float(np.median(mic_aligned[active] / sys_frames[active])) if active.any() else 0.0
+        )
+
+    def _aligned(self, first, last):
+        """Frames [first, last) del sistema y los del mic equivalentes (rellenando con 0)."""
+        first, last = max(0, first), min(len(self.sys), last)
+        if last <= first:
+            return np.zeros(0), np.zeros(0)
+        shift = int(round(self.mic_offset(first * FRAME_SECONDS) / FRAME_SECONDS))
+        mic = np.zeros(last - first)
+        lo, hi = max(first + shift, 0), min(last + shift, len(self.mic))
+        if hi > lo:
+            mic[lo - first - shift: hi - first - shift] = self.mic[lo:hi]
+        return mic, self.sys[first:last]
+
+    def _user_frames(self, mic, sys):
+        return (mic > ACTIVE_ENERGY) & (
+            mic > USER_DOMINANCE * (self.bleed * sys + self.noise)
+        )
+
+    def user_activity(self):
+        """Fracción de frames de la grabación en los que habla el usuario."""
+        mic, sys = self._aligned(0, len(self.sys))
+        return float(self._user_frames(mic, sys).mean()) if sys.size else 0.0
+
+    def is_user(self, start, end):
+        """True si la mayoría de los frames con voz de [start, end] son del usuario."""
+        first = int(start / FRAME_SECONDS)
+        last = max(first + 1, int(np.ceil(end / FRAME_SECONDS)))
+        mic, sys = self._aligned(first, last)
+        voiced = (mic > ACTIVE_ENERGY) | (sys > ACTIVE_ENERGY)
+        if not voiced.any():
+            return False
+        return self._user_frames(mic, sys)[voiced].mean() > 0.5
+
+
+def mix_tracks(mic_audio, system_audio, mic_shift_seconds):
+    """Mezcla el mic desplazado `mic_shift_seconds` (tiempo de sistema = tiempo de mic + shift)."""
+    shift_ms = int(round(mic_shift_seconds * 1000))
+    if shift_ms > 0:
+        mic = AudioSegment.silent(duration=shift_ms, frame_rate=mic_audio.frame_rate) + mic_audio
+    else:
+        mic = mic_audio[-shift_ms:]
+    base = system_audio
+    if len(mic) > len(base):
+        base = base + AudioSegment.silent(
+            duration=len(mic) - len(base), frame_rate=base.frame_rate
+        )
+    return base.apply_gain(MIX_GAIN_DB).overlay(mic.apply_gain(MIX_GAIN_DB))
+
+
+def split_result(result, is_user, to_mic_time):
+    """Separa un resultado de la pista mezclada en (mic_result, sys_result).
+
+    Las palabras siguen al segmento en el que empiezan; lo atribuido al usuario
+    se pasa a tiempo de micrófono con to_mic_time(t)."""
+    segments = result["segments"]
+    starts = [s["start"] for s in segments]
+    owners = [is_user(s["start"], s["end"]) for s in segments]
+
+    def shifted(item):
+        offset = to_mic_time(item["start"]) - item["start"]
+        return dict(item, start=item["start"] + offset, end=item["end"] + offset)
+
+    parts = {True: {"segments": [], "words": []}, False: {"segments": [], "words": []}}
+    for segment, user in zip(segments, owners):
+        parts[user]["segments"].append(shifted(segment) if user else segment)
+    for word in result.get("words", []):
+        idx = bisect.bisect_right(starts, word.start) - 1
+        user = owners[idx] if idx >= 0 else False
+        parts[user]["words"].append(
+            word.shifted(to_mic_time(word.start) - word.start) if user else word
+        )
+
+    for part in parts.values():
+        part["text"] = " ".join(s["text"] for s in part["segments"])
+    return parts[True], parts[False]
@@ -0,0 +1,124 @@
+"""
+model_selection.py — Elección automática del modelo Whisper según un plazo (--deadline / --target_rtf).
+
+Con la duración decodificada, el presupuesto de hilos y el historial de
+velocidad medido en este host (perfil de whisper_tuning), se predice cuánto
+tardaría cada modelo/beam y se elige el mayor que termina dentro del plazo.
+
+Fuentes de la predicción, por orden de preferencia:
+  1. Historial real (`speed_history` del perfil): mediana de audio-s/s de las
+     últimas transcripciones con ese modelo, normalizada a hilos y beam.
+  2. Resultado del auto-ajuste (`whisper.<modelo>.audio_s_per_s`).
+  3. Velocidades de referencia conservadoras (PRIOR_SPEED).
+"""
+
+import statistics
+import time
+
+import whisper_tuning
+
+MODEL_ORDER = ["tiny", "base", "small", "medium", "large"]
+BEAM_OPTIONS = (5, 2, 1)
+HISTORY_LIMIT = 20
+
+# audio-s/s aproximados con 4 hilos, int8 y beam 1 en un portátil moderno
+PRIOR_SPEED = {"tiny": 40.0, "base": 25.0, "small": 10.0, "medium": 4.0, "large": 2.0}
+# Segundos de carga del modelo (ya descargado)
+PRIOR_LOAD_SECONDS = {"tiny": 1.0, "base": 1.5, "small": 3.0, "medium": 7.0, "large": 15.0}
+REFERENCE_THREADS = 4
+THREAD_EXPONENT = 0.7
+
+
+def beam_cost(beam_size):
+    """Coste relativo de un beam frente a greedy (beam 1)."""
+    return 1.0 + 0.2 * (max(1, beam_size) - 1)
+
+
+def _thread_scale(threads, reference):
+    return (max(1, threads) / max(1, reference)) ** THREAD_EXPONENT
+
+
+def predict_speed(model, threads, beam_size, profile=None):
+    """Audio-segundos por segundo esperados para `model` con `threads` hilos y `beam_size`.
+    Devuelve (velocidad, origen)."""
+    profile = profile if profile is not None else whisper_tuning.load_host_profile()
+
+    history = profile.get("speed_history", {}).get(model) or []
+    samples = [
+        h["audio_s"] / h["wall_s"]
+        * _thread_scale(threads, h.get("cpu_threads", REFERENCE_THREADS))
+        * beam_cost(h.get("beam_size", 1))
+        for h in history
+        if h.get("wall_s", 0) > 0 and h.get("audio_s", 0) > 0
+    ]
+    if samples:
+        return statistics.median(samples) / beam_cost(beam_size), "history"
+
+    tuned = profile.get("whisper", {}).get(model) or {}
+    if tuned.get("audio_s_per_s"):
+        # El auto-ajuste mide con N workers en paralelo: normalizamos a un solo stream
+        per_stream = tuned["audio_s_per_s"] / max(1, tuned.get("num_workers", 1))
+        speed = (
+            per_stream
+            * _thread_scale(threads, tuned.get("cpu_threads", REFERENCE_THREADS))
+            * beam_cost(tuned.get("beam_size", 1))
+        )
+        return speed / beam_cost(beam_size), "tuned"
+
+    speed = PRIOR_SPEED.get(model, PRIOR_SPEED["small"]) * _thread_scale(
+        threads, REFERENCE_THREADS
+    )
+    return speed / beam_cost(beam_size), "prior"
+
+
+def choose_model(audio_seconds, budget_seconds, threads_for, max_model="large", profile=None):
+    """Elige el mayor modelo (y beam) cuya ETA cabe en `budget_seconds`.
+
+    audio_seconds: segundos de audio que Whisper procesará en serie
+    threads_for:   callable(model) -> hilos que usaría ese modelo
+    Devuelve un dict con model, beam_size, eta_s, speed, source y fits."""
+    profile = profile if profile is not None else whisper_tuning.load_host_profile()
+    ceiling = MODEL_ORDER.index(max_model) if max_model in MODEL_ORDER else len(MODEL_ORDER) - 1
+
+    fallback = None
+    for model in reversed(MODEL_ORDER[: ceiling + 1]):
+        threads = threads_for(model)
+        for beam in BEAM_OPTIONS:
+            speed, source = predict_speed(model, threads, beam, profile)
+            eta = PRIOR_LOAD_SECONDS.get(model, 5.0) + audio_seconds / max(speed, 1e-6)
+            candidate = {
+                "model": model,
+                "beam_size": beam,
+                "cpu_threads": threads,
+                "eta_s": round(eta, 1),
+                "speed": round(speed, 3),
+                "source": source,
+                "budget_s": round(budget_seconds, 1),
+                "audio_s": round(audio_seconds, 1),
+            }
+            if eta <= budget_seconds:
+                return dict(candidate, fits=True)
+            if fallback is None or eta < fallback["eta_s"]:
+                fallback = candidate
+    # Nada cabe: el candidato más rápido, avisando de que no se cumple el plazo
+    return dict(fallback, fits=False)
+
+
+def record_speed(model, audio_seconds, wall_seconds, cpu_threads, beam_size, compute_type):
+    """Añade una medición real al historial de velocidad del host."""
+    if not audio_seconds or not wall_seconds:
+        return
+    profile = whisper_tuning.load_host_profile()
+    history = profile.setdefault("speed_history", {}).setdefault(model, [])
+    history.append(
+        {
+            "audio_s": round(audio_seconds, 3),
+            "wall_s": round(wall_seconds, 3),
+            "cpu_threads": cpu_threads,
+            "beam_size": beam_size,
+            "compute_type": compute_type,
+            "ts": time.time(),
+        }
+    )
+    del history[:-HISTORY_LIMIT]
+    whisper_tuning.save_host_profile(profile)
@@ -0,0 +1,299 @@
+"""
+perf_metrics.py — Instrumentación de rendimiento por etapa para los scripts Python.
+
+Cada etapa del pipeline (decodificación, correlación, carga de modelo,
+transcripción, escritura...) se envuelve en `PerfRecorder.stage(...)`, que mide:
+  - wall_s:         tiempo de pared
+  - cpu_s:          tiempo de CPU del proceso (todas las hebras)
+  - peak_rss_mb:    RSS máximo del proceso mientras duró la etapa (muestreado;
+                    con etapas en paralelo incluye la memoria de las otras)
+  - audio_s_per_s:  segundos de audio procesados por segundo de pared (si aplica)
+
+Cada etapa se emite por stdout como `METRIC:{json}` (mismo estilo que
+`METADATA:{json}` de teams_converter.py), o como eventos `stage`/`metric` con
+--events (ver events.py), y al final se escribe `metrics.json` junto a las
+salidas, con el pico de toda la ejecución en `process_peak_rss_mb` (máximo
+histórico del proceso, acumulativo). Con `profile=True` se vuelca además un
+`.prof` de cProfile y un top de asignaciones de tracemalloc por etapa en
+`<output_dir>/profile/`.
+Se perfila una sola etapa a la vez, en cualquier hilo: las que se anidan en
+otra o coinciden en paralelo con otra ya perfilada solo se miden, por eso
+stage_graph.py ejecuta sus etapas de una en una con --profile.
+"""
+
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import events
+
+try:
+    import resource  # No disponible en Windows
+except ImportError:  # pragma: no cover - depende de la plataforma
+    resource = None
+
+METRICS_VERSION = "1.0"
+METRICS_FILENAME = "metrics.json"
+TRACEMALLOC_TOP = 25
+# Cada cuánto se muestrea el RSS mientras hay alguna etapa abierta
+RSS_SAMPLE_INTERVAL = 0.05
+_MB = 1024 * 1024
+# cProfile no admite perfiles anidados ni concurrentes y tracemalloc es global
+# al proceso: solo se perfila una etapa a la vez, sea cual sea su hilo
+_PROFILE_LOCK = threading.Lock()
+
+
+def peak_rss_mb():
+    """RSS pico del proceso en MB desde que arrancó, o None si la plataforma no lo expone.
+
+    Es un máximo histórico (ru_maxrss): nunca baja, así que no sirve para
+    atribuir memoria a una etapa (para eso está current_rss_mb). Usa `resource`
+    (Linux/macOS) y, si no existe (Windows), psutil."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS reporta bytes; Linux reporta KB
+        if sys.platform == "darwin":
+            return peak / _MB
+        return peak / 1024
+    try:
+        import psutil
+
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / _MB
+    except Exception:
+        return None
+
+
+def _psutil_process():
+    try:
+        import psutil
+
+        return psutil.Process()
+    except Exception:
+        return None
+
+
+_PROCESS = _psutil_process()
+
+
+def current_rss_mb():
+    """RSS actual del proceso en MB: psutil o, sin él, /proc/self/statm (Linux).
+    None si no hay forma de leerlo; entonces las etapas llevan peak_rss_mb: null."""
+    if _PROCESS is not None:
+        try:
+            return _PROCESS.memory_info().rss / _MB
+        except Exception:
+            return None
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / _MB
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class _RssWindow:
+    """RSS máximo visto entre la apertura y el cierre de una etapa."""
+
+    def __init__(self, rss):
+        self.peak = rss
+
+    def observe(self, rss):
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+
+class _RssSampler:
+    """Un solo hilo muestrea el RSS mientras haya etapas abiertas (en cualquier
+    hilo) y actualiza el máximo de cada una; sin etapas abiertas, termina."""
+
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._windows = set()
+        self._thread = None
+
+    def open(self):
+        window = _RssWindow(current_rss_mb())
+        if window.peak is None:
+            return window
+        with self._lock:
+            self._windows.add(window)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+                self._thread.start()
+        return window
+
+    def close(self, window):
+        """Cierra la ventana con una última muestra y devuelve su pico en MB."""
+        rss = current_rss_mb()
+        with self._lock:
+            self._windows.discard(window)
+            window.observe(rss)
+        return window.peak
+
+    def _run(self):
+        while True:
+            rss = current_rss_mb()
+            with self._lock:
+                if not self._windows:
+                    self._thread = None
+                    return
+                for window in self._windows:
+                    window.observe(rss)
+            time.sleep(self.interval)
+
+
+_RSS_SAMPLER = _RssSampler()
+
+
+class PerfRecorder:
+    """Registro de métricas por etapa de un script (audio_sync_analyzer, diarization_analyzer...)."""
+
+    def __init__(self, script_name, output_dir=None, profile=False):
+        self.script_name = script_name
+        self.output_dir = output_dir
+        self.profile = profile
+        self.stages = []
+        self.started_at = time.time()
+        self._t0_wall = time.perf_counter()
+        self._t0_cpu = time.process_time()
+
+    @contextmanager
+    def stage(self, name, audio_seconds=None, profile=True):
+        """Mide una etapa. Devuelve un dict mutable donde el llamador puede
+        completar `audio_seconds` u otros campos cuando los conozca.
+
+        Con profile=False la etapa no se perfila aunque el recorder lo haga (p. ej.
+        una etapa que solo espera a otras que se perfilan por su cuenta)."""
+        info = {"audio_seconds": audio_seconds}
+        profiler = None
+        traced = False
+        # Si ya hay otra etapa perfilándose (la que contiene a esta, u otra en
+        # paralelo) esta solo se mide
+        if self.profile and profile and _PROFILE_LOCK.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+            traced = True
+            profiler.enable()
+
+        events.stage(name, "start")
+        rss_window = _RSS_SAMPLER.open()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        status = "ok"
+        try:
+            yield info
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            wall = time.perf_counter() - wall_start
+            cpu = time.process_time() - cpu_start
+            stage_peak_rss = _RSS_SAMPLER.close(rss_window)
+            if profiler is not None:
+                profiler.disable()
+
+            metric = _metric(
+                name, status, wall, cpu, info.pop("audio_seconds", None), stage_peak_rss
+            )
+            # Campos adicionales que la etapa haya añadido (modelo, hilos, etc.)
+            metric.update(info)
+
+            if traced:
+                try:
+                    metric["py_alloc_peak_mb"] = round(
+                        tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2
+                    )
+                    self._dump_profile(name, profiler)
+                finally:
+                    _PROFILE_LOCK.release()
+
+            self.stages.append(metric)
+            events.stage(name, "end", status=status)
+            events.metric(metric)
+
+    def record(self, name, wall_s, cpu_s, audio_seconds=None, **fields):
+        """Registra una etapa medida fuera de `stage()` (p. ej. los pasos internos
+        de pyannote, que solo se observan a través de su hook). Su RSS no se
+        muestrea: peak_rss_mb queda en null salvo que el llamador lo pase."""
+        metric = _metric(name, "ok", wall_s, cpu_s, audio_seconds)
+        metric.update(fields)
+        self.stages.append(metric)
+        events.metric(metric)
+        return metric
+
+    def summary(self):
+        return {
+            "script": self.script_name,
+            "started_at": self.started_at,
+            "wall_s": round(time.perf_counter() - self._t0_wall, 4),
+            "cpu_s": round(time.process_time() - self._t0_cpu, 4),
+            "process_peak_rss_mb": _round_or_none(peak_rss_mb(), 1),
+            "stages": self.stages,
+        }
+
+    def write(self, output_dir=None):
+        """Escribe/actualiza `metrics.json` en output_dir. Cada script tiene su
+        propia sección en `runs`, así diarización y transcripción no se pisan."""
+        output_dir = output_dir or self.output_dir
+        if not output_dir:
+            return None
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, METRICS_FILENAME)
+
+        data = {"version": METRICS_VERSION, "runs": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    existing = json.load(f)
+                if isinstance(existing, dict) and isinstance(existing.get("runs"), dict):
+                    data["runs"] = existing["runs"]
+            except Exception:
+                pass
+
+        data["runs"][self.script_name] = self.summary()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        return path
+
+    def _dump_profile(self, name, profiler):
+        if not self.output_dir:
+            return
+        try:
+            profile_dir = os.path.join(self.output_dir, "profile")
+            os.makedirs(profile_dir, exist_ok=True)
+            prefix = os.path.join(
+                profile_dir, f"{self.script_name}.{len(self.stages):02d}_{name}"
+            )
+            profiler.dump_stats(prefix + ".prof")
+
+            snapshot = tracemalloc.take_snapshot()
+            with open(prefix + ".tracemalloc.txt", "w", encoding="utf-8") as f:
+                for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]:
+                    f.write(f"{stat}\n")
+        except Exception as e:
+            print(f"⚠️  No se pudo volcar el perfil de '{name}': {e}", flush=True)
+
+
+def _metric(name, status, wall, cpu, audio_s, peak_rss=None):
+    return {
+        "stage": name,
+        "status": status,
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu, 4),
+        "peak_rss_mb": _round_or_none(peak_rss, 1),
+        "audio_s": _round_or_none(audio_s, 3),
+        "audio_s_per_s": _round_or_none(audio_s / wall, 3) if audio_s and wall > 0 else None,
+    }
+
+
+def _round_or_none(value, digits):
+    return round(value, digits) if value is not None else None
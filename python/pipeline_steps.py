@@ -0,0 +1,112 @@
+"""
+pipeline_steps.py — Tiempos y progreso de los pasos internos de pyannote (hook).
+
+La llamada al pipeline de diarización es una sola etapa (`diarize`, de 40 a
+75 %). pyannote/speaker-diarization-3.1 acepta un
+`hook(paso, artefacto, file=None, total=None, completed=None)` al que llama
+por lotes durante segmentation y embeddings (con completed/total) y una vez al
+terminar cada paso (con el artefacto). StepHook lo usa para:
+  - registrar cada paso como métrica `diarize.<paso>` (wall_s, cpu_s, RSS pico,
+    dispositivo y memoria pico del acelerador si lo hay);
+  - repartir el progreso entre los pasos según su peso típico, avanzando dentro
+    de cada paso con completed/total.
+
+Un paso dura desde el final del anterior (o el inicio de la llamada) hasta su
+última llamada al hook. Los pasos que no están en STEP_SHARES se miden igual
+pero no mueven el progreso.
+"""
+
+import time
+
+# Peso típico de cada paso sobre el tiempo del pipeline (CPU)
+STEP_SHARES = (
+    ("segmentation", 0.35),
+    ("speaker_counting", 0.05),
+    ("embeddings", 0.5),
+    ("discrete_diarization", 0.1),
+)
+
+
+def device_peak_mb(device):
+    """Memoria pico de CUDA (o la asignada ahora en MPS) en MB; None en CPU."""
+    kind = str(device).split(":")[0]
+    if kind not in ("cuda", "mps"):
+        return None
+    try:
+        import torch
+
+        if kind == "cuda":
+            return round(torch.cuda.max_memory_allocated(device) / 2**20, 1)
+        if kind == "mps":
+            return round(torch.mps.driver_allocated_memory() / 2**20, 1)
+    except Exception:
+        pass
+    return None
+
+
+class StepHook:
+    """Hook para `pipeline(file, hook=...)`. Llamar a finish() al volver del pipeline."""
+
+    def __init__(self, perf, progress, start=40, end=75, device=None, prefix="diarize"):
+        self.perf = perf
+        self.progress = progress
+        self.device = device
+        self.prefix = prefix
+        self.steps = []
+        self._ranges = {}
+        position = start
+        for name, share in STEP_SHARES:
+            self._ranges[name] = (position, position + (end - start) * share)
+            position += (end - start) * share
+        self._current = None
+        self._calls = 0
+        self._last = None
+        self._mark = (time.perf_counter(), time.process_time())
+        self._reported = start
+
+    def __call__(self, step_name, step_artifact=None, file=None, total=None, completed=None):
+        now = (time.perf_counter(), time.process_time())
+        if step_name != self._current:
+            self._close()
+            self._current = step_name
+            self._calls = 0
+        self._calls += 1
+        self._last = now
+
+        if step_name not in self._ranges:
+            return
+        low, high = self._ranges[step_name]
+        if step_artifact is not None:
+            value = high
+        elif total:
+            value = low + (high - low) * min(completed or 0, total) / total
+        else:
+            return
+        if int(value) > self._reported:
+            self._reported = int(value)
+            self.progress(self._reported)
+
+    def _close(self):
+        if self._current is None:
+            return
+        fields = {"calls": self._calls}
+        if self.device is not None:
+            fields["device"] = str(self.device)
+            peak = device_peak_mb(self.device)
+            if peak is not None:
+                fields["device_peak_mb"] = peak
+        self.steps.append(
+            self.perf.record(
+                f"{self.prefix}.{self._current}",
+                self._last[0] - self._mark[0],
+                self._last[1] - self._mark[1],
+                **fields,
+            )
+        )
+        self._mark = self._last
+        self._current = None
+
+    def finish(self):
+        """Registra el último paso y devuelve las métricas de todos."""
+        self._close()
+        return self.steps
@@ -0,0 +1,119 @@
+"""
+preflight.py — Clasificación previa de pistas sin decodificarlas enteras.
+
+Antes de la decodificación completa con pydub, cada pista se clasifica como:
+  - missing: el archivo no existe
+  - empty:   0 bytes, sin stream de audio, duración 0 o ilegible para ffprobe
+  - silent:  todas las ventanas muestreadas a lo largo del archivo están en silencio
+             (pico y RMS por debajo de los umbrales)
+  - usable:  cualquier otro caso (también si ffprobe/ffmpeg no están disponibles)
+
+Solo las pistas `usable` pasan a la decodificación completa. El criterio de
+silencio es deliberadamente conservador, porque una pista `silent` se descarta
+sin transcribirla: se muestrea una ventana cada 30 s (hasta 120), basta con
+que una tenga un pico por encima del umbral para que la pista se decodifique,
+y además el RMS de todo lo muestreado debe quedar por debajo del de
+`_is_silent_track`. Como el habla escasa puede caer entre ventanas, el
+silencio muestreado se confirma con una pasada de volumedetect sobre el
+archivo entero (pico o RMS global como en `_is_silent_track`). Si no se puede
+confirmar, la pista se decodifica entera y decide `_is_silent_track`.
+"""
+
+import os
+
+import numpy as np
+
+import ffmpeg_io
+
+MISSING = "missing"
+EMPTY = "empty"
+SILENT = "silent"
+USABLE = "usable"
+
+PROBE_SAMPLE_RATE = 8000
+PROBE_WINDOW_SECONDS = 2.0
+SECONDS_PER_WINDOW = 30  # una ventana cada 30 s de audio...
+MIN_WINDOWS = 10
+MAX_WINDOWS = 120  # ...con un máximo de 240 s decodificados por pista
+# Mismo umbral de amplitud que `silence_pct` en analyze_audio_properties
+SILENCE_AMPLITUDE = 0.01
+# Mismo umbral que MIN_SIGNAL_RMS en audio_sync_analyzer
+SILENCE_RMS = 0.001
+
+
+def window_starts(duration):
+    """Inicios de las ventanas de muestreo repartidas uniformemente por el archivo."""
+    count = int(min(MAX_WINDOWS, max(MIN_WINDOWS, duration // SECONDS_PER_WINDOW)))
+    if duration <= count * PROBE_WINDOW_SECONDS:
+        return [0.0]
+    span = duration - PROBE_WINDOW_SECONDS
+    return [span * i / (count - 1) for i in range(count)]
+
+
+def classify_track(path):
+    """Devuelve {status, reason, duration, windows, peak, rms} para la pista en `path`."""
+    report = {"status": USABLE, "reason": "", "duration": None, "windows": 0, "peak": None, "rms": None}
+
+    if not path or not os.path.exists(path):
+        return dict(report, status=MISSING, reason="no existe")
+    try:
+        if os.path.getsize(path) <= 0:
+            return dict(report, status=EMPTY, reason="0 bytes")
+    except OSError as e:
+        return dict(report, status=EMPTY, reason=str(e))
+
+    try:
+        meta = ffmpeg_io.probe(path)
+    except RuntimeError as e:
+        return dict(report, status=EMPTY, reason=f"ffprobe: {e}")
+    except Exception as e:
+        # ffprobe ausente, timeout o salida inesperada: decide la decodificación completa
+        return dict(report, reason=f"ffprobe no disponible ({type(e).__name__}); se decodifica completa")
+
+    duration = meta["duration"]
+    report["duration"] = duration
+    if not meta["has_audio"]:
+        return dict(report, status=EMPTY, reason="sin stream de audio")
+    if duration is not None and duration <= 0:
+        return dict(report, status=EMPTY, reason="duración 0")
+    if duration is None:
+        # Sin duración declarada no se pueden repartir las ventanas: decide la decodificación completa
+        return dict(report, reason="duración desconocida")
+
+    peak = 0.0
+    square_sum = 0.0
+    sample_count = 0
+    starts = window_starts(duration)
+    # Archivos cortos: una sola ventana que los cubre enteros
+    seconds = duration if len(starts) == 1 else PROBE_WINDOW_SECONDS
+    for start in starts:
+        try:
+            samples = ffmpeg_io.decode_window(path, start, seconds, PROBE_SAMPLE_RATE)
+        except Exception as e:
+            return dict(report, reason=f"muestreo fallido ({e}); se decodifica completa")
+        report["windows"] += 1
+        if samples.size:
+            peak = max(peak, float(np.max(np.abs(samples))))
+            square_sum += float(np.dot(samples, samples))
+            sample_count += samples.size
+        if peak >= SILENCE_AMPLITUDE:
+            return dict(report, peak=round(peak, 4), reason="señal detectada")
+
+    report["peak"] = round(peak, 4)
+    if not sample_count:
+        return dict(report, reason="muestreo sin audio; se decodifica completa")
+    rms = (square_sum / sample_count) ** 0.5
+    report["rms"] = round(rms, 6)
+    if rms > SILENCE_RMS:
+        # Señal baja pero no nula: lo decide la decodificación completa
+        return dict(report, reason=f"señal baja (RMS {rms:.4f}); se decodifica completa")
+
+    # Candidata a silencio: confirmación sobre el archivo entero
+    try:
+        full_peak, full_rms = ffmpeg_io.levels(path)
+    except Exception as e:
+        return dict(report, reason=f"silencio sin confirmar ({e}); se decodifica completa")
+    report["peak"], report["rms"] = round(full_peak, 4), round(full_rms, 6)
+    if full_peak < SILENCE_AMPLITUDE or full_rms <= SILENCE_RMS:
+        return dict(report, status=SILENT, reason=f"{report['windows']} ventanas y archivo completo en silencio")
+    return dict(report, reason="señal fuera de las ventanas muestreadas; se decodifica completa")
@@ -0,0 +1,88 @@
+"""
+raw_results.py — Resultados crudos de Whisper y parámetros de sincronización (--recombine).
+
+`combine_transcriptions` es la única etapa que depende de la diarización, del
+lag y de las reglas de unión de turnos. Al terminar un análisis se guarda en
+`analysis/whisper_raw.json` justo lo que recibe:
+
+  {
+    "version": "1.0",
+    "tracks": {"mic": {...} | null, "system": {...} | null},
+    "sync": {"base_lag", "drift_slope", "hardware_bias", "lag_seconds"},
+    "mic_exists", "sys_exists", "quality", "model", "diarization_file"
+  }
+
+Cada pista conserva sus segmentos tal cual (con las métricas de confianza y
+`quality`) y las palabras como tripletas [start, end, text] para no repetir
+claves cientos de miles de veces. Los resultados de la pista mezclada se
+guardan ya repartidos, con el micrófono en tiempo de micrófono, igual que los
+recibe combine.
+"""
+
+import json
+import os
+
+from transcript_records import Word
+
+RAW_VERSION = "1.0"
+RAW_FILENAME = "whisper_raw.json"
+SYNC_FIELDS = ("base_lag", "drift_slope", "hardware_bias", "lag_seconds")
+
+
+def raw_path(output_dir):
+    return os.path.join(output_dir, RAW_FILENAME)
+
+
+def _pack_track(result):
+    if result is None:
+        return None
+    return {
+        "segments": result.get("segments", []),
+        "words": [[w.start, w.end, w.text] for w in result.get("words", [])],
+    }
+
+
+def _unpack_track(track):
+    if track is None:
+        return None
+    segments = track.get("segments", [])
+    return {
+        "text": " ".join(s["text"] for s in segments),
+        "segments": segments,
+        "words": [Word(start, end, text) for start, end, text in track.get("words", [])],
+    }
+
+
+def save(output_dir, mic_result, sys_result, sync, mic_exists, sys_exists,
+         quality=None, model=None, diarization_file=None):
+    """Escribe whisper_raw.json de forma atómica y devuelve su ruta."""
+    data = {
+        "version": RAW_VERSION,
+        "tracks": {"mic": _pack_track(mic_result), "system": _pack_track(sys_result)},
+        "sync": {field: sync.get(field) for field in SYNC_FIELDS},
+        "mic_exists": bool(mic_exists),
+        "sys_exists": bool(sys_exists),
+        "quality": quality,
+        "model": model,
+        "diarization_file": diarization_file,
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    path = raw_path(output_dir)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def load(output_dir):
+    """Lee whisper_raw.json. Lanza FileNotFoundError si no existe y ValueError si la versión no es compatible."""
+    with open(raw_path(output_dir), "r", encoding="utf-8") as f:
+        data = json.load(f)
+    version = str(data.get("version", ""))
+    if version.split(".")[0] != RAW_VERSION.split(".")[0]:
+        raise ValueError(f"versión de {RAW_FILENAME} no soportada: {version or 'desconocida'}")
+    tracks = data.get("tracks") or {}
+    data["mic"] = _unpack_track(tracks.get("mic"))
+    data["system"] = _unpack_track(tracks.get("system"))
+    data["sync"] = {field: (data.get("sync") or {}).get(field) for field in SYNC_FIELDS}
+    return data
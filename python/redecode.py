@@ -0,0 +1,146 @@
+"""
+redecode.py — Segunda pasada selectiva sobre los segmentos de baja confianza (--redecode).
+
+La primera pasada usa el beam barato (1 en medium/large). Después se buscan
+los segmentos cuyo `avg_logprob`, `compression_ratio` o `no_speech_prob`
+indican poca confianza, se agrupan en ventanas con un pequeño margen y solo
+esas ventanas se vuelven a decodificar con más beam (o con un modelo mayor).
+El margen nunca invade los segmentos vecinos que se conservan (sus palabras
+quedarían duplicadas al empalmar). El resultado sustituye al original
+únicamente si mejora su confianza media.
+"""
+
+import numpy as np
+
+WHISPER_SAMPLE_RATE = 16000
+# Umbrales inspirados en los de Whisper (logprob -1.0, compresión 2.4, no_speech 0.6),
+# algo más estrictos en logprob porque aquí re-decodificar es barato
+LOGPROB_THRESHOLD = -0.8
+COMPRESSION_RATIO_THRESHOLD = 2.4
+NO_SPEECH_THRESHOLD = 0.6
+WINDOW_PADDING_SECONDS = 0.3
+MAX_WINDOW_GAP_SECONDS = 1.0
+
+
+def is_weak(segment):
+    """True si el segmento tiene baja confianza según las métricas de Whisper."""
+    logprob = segment.get("avg_logprob", 0.0)
+    return (
+        logprob < LOGPROB_THRESHOLD
+        or segment.get("compression_ratio", 0.0) > COMPRESSION_RATIO_THRESHOLD
+        or (segment.get("no_speech_prob", 0.0) > NO_SPEECH_THRESHOLD and logprob < -0.5)
+    )
+
+
+def weak_windows(segments):
+    """Agrupa segmentos débiles cercanos en ventanas: [(primer_idx, último_idx)]."""
+    windows = []
+    for i, segment in enumerate(segments):
+        if not is_weak(segment):
+            continue
+        if windows:
+            first, last = windows[-1]
+            if last == i - 1 or segment["start"] - segments[last]["end"] <= MAX_WINDOW_GAP_SECONDS:
+                windows[-1] = (first, i)
+                continue
+        windows.append((i, i))
+    return windows
+
+
+def mean_logprob(segments):
+    """avg_logprob medio ponderado por duración."""
+    total = sum(max(s["end"] - s["start"], 1e-3) for s in segments)
+    if not total:
+        return float("-inf")
+    return sum(s.get("avg_logprob", 0.0) * max(s["end"] - s["start"], 1e-3) for s in segments) / total
+
+
+def audio_slice(audio_segment, start, end):
+    """Recorte [start, end) de un AudioSegment como float32 mono a 16 kHz (entrada de Whisper)."""
+    clip = (
+        audio_segment[int(start * 1000): int(end * 1000)]
+        .set_channels(1)
+        .set_frame_rate(WHISPER_SAMPLE_RATE)
+        .set_sample_width(2)
+    )
+    return np.frombuffer(clip.raw_data, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _shift(items, offset):
+    return [dict(item, start=item["start"] + offset, end=item["end"] + offset) for item in items]
+
+
+def redecode_track(result, audio_segment, transcribe):
+    """Re-decodifica las ventanas débiles de `result` y devuelve (resultado, estadísticas).
+
+    transcribe(samples) -> {segments, words} con tiempos relativos al recorte."""
+    segments = result["segments"]
+    windows = weak_windows(segments)
+    stats = {
+        "segments": len(segments),
+        "weak": sum(last - first + 1 for first, last in windows),
+        "windows": len(windows),
+        "replaced": 0,
+        "redecoded_s": 0.0,
+    }
+    if not windows:
+        return result, stats
+
+    duration = len(audio_segment) / 1000
+    replacements = {}
+    for first, last in windows:
+        old = segments[first: last + 1]
+        # Margen recortado a los vecinos: su audio no debe volver a transcribirse
+        prev_end = segments[first - 1]["end"] if first > 0 else 0.0
+        next_start = segments[last + 1]["start"] if last + 1 < len(segments) else duration
+        start = max(0.0, prev_end, old[0]["start"] - WINDOW_PADDING_SECONDS)
+        end = min(duration, next_start, old[-1]["end"] + WINDOW_PADDING_SECONDS)
+        if end <= start:
+            continue
+        stats["redecoded_s"] += end - start
+        new = transcribe(audio_slice(audio_segment, start, end))
+        new_segments = _shift(new["segments"], start)
+
+        if new_segments:
+            accept = mean_logprob(new_segments) > mean_logprob(old)
+        else:
+            # Sin texto en la segunda pasada: solo aceptamos si la primera parecía alucinada
+            accept = all(s.get("no_speech_prob", 0.0) > NO_SPEECH_THRESHOLD for s in old)
+        if accept:
+            replacements[first] = (last, new_segments, [w.shifted(start) for w in new["words"]])
+            stats["replaced"] += 1
+    stats["redecoded_s"] = round(stats["redecoded_s"], 2)
+
+    if not replacements:
+        return result, stats
+
+    out_segments, out_words = [], []
+    words = result.get("words", [])
+    word_idx = 0
+    i = 0
+    while i < len(segments):
+        if i not in replacements:
+            out_segments.append(segments[i])
+            i += 1
+            continue
+        last, new_segments, new_words = replacements[i]
+        span_start, span_end = segments[i]["start"], segments[last]["end"]
+        # Palabras anteriores a la ventana se conservan; las de dentro se sustituyen
+        while word_idx < len(words) and words[word_idx].start < span_start:
+            out_words.append(words[word_idx])
+            word_idx += 1
+        while word_idx < len(words) and words[word_idx].start < span_end:
+            word_idx += 1
+        out_segments.extend(new_segments)
+        out_words.extend(new_words)
+        i = last + 1
+    out_words.extend(words[word_idx:])
+    out_words.sort(key=lambda w: w.start)
+
+    spliced = dict(
+        result,
+        segments=out_segments,
+        words=out_words,
+        text=" ".join(s["text"] for s in out_segments),
+    )
+    return spliced, stats
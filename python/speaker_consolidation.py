@@ -0,0 +1,110 @@
+"""
+speaker_consolidation.py — Unión de locutores sobre-segmentados dentro de una grabación.
+
+pyannote a veces separa a la misma persona en varias etiquetas cuando cambia
+el tono o el ruido. Con los vectores por segmento que ya calcula
+embedding_batches, sin volver a ejecutar el pipeline:
+  1. Se calcula la matriz completa de similitud coseno entre los centroides
+     de todos los locutores.
+  2. Se unen, de forma aglomerativa, los dos locutores más parecidos mientras
+     su similitud supere el umbral; el centroide del grupo se recalcula como
+     la media de los vectores de todos sus segmentos y la matriz se rehace.
+  3. Los segmentos se reetiquetan (el grupo conserva la etiqueta con más tiempo
+     de voz) y se vuelven a unir los consecutivos del mismo locutor.
+
+Los locutores cuyos segmentos son todos demasiado cortos para tener embedding
+no se comparan y conservan su etiqueta.
+"""
+
+import numpy as np
+
+import embedding_batches
+
+# Similitud coseno mínima entre centroides para considerar que son la misma persona.
+# La unión es opcional (--merge_similarity, 0 por defecto); este es el valor sugerido
+MERGE_SIMILARITY = 0.75
+# Hueco máximo (s) para unir segmentos consecutivos del mismo locutor
+ADJACENT_GAP_SECONDS = 0.5
+
+
+def merge_adjacent(segments, max_gap=ADJACENT_GAP_SECONDS):
+    """Une segmentos consecutivos del mismo locutor separados menos de `max_gap` (devuelve copias)."""
+    merged = []
+    for seg in segments:
+        if (
+            merged
+            and seg["speaker"] == merged[-1]["speaker"]
+            and (seg["start"] - merged[-1]["end"]) < max_gap
+        ):
+            merged[-1]["end"] = seg["end"]
+        else:
+            merged.append(seg.copy())
+    return merged
+
+
+def merge_plan(segments, vectors, threshold=MERGE_SIMILARITY, min_speakers=1, max_speakers=None):
+    """{etiqueta: etiqueta superviviente} de los locutores que se unen (vacío si ninguno).
+
+    Nunca deja menos de `min_speakers` locutores con embedding; con `max_speakers`
+    sigue uniendo los más parecidos, aunque no lleguen al umbral, hasta no superarlo."""
+    return _merge(segments, vectors, threshold, min_speakers, max_speakers)[0]
+
+
+def _merge(segments, vectors, threshold, min_speakers, max_speakers):
+    """(plan, {etiqueta: superviviente} de las uniones forzadas por max_speakers)."""
+    forced = []
+    labels, sums, speech = [], [], []
+    for seg, vec in zip(segments, vectors):
+        if not np.all(np.isfinite(vec)):
+            continue
+        if seg["speaker"] not in labels:
+            labels.append(seg["speaker"])
+            sums.append(np.zeros(len(vec), dtype=np.float64))
+            speech.append(0.0)
+        i = labels.index(seg["speaker"])
+        sums[i] += vec
+        speech[i] += seg["end"] - seg["start"]
+    if len(labels) < 2:
+        return {}, {}
+
+    sums = np.stack(sums)
+    speech = np.array(speech)
+    members = [[label] for label in labels]
+    while len(members) > max(1, min_speakers):
+        centroids = sums / np.maximum(np.linalg.norm(sums, axis=1, keepdims=True), 1e-8)
+        similarity = centroids @ centroids.T
+        np.fill_diagonal(similarity, -np.inf)
+        i, j = np.unravel_index(np.argmax(similarity), similarity.shape)
+        if similarity[i, j] < threshold and (max_speakers is None or len(members) <= max_speakers):
+            break
+        keep, drop = (i, j) if speech[i] >= speech[j] else (j, i)
+        if similarity[i, j] < threshold:
+            forced.extend(members[drop])
+        sums[keep] += sums[drop]
+        speech[keep] += speech[drop]
+        members[keep] = members[keep] + members[drop]
+        sums = np.delete(sums, drop, axis=0)
+        speech = np.delete(speech, drop)
+        del members[drop]
+
+    plan = {}
+    for group in members:
+        # members[k][0] es la etiqueta que se conservó en cada unión (la del lado con más voz)
+        for label in group[1:]:
+            plan[label] = group[0]
+    return plan, {label: plan[label] for label in forced}
+
+
+def consolidate(segments, vectors, threshold=MERGE_SIMILARITY, min_speakers=1, max_speakers=None):
+    """Une locutores sobre-segmentados. Devuelve (segmentos, centroides {locutor: lista}, estadísticas)."""
+    plan, forced = _merge(segments, vectors, threshold, min_speakers, max_speakers)
+    relabeled = [dict(seg, speaker=plan.get(seg["speaker"], seg["speaker"])) for seg in segments]
+    centroids = embedding_batches.speaker_centroids(relabeled, vectors)
+    stats = {
+        "speakers_before": len({s["speaker"] for s in segments}),
+        "speakers_after": len({s["speaker"] for s in relabeled}),
+        "merged": plan,
+        # Uniones por debajo del umbral para no superar max_speakers
+        "forced": forced,
+    }
+    return merge_adjacent(relabeled), centroids, stats
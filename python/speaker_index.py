@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+speaker_index.py — Índice persistente de embeddings de hablante (--speaker_index).
+
+Hasta ahora cada centroide de una grabación nueva se compara uno a uno con los
+perfiles conocidos. El índice guarda todos los embeddings enrolados en una
+única matriz contigua y normalizada, así que una consulta resuelve todos los
+hablantes de una grabación contra miles de perfiles con un solo producto de
+matrices (por bloques, para no materializar la matriz memory-mapped entera).
+
+Formato en disco (un directorio):
+  speaker_index.json  {"version", "dim", "dtype", "labels": [id, ...]}
+  vectors.npy         matriz (filas, dim) en float32, float16 o int8 (memory-mapped al leer)
+  scales.npy          escala por fila (solo int8: fila ≈ int8 * escala)
+  codes.npy           índice en `labels` de cada fila
+
+Un mismo id puede tener varias filas (varias grabaciones de la misma persona,
+como los perfiles de Electron); la similitud de un id es la de su mejor fila.
+Las filas se guardan ordenadas por id, de modo que la reducción por id es un
+`np.maximum.reduceat` sobre tramos contiguos.
+
+Uso desde línea de comandos:
+  python speaker_index.py --index DIR add --id ana --diarization diarization.json --speaker SPEAKER_00
+  python speaker_index.py --index DIR query --diarization diarization.json [--top_k 3]
+  python speaker_index.py --index DIR remove --id ana
+  python speaker_index.py --index DIR merge --source ana_2 --target ana
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+import embedding_cache
+
+INDEX_VERSION = "1.0"
+META_FILENAME = "speaker_index.json"
+DTYPES = ("float32", "float16", "int8")
+DEFAULT_TOP_K = 3
+# Filas por bloque del producto de matrices (acota la memoria con índices grandes)
+QUERY_BLOCK_ROWS = 65536
+
+
+def _normalize(vectors):
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-8)
+
+
+class SpeakerIndex:
+    def __init__(self, path, dtype="float32"):
+        """Abre el índice de `path` (vacío si no existe). `dtype` solo aplica a índices nuevos."""
+        if dtype not in DTYPES:
+            raise ValueError(f"dtype no soportado: {dtype} (opciones: {', '.join(DTYPES)})")
+        self.path = path
+        self.dtype = dtype
+        self.dim = None
+        self.labels = []
+        self.vectors = np.zeros((0, 0), dtype=dtype)
+        self.scales = None
+        self.codes = np.zeros(0, dtype=np.int32)
+        if os.path.exists(os.path.join(path, META_FILENAME)):
+            self._load()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _load(self):
+        with open(self._file(META_FILENAME), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        version = str(meta.get("version", ""))
+        if version.split(".")[0] != INDEX_VERSION.split(".")[0]:
+            raise ValueError(f"versión de {META_FILENAME} no soportada: {version or 'desconocida'}")
+        self.dtype = meta["dtype"]
+        self.dim = meta["dim"]
+        self.labels = list(meta["labels"])
+        self.vectors = np.load(self._file("vectors.npy"), mmap_mode="r")
+        self.codes = np.load(self._file("codes.npy"))
+        if self.dtype == "int8":
+            self.scales = np.load(self._file("scales.npy"))
+        if len(self.codes) != len(self.vectors):
+            raise ValueError("índice de hablantes inconsistente: filas y códigos no coinciden")
+
+    def __len__(self):
+        return len(self.codes)
+
+    def ids(self):
+        """Ids con al menos una fila, en orden."""
+        return [self.labels[c] for c in np.unique(self.codes)]
+
+    # ── Cuantización ──────────────────────────────────────────────────────────
+
+    def _quantize(self, unit):
+        if self.dtype == "int8":
+            scales = np.maximum(np.abs(unit).max(axis=1), 1e-8) / 127.0
+            return np.round(unit / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+        return unit.astype(self.dtype), None
+
+    def _rows(self, start, stop):
+        """Filas [start, stop) en float32."""
+        block = np.asarray(self.vectors[start:stop], dtype=np.float32)
+        if self.scales is not None:
+            block *= self.scales[start:stop, None]
+        return block
+
+    # ── Modificación ──────────────────────────────────────────────────────────
+
+    def _set_rows(self, vectors, scales, codes):
+        # Mantiene las filas agrupadas por id (reduceat en query) y elimina ids sin filas
+        order = np.argsort(codes, kind="stable")
+        used = np.unique(codes)
+        remap = np.full(len(self.labels), -1, dtype=np.int32)
+        remap[used] = np.arange(len(used), dtype=np.int32)
+        self.labels = [self.labels[c] for c in used]
+        self.codes = remap[codes[order]]
+        self.vectors = vectors[order]
+        self.scales = scales[order] if scales is not None else None
+
+    def add(self, speaker_id, vectors):
+        """Añade uno o varios embeddings (se normalizan) al id `speaker_id`."""
+        unit = _normalize(vectors)
+        if self.dim is None:
+            self.dim = unit.shape[1]
+        elif unit.shape[1] != self.dim:
+            raise ValueError(f"dimensión {unit.shape[1]} distinta de la del índice ({self.dim})")
+        if speaker_id not in self.labels:
+            self.labels.append(speaker_id)
+        code = self.labels.index(speaker_id)
+        quantized, scales = self._quantize(unit)
+        existing = np.asarray(self.vectors) if len(self) else np.zeros((0, self.dim), self.dtype)
+        vectors = np.concatenate([existing, quantized])
+        if scales is not None:
+            scales = np.concatenate([self.scales if self.scales is not None else np.zeros(0, np.float32), scales])
+        codes = np.concatenate([self.codes, np.full(len(unit), code, dtype=np.int32)])
+        self._set_rows(vectors, scales, codes)
+
+    def remove(self, speaker_id):
+        """Elimina todas las filas de `speaker_id`. Devuelve cuántas había."""
+        if speaker_id not in self.labels:
+            return 0
+        keep = self.codes != self.labels.index(speaker_id)
+        removed = int((~keep).sum())
+        self._set_rows(
+            np.asarray(self.vectors)[keep],
+            self.scales[keep] if self.scales is not None else None,
+            self.codes[keep],
+        )
+        return removed
+
+    def merge(self, source_id, target_id):
+        """Reasigna las filas de `source_id` a `target_id` (dos perfiles que eran la misma persona)."""
+        if source_id not in self.labels or source_id == target_id:
+            return 0
+        if target_id not in self.labels:
+            self.labels.append(target_id)
+        source = self.codes == self.labels.index(source_id)
+        codes = self.codes.copy()
+        codes[source] = self.labels.index(target_id)
+        self._set_rows(np.asarray(self.vectors), self.scales, codes)
+        return int(source.sum())
+
+    def save(self):
+        """Escribe el índice de forma atómica por archivo (los metadatos al final)."""
+        os.makedirs(self.path, exist_ok=True)
+        arrays = {"vectors.npy": np.asarray(self.vectors), "codes.npy": self.codes}
+        if self.scales is not None:
+            arrays["scales.npy"] = self.scales
+        # El memmap actual apunta a vectors.npy: se suelta antes de reemplazarlo
+        self.vectors = arrays["vectors.npy"] = np.array(arrays["vectors.npy"])
+        for name, array in arrays.items():
+            with open(self._file(name + ".tmp"), "wb") as f:
+                np.save(f, array)
+            os.replace(self._file(name + ".tmp"), self._file(name))
+        meta = {"version": INDEX_VERSION, "dim": self.dim, "dtype": self.dtype, "labels": self.labels}
+        with open(self._file(META_FILENAME + ".tmp"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(self._file(META_FILENAME + ".tmp"), self._file(META_FILENAME))
+
+    # ── Consulta ──────────────────────────────────────────────────────────────
+
+    def scores(self, queries):
+        """Similitud coseno (consultas, ids) con la mejor fila de cada id."""
+        queries = _normalize(queries)
+        best = np.full((len(queries), len(self.labels)), -np.inf, dtype=np.float32)
+        for start in range(0, len(self), QUERY_BLOCK_ROWS):
+            stop = min(start + QUERY_BLOCK_ROWS, len(self))
+            block_scores = queries @ self._rows(start, stop).T
+            codes, starts = np.unique(self.codes[start:stop], return_index=True)
+            reduced = np.maximum.reduceat(block_scores, starts, axis=1)
+            best[:, codes] = np.maximum(best[:, codes], reduced)
+        return best
+
+    def query(self, queries, k=DEFAULT_TOP_K):
+        """Top-k ids por consulta: [[(id, similitud), ...], ...] de mayor a menor similitud."""
+        if not len(self) or len(queries) == 0:
+            return [[] for _ in range(len(queries))]
+        best = self.scores(queries)
+        k = min(k, best.shape[1])
+        top = np.argpartition(-best, k - 1, axis=1)[:, :k]
+        results = []
+        for row, candidates in zip(best, top):
+            ordered = candidates[np.argsort(-row[candidates], kind="stable")]
+            results.append([(self.labels[c], round(float(row[c]), 4)) for c in ordered])
+        return results
+
+    def resolve(self, speaker_embeddings, k=DEFAULT_TOP_K):
+        """{SPEAKER_XX: centroide} → {SPEAKER_XX: [{"id", "similarity"}, ...]} en una sola consulta."""
+        speakers = list(speaker_embeddings)
+        if not speakers:
+            return {}
+        matches = self.query(np.stack([speaker_embeddings[s] for s in speakers]), k)
+        return {
+            speaker: [{"id": sid, "similarity": sim} for sid, sim in found]
+            for speaker, found in zip(speakers, matches)
+        }
+
+
+def _diarization_embeddings(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        data = {}
+    embeddings = data.get("speaker_embeddings")
+    # Con --embeddings_format npy las listas quedan vacías y los centroides van en el .npy
+    if not embeddings and data.get("speaker_embeddings_file"):
+        embeddings = embedding_cache.load_centroids(path, data["speaker_embeddings_file"])
+    if not embeddings:
+        raise ValueError(f"{path} no contiene speaker_embeddings (requiere diarización v2.0)")
+    return embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Índice persistente de embeddings de hablante")
+    parser.add_argument("--index", type=str, required=True, help="Directorio del índice")
+    parser.add_argument("--dtype", type=str, default="float32", choices=DTYPES,
+                        help="Tipo de almacenamiento al crear el índice")
+    sub = parser.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="Enrola el centroide de un hablante de una diarización")
+    add.add_argument("--id", type=str, required=True)
+    add.add_argument("--diarization", type=str, required=True)
+    add.add_argument("--speaker", type=str, required=True, help="Etiqueta SPEAKER_XX de la diarización")
+    remove = sub.add_parser("remove", help="Elimina un id y todos sus embeddings")
+    remove.add_argument("--id", type=str, required=True)
+    merge = sub.add_parser("merge", help="Une dos ids (las filas de --source pasan a --target)")
+    merge.add_argument("--source", type=str, required=True)
+    merge.add_argument("--target", type=str, required=True)
+    query = sub.add_parser("query", help="Top-k de cada hablante de una diarización")
+    query.add_argument("--diarization", type=str, required=True)
+    query.add_argument("--top_k", type=int, default=DEFAULT_TOP_K)
+    args = parser.parse_args()
+
+    try:
+        index = SpeakerIndex(args.index, dtype=args.dtype)
+        if args.command == "add":
+            embeddings = _diarization_embeddings(args.diarization)
+            if args.speaker not in embeddings:
+                raise ValueError(f"{args.speaker} no está en {args.diarization}")
+            index.add(args.id, embeddings[args.speaker])
+            index.save()
+            print(f"✅ {args.id} enrolado ({len(index)} embeddings en el índice)", flush=True)
+        elif args.command == "remove":
+            removed = index.remove(args.id)
+            index.save()
+            print(f"🗑️  {args.id}: {removed} embedding(s) eliminados", flush=True)
+        elif args.command == "merge":
+            moved = index.merge(args.source, args.target)
+            index.save()
+            print(f"🔗 {args.source} → {args.target}: {moved} embedding(s)", flush=True)
+        else:
+            matches = index.resolve(_diarization_embeddings(args.diarization), args.top_k)
+            print(json.dumps(matches, ensure_ascii=False, indent=2), flush=True)
+    except Exception as e:
+        sys.stderr.write(f"FATAL_ERROR: {e}\n")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+stage_graph.py — Planificador de etapas por dependencias sobre un pool de hilos.
+
+Cada etapa declara de qué otras depende; en cuanto sus dependencias terminan se
+lanza en el pool, así la sincronización, los informes y la visualización corren
+en paralelo con la transcripción (ctranslate2 libera el GIL mientras infiere).
+Cada etapa se mide con `PerfRecorder.stage` y recibe el dict de la métrica para
+completarlo. Si una etapa marcada como `required` devuelve `False` el grafo se
+aborta (no se lanzan más etapas); si cualquier etapa lanza una excepción, se
+relanza en `run()`.
+
+Con --profile (perf.profile) las etapas se ejecutan de una en una en el pool:
+cProfile solo perfila una etapa a la vez, así cada una tiene su propio `.prof`.
+
+Al terminar se calcula la ruta crítica: la cadena de dependencias que determinó
+el tiempo total, que es lo único que merece la pena optimizar.
+"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+DEFAULT_WORKERS = 3
+
+
+class StageGraph:
+    def __init__(self, perf, max_workers=DEFAULT_WORKERS):
+        self.perf = perf
+        self.max_workers = max_workers
+        self.stages = {}
+        self.results = {}
+        self.timings = {}  # nombre -> (inicio, fin) relativos al arranque del grafo
+        self.aborted_by = None
+
+    def add(self, name, fn, deps=(), audio_seconds=None, required=False):
+        """Registra la etapa `name`; fn(info) recibe el dict de su métrica.
+        Con required=True, devolver False aborta el resto del grafo."""
+        self.stages[name] = {
+            "fn": fn,
+            "deps": list(deps),
+            "audio_seconds": audio_seconds,
+            "required": required,
+        }
+
+    def _run_stage(self, name, t0):
+        stage = self.stages[name]
+        started = time.perf_counter() - t0
+        try:
+            with self.perf.stage(name, audio_seconds=stage["audio_seconds"]) as info:
+                return stage["fn"](info)
+        finally:
+            self.timings[name] = (started, time.perf_counter() - t0)
+
+    def run(self):
+        """Ejecuta el grafo. Devuelve False si alguna etapa abortó, True en otro caso."""
+        for name, stage in self.stages.items():
+            missing = [d for d in stage["deps"] if d not in self.stages]
+            if missing:
+                raise ValueError(f"La etapa '{name}' depende de etapas inexistentes: {missing}")
+
+        t0 = time.perf_counter()
+        pending = dict(self.stages)
+        running = {}
+        error = None
+        workers = 1 if getattr(self.perf, "profile", False) else self.max_workers
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage") as pool:
+            while pending or running:
+                if error is None and self.aborted_by is None:
+                    ready = [
+                        name
+                        for name, stage in pending.items()
+                        if all(d in self.results for d in stage["deps"])
+                    ]
+                    for name in ready:
+                        del pending[name]
+                        running[pool.submit(self._run_stage, name, t0)] = name
+                if not running:
+                    break  # abortado, o dependencias que nunca se cumplirán
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BaseException as e:
+                        error = error or e
+                        continue
+                    self.results[name] = result
+                    if (
+                        result is False
+                        and self.stages[name]["required"]
+                        and self.aborted_by is None
+                    ):
+                        self.aborted_by = name
+
+        if error is not None:
+            raise error
+        return self.aborted_by is None and not pending
+
+    def critical_path(self):
+        """[(etapa, segundos)] de la cadena de dependencias que terminó en último lugar."""
+        if not self.timings:
+            return []
+        current = max(self.timings, key=lambda n: self.timings[n][1])
+        path = []
+        while current is not None:
+            start, end = self.timings[current]
+            path.append((current, end - start))
+            deps = [d for d in self.stages[current]["deps"] if d in self.timings]
+            current = max(deps, key=lambda d: self.timings[d][1]) if deps else None
+        return list(reversed(path))
+
+    def wall_seconds(self):
+        return max((end for _, end in self.timings.values()), default=0.0)
+
+    def busy_seconds(self):
+        """Suma de la duración de todas las etapas (lo que costaría ejecutarlas en serie)."""
+        return sum(end - start for start, end in self.timings.values())
@@ -5,7 +5,7 @@ teams_converter.py — Convierte transcripciones de Microsoft Teams (.docx) al f
 Uso:
   python scripts/teams_converter.py <input.docx> <output_dir>
 
-Requisitos: ninguno (solo Python stdlib — zipfile + xml.etree.ElementTree).
+Requisitos: ninguno (solo Python stdlib — zipfile + xml.etree.ElementTree.iterparse).
 
 Salida en output_dir/:
   transcripcion_combinada.json
@@ -22,6 +22,7 @@ import zipfile
 import xml.etree.ElementTree as ET
 from datetime import timedelta
 from pathlib import Path
+from typing import Iterable, Iterator
 
 # ---------------------------------------------------------------------------
 # Constantes
@@ -90,31 +91,49 @@ def _try_speaker(line: str):
 # Extracción de texto del DOCX
 # ---------------------------------------------------------------------------
 
-def extract_paragraphs(docx_path: Path) -> list:
-    """Extrae párrafos de texto plano de un .docx usando solo la stdlib."""
-    paragraphs = []
+def extract_paragraphs(docx_path: Path) -> Iterator[str]:
+    """Genera los párrafos de texto plano de un .docx usando solo la stdlib.
+
+    word/document.xml se lee en streaming (iterparse sobre el miembro del zip)
+    y cada elemento se libera en cuanto no queda ningún párrafo abierto que lo
+    contenga, así la memoria no crece con el tamaño de la transcripción."""
+    para_tag = f"{{{W}}}p"
     with zipfile.ZipFile(docx_path) as z:
         with z.open("word/document.xml") as f:
-            root = ET.fromstring(f.read())
-
-    for para in root.iter(f"{{{W}}}p"):
-        # Unir todos los nodos <w:t> del párrafo (respetando xml:space="preserve")
-        parts = []
-        for t in para.iter(f"{{{W}}}t"):
-            parts.append(t.text or "")
-        text = "".join(parts).strip()
-        if text:
-            paragraphs.append(text)
-
-    return paragraphs
+            stack = []       # Elementos abiertos (para soltar cada uno de su padre)
+            # Un <w:p> puede contener otros (p. ej. cuadros de texto). Cada párrafo
+            # reserva su hueco en `texts` al abrirse y lo rellena al cerrarse; al
+            # cerrar el exterior salen todos en orden de apertura, como con root.iter
+            open_paras = []  # Hueco en `texts` de cada párrafo abierto
+            texts = []
+            for event, elem in ET.iterparse(f, events=("start", "end")):
+                if event == "start":
+                    stack.append(elem)
+                    if elem.tag == para_tag:
+                        open_paras.append(len(texts))
+                        texts.append("")
+                    continue
+
+                stack.pop()
+                if elem.tag == para_tag:
+                    # Unir todos los nodos <w:t> del párrafo (respetando xml:space="preserve")
+                    texts[open_paras.pop()] = "".join(
+                        t.text or "" for t in elem.iter(f"{{{W}}}t")
+                    ).strip()
+                    if not open_paras:
+                        yield from (text for text in texts if text)
+                        texts = []
+                if not open_paras and stack:
+                    # Fuera de un párrafo ya nadie necesita el elemento
+                    stack[-1].remove(elem)
 
 
 # ---------------------------------------------------------------------------
 # Parsing del formato Teams
 # ---------------------------------------------------------------------------
 
-def parse_paragraphs(paragraphs: list) -> list:
-    """Convierte la lista de párrafos en segmentos AIRecorder.
+def parse_paragraphs(paragraphs: Iterable[str]) -> list:
+    """Convierte los párrafos (lista o generador) en segmentos AIRecorder.
 
     Soporta dos formatos de Teams:
     - Inline: "Speaker   M:SS<texto>" — todo en un párrafo (formato actual de Teams).
@@ -241,14 +260,13 @@ def main():
 
     output_dir.mkdir(parents=True, exist_ok=True)
 
+    # extract_paragraphs es un generador: los errores del DOCX aparecen al consumirlo
     try:
-        paragraphs = extract_paragraphs(input_path)
-    except (zipfile.BadZipFile, KeyError) as e:
+        segments = parse_paragraphs(extract_paragraphs(input_path))
+    except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
         print(f"Error leyendo el DOCX: {e}", file=sys.stderr)
         sys.exit(1)
 
-    segments = parse_paragraphs(paragraphs)
-
     if not segments:
         print(
             "No se encontraron segmentos. Verifica que el archivo sea una transcripción de Teams.",
@@ -0,0 +1,7 @@
+"""Los tests importan los scripts de python/ y los backends falsos de benchmarks/ como módulos."""
+
+import os
+import sys
+
+PYTHON_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [PYTHON_DIR, os.path.join(PYTHON_DIR, "benchmarks")]
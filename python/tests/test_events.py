@@ -0,0 +1,47 @@
+"""events: model_selection y draft_ready como eventos con --events y como líneas clásicas sin él."""
+
+import io
+import json
+
+import events
+
+CHOICE = {"model": "small", "beam_size": 5, "eta_s": 42.0, "budget_s": 60.0, "fits": True}
+
+
+def _event_stream():
+    stream = events.EventStream()
+    # Lo que hace enable() sin tocar el sys.stdout del proceso de tests
+    stream.stream = io.StringIO()
+    stream.enabled = True
+    return stream
+
+
+def _events(stream):
+    lines = stream.stream.getvalue().splitlines()
+    assert all(line.startswith(events.PREFIX) for line in lines)
+    return [json.loads(line[len(events.PREFIX):]) for line in lines]
+
+
+def test_signals_are_typed_events_with_events_enabled(capsys):
+    stream = _event_stream()
+    stream.progress(30)
+    stream.model_selection(CHOICE)
+    stream.draft_ready("tiny", 3.5)
+
+    emitted = _events(stream)
+    assert [e["type"] for e in emitted] == ["progress", "model_selection", "draft_ready"]
+    assert {k: emitted[1][k] for k in CHOICE} == CHOICE
+    assert (emitted[2]["model"], emitted[2]["elapsed_s"]) == ("tiny", 3.5)
+    assert capsys.readouterr().out == ""
+
+
+def test_signals_keep_the_classic_lines_without_events(capsys):
+    stream = events.EventStream()
+    stream.model_selection(CHOICE)
+    stream.draft_ready("tiny", 3.5)
+
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [
+        f"MODEL_SELECTION:{json.dumps(CHOICE)}",
+        'DRAFT_READY:{"model": "tiny", "elapsed_s": 3.5}',
+    ]
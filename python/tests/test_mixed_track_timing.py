@@ -0,0 +1,66 @@
+"""--mix_mode: los turnos del usuario deben quedar en los mismos tiempos que con pistas separadas."""
+
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sf = pytest.importorskip("soundfile")
+pytest.importorskip("pydub")
+
+import audio_sync_analyzer  # noqa: E402
+import fake_backends  # noqa: E402
+import synthetic  # noqa: E402
+
+SAMPLE_RATE = 16000
+# Whisper falso: tramas de 100 ms; el lag de la mezcla se redondea a ms
+TOLERANCE = 0.15
+
+
+def _user_turns(output_dir):
+    with open(output_dir / "transcripcion_combinada.json", encoding="utf-8") as f:
+        combined = json.load(f)
+    return [(s["start"], s["end"]) for s in combined["segments"] if s["speaker"] == "USUARIO"]
+
+
+def _run(tmp_path, mix_mode):
+    recording = tmp_path / "mixpair"
+    output_dir = tmp_path / f"out-{mix_mode}"
+    analyzer = audio_sync_analyzer.AudioSyncAnalyzer(
+        str(recording / "mixpair-microphone.wav"),
+        str(recording / "mixpair-system.wav"),
+        str(output_dir),
+        mix_mode=mix_mode,
+    )
+    assert analyzer.run_full_analysis()
+    return analyzer, _user_turns(output_dir)
+
+
+def test_mix_mode_user_turns_match_separate_tracks(tmp_path, monkeypatch):
+    fake_backends.install_whisper(audio_sync_analyzer, speed=1000)
+    monkeypatch.setattr(audio_sync_analyzer, "SAMPLE_RATE", 4000)
+    pair = synthetic.make_dual_track(
+        120, sample_rate=SAMPLE_RATE, lag=0.4, user_talk_ratio=0.06, silence_ratio=0.5, seed=3
+    )
+    recording = tmp_path / "mixpair"
+    recording.mkdir()
+    sf.write(recording / "mixpair-microphone.wav", pair.mic, SAMPLE_RATE)
+    sf.write(recording / "mixpair-system.wav", pair.system, SAMPLE_RATE)
+
+    mixed, mixed_turns = _run(tmp_path, "on")
+    separate, separate_turns = _run(tmp_path, "off")
+    assert mixed.mixed_audio is not None and separate.mixed_audio is None
+    assert mixed_turns, "la mezcla no atribuyó ningún segmento al usuario"
+
+    # Cada turno del usuario en la mezcla empieza donde habló (tiempo de mic) con la
+    # corrección de lag + latencia aplicada una sola vez, como en pistas separadas
+    for start, _ in mixed_turns:
+        expected = [
+            mic_start - mixed._get_dynamic_lag(mic_start) + mixed.hardware_bias
+            for mic_start, _ in pair.mic_intervals
+        ]
+        assert min(abs(start - e) for e in expected) <= TOLERANCE
+
+    # El primer turno (sin fuga del sistema alrededor) coincide entre los dos modos
+    assert mixed_turns[0][0] == pytest.approx(separate_turns[0][0], abs=TOLERANCE)
+    assert mixed_turns[0][1] == pytest.approx(separate_turns[0][1], abs=TOLERANCE)
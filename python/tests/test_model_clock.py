@@ -0,0 +1,26 @@
+"""ModelClock: el tiempo de modelo es la unión de intervalos, no su suma."""
+
+import pytest
+
+from fake_backends import ModelClock
+
+
+def test_overlapping_calls_count_once():
+    clock = ModelClock()
+    # Dos hilos a la vez entre 0 y 4, y una llamada suelta entre 6 y 7
+    clock.add("whisper", 0.0, 3.0)
+    clock.add("pyannote", 1.0, 4.0)
+    clock.add("whisper", 6.0, 7.0)
+
+    assert clock.total() == pytest.approx(7.0)
+    assert clock.busy() == pytest.approx(5.0)
+    assert clock.calls == {"whisper": 2, "pyannote": 1}
+
+
+def test_nested_and_touching_intervals():
+    clock = ModelClock()
+    clock.add("a", 0.0, 10.0)
+    clock.add("b", 2.0, 3.0)
+    clock.add("c", 10.0, 12.0)
+    assert clock.busy() == pytest.approx(12.0)
+    assert ModelClock().busy() == 0.0
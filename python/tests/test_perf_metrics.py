@@ -0,0 +1,88 @@
+"""PerfRecorder con profile=True: un perfil por etapa, también en los hilos del grafo."""
+
+import os
+import threading
+import time
+
+import pytest
+
+import perf_metrics
+from perf_metrics import PerfRecorder
+from stage_graph import StageGraph
+
+
+def _busy(info):
+    sum(i * i for i in range(20000))
+    return threading.current_thread().name
+
+
+def _profiles(output_dir):
+    return sorted(
+        name.split("_", 1)[1][: -len(".prof")]
+        for name in os.listdir(output_dir / "profile")
+        if name.endswith(".prof")
+    )
+
+
+def test_profile_dumps_one_file_per_graph_stage(tmp_path):
+    perf = PerfRecorder("test", str(tmp_path), profile=True)
+    graph = StageGraph(perf, max_workers=3)
+    graph.add("a", _busy)
+    graph.add("b", _busy)
+    graph.add("c", _busy, deps=["a", "b"])
+    with perf.stage("stage_graph", profile=False):
+        assert graph.run()
+
+    assert _profiles(tmp_path) == ["a", "b", "c"]
+    # Las etapas corren en el pool, no en el hilo principal
+    assert all(name.startswith("stage") for name in graph.results.values())
+    by_stage = {m["stage"]: m for m in perf.stages}
+    assert all("py_alloc_peak_mb" in by_stage[name] for name in "abc")
+    assert "py_alloc_peak_mb" not in by_stage["stage_graph"]
+
+
+def test_nested_and_concurrent_stages_are_only_timed(tmp_path):
+    perf = PerfRecorder("test", str(tmp_path), profile=True)
+    entered = threading.Event()
+    release = threading.Event()
+
+    def other_thread():
+        with perf.stage("other"):
+            entered.set()
+            release.wait(5)
+
+    with perf.stage("outer"):
+        with perf.stage("inner"):
+            pass
+        worker = threading.Thread(target=other_thread)
+        worker.start()
+        assert entered.wait(5)
+        release.set()
+        worker.join()
+    with perf.stage("after"):
+        time.sleep(0.01)
+
+    assert _profiles(tmp_path) == ["after", "outer"]
+
+
+def test_stage_peak_rss_is_sampled_per_stage_not_the_process_high_water_mark(tmp_path):
+    perf = PerfRecorder("test", str(tmp_path))
+    if perf_metrics.current_rss_mb() is None:
+        pytest.skip("sin forma de leer el RSS en esta plataforma")
+
+    with perf.stage("big"):
+        block = b"x" * (200 * 1024 * 1024)
+        time.sleep(3 * perf_metrics.RSS_SAMPLE_INTERVAL)
+        del block
+    with perf.stage("small"):
+        time.sleep(3 * perf_metrics.RSS_SAMPLE_INTERVAL)
+
+    big, small = (m["peak_rss_mb"] for m in perf.stages)
+    # El bloque de 200 MB ya se liberó: la etapa siguiente no hereda el pico
+    assert big - small > 150
+    assert perf.summary()["process_peak_rss_mb"] >= big - 1
+
+
+def test_recorded_steps_have_no_sampled_rss():
+    perf = PerfRecorder("test")
+    assert perf.record("diarize.segmentation", 1.0, 0.5)["peak_rss_mb"] is None
@@ -0,0 +1,91 @@
+"""--recombine: guardar → cargar → recombinar reproduce la transcripción combinada."""
+
+import argparse
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pydub")
+
+import audio_sync_analyzer  # noqa: E402
+import raw_results  # noqa: E402
+from transcript_records import Word  # noqa: E402
+
+
+def _track(*segments):
+    return {
+        "text": " ".join(text for _, _, text in segments),
+        "segments": [
+            {"start": start, "end": end, "text": text, "avg_logprob": -0.2, "quality": "final"}
+            for start, end, text in segments
+        ],
+        "words": [Word(start, end, text) for start, end, text in segments],
+    }
+
+
+MIC = _track((1.5, 2.5, "hola"), (9.5, 11.0, "perfecto"))
+SYSTEM = _track((3.0, 5.0, "buenas tardes"), (5.5, 8.0, "empezamos"))
+
+
+def _analyzer(output_dir):
+    return audio_sync_analyzer.AudioSyncAnalyzer(
+        str(output_dir / "mic.wav"), str(output_dir / "sys.wav"), str(output_dir)
+    )
+
+
+def _combined(output_dir):
+    with open(output_dir / "transcripcion_combinada.json", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _recombine_args(**overrides):
+    args = {"diarization_file": None, "merge_gap": audio_sync_analyzer.MERGE_GAP_SECONDS}
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+
+def test_recombine_reproduces_the_original_combination(tmp_path):
+    analyzer = _analyzer(tmp_path)
+    # Micrófono 0.5 s por delante del sistema, con deriva y sesgo de hardware
+    analyzer.base_lag, analyzer.drift_slope, analyzer.hardware_bias = 0.5, 0.001, 0.02
+    analyzer.combine_transcriptions(MIC, SYSTEM, lag_seconds=0.5, quality="final")
+    analyzer.save_raw_results(MIC, SYSTEM, True, True, 0.5, quality="final")
+    original = _combined(tmp_path)
+    (tmp_path / "transcripcion_combinada.json").unlink()
+
+    raw = raw_results.load(str(tmp_path))
+    assert raw["sync"] == {"base_lag": 0.5, "drift_slope": 0.001, "hardware_bias": 0.02, "lag_seconds": 0.5}
+    assert [w.text for w in raw["mic"]["words"]] == ["hola", "perfecto"]
+
+    audio_sync_analyzer.run_recombine(
+        _recombine_args(), str(tmp_path / "mic.wav"), str(tmp_path / "sys.wav"), str(tmp_path)
+    )
+
+    assert _combined(tmp_path) == original
+    assert [t["speaker"] for t in original["segments"]] == ["USUARIO", "SISTEMA", "USUARIO"]
+
+
+def test_recombine_uses_the_new_merge_gap(tmp_path):
+    analyzer = _analyzer(tmp_path)
+    analyzer.save_raw_results(None, SYSTEM, False, True, 0)
+
+    audio_sync_analyzer.run_recombine(_recombine_args(merge_gap=0.1), "mic.wav", "sys.wav", str(tmp_path))
+
+    assert [t["text"] for t in _combined(tmp_path)["segments"]] == ["buenas tardes", "empezamos"]
+
+
+@pytest.mark.parametrize(
+    "content",
+    ['{"version": "1.0", "tracks": {', '{"version": "9.0"}'],
+    ids=["truncated", "unsupported-version"],
+)
+def test_unreadable_raw_results_exit_with_fatal_error(tmp_path, capsys, content):
+    with open(raw_results.raw_path(str(tmp_path)), "w", encoding="utf-8") as f:
+        f.write(content)
+
+    with pytest.raises(SystemExit) as exit_info:
+        audio_sync_analyzer.run_recombine(_recombine_args(), "mic.wav", "sys.wav", str(tmp_path))
+
+    assert exit_info.value.code == 1
+    assert "FATAL_ERROR:" in capsys.readouterr().err
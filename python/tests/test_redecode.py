@@ -0,0 +1,118 @@
+"""redecode_track: ventanas débiles, margen recortado a los vecinos y empalme de segmentos y palabras."""
+
+import pytest
+
+pytest.importorskip("numpy")
+AudioSegment = pytest.importorskip("pydub").AudioSegment
+
+import redecode  # noqa: E402
+from transcript_records import Word  # noqa: E402
+
+GOOD = -0.2
+WEAK = -1.5
+
+
+def _segment(start, end, text, logprob=GOOD):
+    return {"start": start, "end": end, "text": text, "avg_logprob": logprob}
+
+
+def _result(segments):
+    # Una palabra por segmento, en su inicio
+    words = [Word(s["start"], s["end"], s["text"]) for s in segments]
+    return {"segments": segments, "words": words, "text": " ".join(s["text"] for s in segments)}
+
+
+class FakeTranscribe:
+    """transcribe(samples) que anota la duración de cada recorte y devuelve una respuesta fija."""
+
+    def __init__(self, segments, words=()):
+        self.segments = segments
+        self.words = list(words)
+        self.clips = []
+
+    def __call__(self, samples):
+        self.clips.append(len(samples) / redecode.WHISPER_SAMPLE_RATE)
+        return {"segments": [dict(s) for s in self.segments], "words": self.words}
+
+
+@pytest.fixture
+def audio():
+    return AudioSegment.silent(duration=10_000, frame_rate=redecode.WHISPER_SAMPLE_RATE)
+
+
+def test_replaced_window_keeps_outside_words_and_drops_old_inside(audio):
+    result = _result(
+        [
+            _segment(0.0, 2.0, "antes"),
+            _segment(2.1, 4.0, "mal", WEAK),
+            _segment(4.1, 6.0, "después"),
+        ]
+    )
+    # Tiempos relativos al recorte; el recorte empieza en el final del vecino (2.0)
+    transcribe = FakeTranscribe([_segment(0.2, 1.9, "bien", GOOD)], [Word(0.2, 1.9, "bien")])
+
+    spliced, stats = redecode.redecode_track(result, audio, transcribe)
+
+    # Margen de 0.3 s recortado a los vecinos: [2.0, 4.1) en lugar de [1.8, 4.3)
+    assert transcribe.clips == [pytest.approx(2.1, abs=1e-3)]
+    assert stats["replaced"] == 1
+    assert [s["text"] for s in spliced["segments"]] == ["antes", "bien", "después"]
+    assert spliced["segments"][1]["start"] == pytest.approx(2.2)
+    assert [(round(w.start, 2), w.text) for w in spliced["words"]] == [
+        (0.0, "antes"),
+        (2.2, "bien"),
+        (4.1, "después"),
+    ]
+    assert spliced["text"] == "antes bien después"
+    # El resultado original no se modifica
+    assert [s["text"] for s in result["segments"]] == ["antes", "mal", "después"]
+
+
+def test_rejected_window_leaves_result_untouched(audio):
+    result = _result(
+        [
+            _segment(0.0, 2.0, "antes"),
+            _segment(2.1, 4.0, "mal", WEAK),
+            _segment(4.1, 6.0, "después"),
+        ]
+    )
+    # La segunda pasada no mejora la confianza media: se descarta
+    transcribe = FakeTranscribe([_segment(0.2, 1.9, "peor", -2.0)], [Word(0.2, 1.9, "peor")])
+
+    spliced, stats = redecode.redecode_track(result, audio, transcribe)
+
+    assert spliced is result
+    assert (stats["windows"], stats["replaced"]) == (1, 0)
+
+
+def test_empty_redecode_only_replaces_likely_hallucinations(audio):
+    hallucinated = dict(_segment(2.1, 4.0, "gracias por ver", WEAK), no_speech_prob=0.9)
+    result = _result([_segment(0.0, 2.0, "antes"), hallucinated])
+
+    spliced, stats = redecode.redecode_track(result, audio, FakeTranscribe([]))
+
+    assert stats["replaced"] == 1
+    assert [s["text"] for s in spliced["segments"]] == ["antes"]
+    assert [w.text for w in spliced["words"]] == ["antes"]
+
+
+def test_adjacent_weak_segments_share_one_window(audio):
+    result = _result(
+        [
+            _segment(0.0, 1.0, "uno"),
+            _segment(1.2, 2.0, "dos", WEAK),
+            _segment(2.5, 3.5, "tres", WEAK),
+            _segment(5.0, 6.0, "cuatro"),
+            _segment(7.5, 8.0, "cinco", WEAK),
+        ]
+    )
+    assert redecode.weak_windows(result["segments"]) == [(1, 2), (4, 4)]
+
+    transcribe = FakeTranscribe([_segment(0.1, 0.5, "nuevo", GOOD)], [Word(0.1, 0.5, "nuevo")])
+    spliced, stats = redecode.redecode_track(result, audio, transcribe)
+
+    # Una llamada por ventana: [1.0, 3.8) y [7.2, 8.3)
+    assert transcribe.clips == [pytest.approx(2.8, abs=1e-3), pytest.approx(1.1, abs=1e-3)]
+    assert stats == {"segments": 5, "weak": 3, "windows": 2, "replaced": 2, "redecoded_s": 3.9}
+    assert [s["text"] for s in spliced["segments"]] == ["uno", "nuevo", "cuatro", "nuevo"]
+    assert [w.text for w in spliced["words"]] == ["uno", "nuevo", "cuatro", "nuevo"]
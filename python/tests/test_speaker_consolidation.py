@@ -0,0 +1,93 @@
+"""merge_plan/consolidate: umbral, límites de hablantes y uniones forzadas."""
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import speaker_consolidation  # noqa: E402
+
+
+def _unit(*values):
+    vector = np.array(values, dtype=np.float64)
+    return vector / np.linalg.norm(vector)
+
+
+# A y B son casi la misma voz (similitud ≈ 0.99); C es otra persona (≈ 0.1 con ambas)
+VOICES = {
+    "A": _unit(1.0, 0.1, 0.0),
+    "B": _unit(1.0, 0.0, 0.1),
+    "C": _unit(0.1, 0.0, 1.0),
+}
+
+
+def _speakers(*labels, seconds=None):
+    """Un segmento por etiqueta (con la duración dada) y su vector."""
+    segments, vectors, start = [], [], 0.0
+    for label in labels:
+        length = (seconds or {}).get(label, 1.0)
+        segments.append({"start": start, "end": start + length, "speaker": label})
+        vectors.append(VOICES[label])
+        start += length + 1.0
+    return segments, np.stack(vectors)
+
+
+def test_merges_only_pairs_above_threshold():
+    segments, vectors = _speakers("A", "B", "C", seconds={"A": 3.0})
+    assert speaker_consolidation.merge_plan(segments, vectors, threshold=0.9) == {"B": "A"}
+
+
+def test_nothing_merges_when_no_pair_reaches_threshold():
+    segments, vectors = _speakers("A", "B", "C")
+    assert speaker_consolidation.merge_plan(segments, vectors, threshold=0.999) == {}
+
+
+def test_survivor_is_the_label_with_more_speech():
+    segments, vectors = _speakers("A", "B", seconds={"B": 5.0})
+    assert speaker_consolidation.merge_plan(segments, vectors, threshold=0.9) == {"A": "B"}
+
+
+def test_min_speakers_stops_merging():
+    segments, vectors = _speakers("A", "B", "C")
+    # Con umbral 0 todo se uniría; min_speakers=2 deja dos grupos (A+B y C)
+    plan = speaker_consolidation.merge_plan(segments, vectors, threshold=0.0, min_speakers=2)
+    assert len(plan) == 1 and set(plan) | set(plan.values()) == {"A", "B"}
+
+
+def test_max_speakers_forces_the_most_similar_merge():
+    segments, vectors = _speakers("A", "B", "C", seconds={"A": 3.0})
+    # Ninguna pareja llega al umbral: max_speakers=2 fuerza solo la más parecida
+    plan = speaker_consolidation.merge_plan(segments, vectors, threshold=0.999, max_speakers=2)
+    assert plan == {"B": "A"}
+
+
+def test_max_speakers_already_met_does_not_force():
+    segments, vectors = _speakers("A", "B", "C")
+    assert speaker_consolidation.merge_plan(segments, vectors, threshold=0.999, max_speakers=3) == {}
+
+
+def test_speakers_without_embedding_are_left_alone():
+    segments, vectors = _speakers("A", "B", "C")
+    vectors[2] = np.nan
+    plan = speaker_consolidation.merge_plan(segments, vectors, threshold=0.0, max_speakers=1)
+    assert "C" not in plan and "C" not in plan.values()
+
+
+def test_consolidate_relabels_and_joins_adjacent_segments():
+    segments = [
+        {"start": 0.0, "end": 2.0, "speaker": "A"},
+        {"start": 2.1, "end": 3.0, "speaker": "B"},
+        {"start": 5.0, "end": 6.0, "speaker": "C"},
+    ]
+    vectors = np.stack([VOICES["A"], VOICES["B"], VOICES["C"]])
+    merged, centroids, stats = speaker_consolidation.consolidate(segments, vectors, threshold=0.9)
+    assert [(s["start"], s["end"], s["speaker"]) for s in merged] == [(0.0, 3.0, "A"), (5.0, 6.0, "C")]
+    assert set(centroids) == {"A", "C"}
+    assert (stats["speakers_before"], stats["speakers_after"]) == (3, 2)
+
+
+def test_consolidate_reports_forced_merges():
+    segments, vectors = _speakers("A", "B", "C", seconds={"A": 3.0, "C": 2.0})
+    # Umbral 0.9: A+B se unen por similitud; max_speakers=1 fuerza además C
+    _, _, stats = speaker_consolidation.consolidate(segments, vectors, threshold=0.9, max_speakers=1)
+    assert stats["merged"] == {"B": "A", "C": "A"}
+    assert stats["forced"] == {"C": "A"}
@@ -0,0 +1,45 @@
+"""speaker_index: centroides de diarizaciones con embeddings en el JSON o en el .npy."""
+
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+import embedding_cache  # noqa: E402
+import speaker_index  # noqa: E402
+
+CENTROIDS = {
+    "SPEAKER_00": np.array([1.0, 0.0, 0.0], dtype=np.float32),
+    "SPEAKER_01": np.array([0.0, 1.0, 0.0], dtype=np.float32),
+}
+
+
+def _write_diarization(path, embeddings_format):
+    output = {"version": "2.0", "segments": [], "speaker_embeddings": {}}
+    if embeddings_format == "inline":
+        output["speaker_embeddings"] = {s: v.tolist() for s, v in CENTROIDS.items()}
+    else:
+        output["speaker_embeddings_file"] = embedding_cache.save_centroids(str(path), CENTROIDS)
+    path.write_text(json.dumps(output), encoding="utf-8")
+    return str(path)
+
+
+@pytest.mark.parametrize("embeddings_format", ["inline", "npy"])
+def test_enroll_and_query_from_diarization(tmp_path, embeddings_format):
+    diarization = _write_diarization(tmp_path / "diarization.json", embeddings_format)
+    embeddings = speaker_index._diarization_embeddings(diarization)
+    assert set(embeddings) == set(CENTROIDS)
+
+    index = speaker_index.SpeakerIndex(str(tmp_path / "index"))
+    index.add("ana", embeddings["SPEAKER_01"])
+    matches = index.resolve(embeddings, k=1)
+    assert matches["SPEAKER_01"][0]["id"] == "ana"
+    assert matches["SPEAKER_01"][0]["similarity"] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_diarization_without_embeddings_is_rejected(tmp_path):
+    path = tmp_path / "diarization.json"
+    path.write_text(json.dumps({"segments": [], "speaker_embeddings": {}}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        speaker_index._diarization_embeddings(str(path))
@@ -0,0 +1,123 @@
+"""StageGraph: orden por dependencias, abortos, excepciones y ruta crítica."""
+
+import threading
+import time
+
+import pytest
+
+from perf_metrics import PerfRecorder
+from stage_graph import StageGraph
+
+
+def _graph(max_workers=3):
+    return StageGraph(PerfRecorder("test"), max_workers=max_workers)
+
+
+def _recorder(log, name, seconds=0.0, result=True):
+    def fn(info):
+        log.append(("start", name))
+        time.sleep(seconds)
+        log.append(("end", name))
+        return result
+
+    return fn
+
+
+def test_stages_start_after_their_dependencies():
+    log = []
+    graph = _graph()
+    graph.add("decode", _recorder(log, "decode", 0.02))
+    graph.add("sync", _recorder(log, "sync", 0.01), deps=["decode"])
+    graph.add("transcribe", _recorder(log, "transcribe", 0.03), deps=["decode"])
+    graph.add("combine", _recorder(log, "combine"), deps=["sync", "transcribe"])
+
+    assert graph.run()
+    order = {event: i for i, event in enumerate(log)}
+    for stage, deps in (("sync", ["decode"]), ("transcribe", ["decode"]), ("combine", ["sync", "transcribe"])):
+        assert all(order[("end", d)] < order[("start", stage)] for d in deps)
+    assert set(graph.results) == {"decode", "sync", "transcribe", "combine"}
+    assert [m["stage"] for m in graph.perf.stages][0] == "decode"
+
+
+def test_independent_stages_run_in_parallel():
+    barrier = threading.Barrier(2, timeout=5)
+    graph = _graph()
+    # Solo terminan si las dos están en marcha a la vez
+    graph.add("a", lambda info: barrier.wait())
+    graph.add("b", lambda info: barrier.wait())
+    assert graph.run()
+
+
+def test_required_stage_returning_false_aborts_without_starting_dependents():
+    log = []
+    graph = _graph()
+    graph.add("model_ready", _recorder(log, "model_ready", result=False), required=True)
+    graph.add("report", _recorder(log, "report"))
+    graph.add("transcription", _recorder(log, "transcription"), deps=["model_ready"])
+    graph.add("combine", _recorder(log, "combine"), deps=["transcription"])
+
+    assert graph.run() is False
+    assert graph.aborted_by == "model_ready"
+    started = {name for event, name in log if event == "start"}
+    assert "transcription" not in started and "combine" not in started
+
+
+def test_optional_stage_returning_false_does_not_abort():
+    graph = _graph()
+    graph.add("report", lambda info: False)
+    graph.add("combine", lambda info: True, deps=["report"])
+    assert graph.run()
+    assert graph.aborted_by is None
+
+
+def test_exception_is_reraised_after_running_stages_finish():
+    log = []
+    graph = _graph()
+
+    def broken(info):
+        time.sleep(0.01)
+        raise RuntimeError("boom")
+
+    graph.add("broken", broken)
+    graph.add("slow", _recorder(log, "slow", 0.1))
+    graph.add("after_broken", _recorder(log, "after_broken"), deps=["broken"])
+
+    with pytest.raises(RuntimeError, match="boom"):
+        graph.run()
+    # La etapa en marcha terminó antes de relanzar; la dependiente nunca arrancó
+    assert log == [("start", "slow"), ("end", "slow")]
+    statuses = {m["stage"]: m["status"] for m in graph.perf.stages}
+    assert statuses == {"broken": "error", "slow": "ok"}
+
+
+def test_unknown_dependency_is_rejected():
+    graph = _graph()
+    graph.add("combine", lambda info: True, deps=["missing"])
+    with pytest.raises(ValueError, match="missing"):
+        graph.run()
+
+
+def test_critical_path_follows_the_dependency_that_finished_last():
+    graph = _graph()
+    graph.stages = {
+        "decode": {"deps": []},
+        "sync": {"deps": ["decode"]},
+        "model_ready": {"deps": []},
+        "transcription": {"deps": ["model_ready", "decode"]},
+        "report": {"deps": ["sync"]},
+        "combine": {"deps": ["transcription", "sync"]},
+    }
+    graph.timings = {
+        "decode": (0.0, 1.0),
+        "model_ready": (0.0, 3.0),
+        "sync": (1.0, 2.0),
+        "report": (2.0, 2.5),
+        "transcription": (3.0, 9.0),
+        "combine": (9.0, 9.5),
+    }
+
+    path = graph.critical_path()
+    assert [name for name, _ in path] == ["model_ready", "transcription", "combine"]
+    assert [seconds for _, seconds in path] == pytest.approx([3.0, 6.0, 0.5])
+    assert graph.wall_seconds() == 9.5
+    assert graph.busy_seconds() == pytest.approx(12.0)
@@ -0,0 +1,60 @@
+"""extract_paragraphs: mismo orden que la lectura completa con root.iter, también con párrafos anidados."""
+
+import xml.etree.ElementTree as ET
+import zipfile
+
+import teams_converter
+
+W = teams_converter.W
+
+
+def _p(*content):
+    return f"<w:p>{''.join(content)}</w:p>"
+
+
+def _r(text):
+    return f'<w:r><w:t xml:space="preserve">{text}</w:t></w:r>'
+
+
+def _textbox(*paragraphs):
+    # Cuadro de texto: los párrafos internos cuelgan de un run del párrafo exterior
+    return f"<w:r><w:pict><w:txbxContent>{''.join(paragraphs)}</w:txbxContent></w:pict></w:r>"
+
+
+def _docx(path, *paragraphs):
+    body = "".join(paragraphs)
+    document = f'<w:document xmlns:w="{W}"><w:body>{body}</w:body></w:document>'
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("word/document.xml", document)
+    return path
+
+
+def _baseline(path):
+    """extract_paragraphs original: documento entero en memoria y root.iter en orden de apertura."""
+    with zipfile.ZipFile(path) as z:
+        root = ET.fromstring(z.read("word/document.xml"))
+    texts = ("".join(t.text or "" for t in p.iter(f"{{{W}}}t")).strip() for p in root.iter(f"{{{W}}}p"))
+    return [text for text in texts if text]
+
+
+def test_nested_paragraphs_keep_document_order(tmp_path):
+    path = _docx(
+        tmp_path / "nested.docx",
+        _p(_r("Outer A "), _textbox(_p(_r("Inner B")))),
+        _p(_r("Next C")),
+        _p(_r("Box "), _textbox(_p(_r("Deep "), _textbox(_p(_r("D")))), _p(_r("E")))),
+        _p(),
+    )
+    expected = ["Outer A Inner B", "Inner B", "Next C", "Box Deep DE", "Deep D", "D", "E"]
+    assert _baseline(path) == expected
+    assert list(teams_converter.extract_paragraphs(path)) == expected
+
+
+def test_text_before_a_nested_header_stays_with_its_speaker(tmp_path):
+    path = _docx(
+        tmp_path / "speakers.docx",
+        _p(_r("Ana López   0:03Hola a todos")),
+        _p(_r("seguimos "), _textbox(_p(_r("Luis Pérez   0:10Buenas")))),
+    )
+    segments = teams_converter.parse_paragraphs(teams_converter.extract_paragraphs(path))
+    assert segments == teams_converter.parse_paragraphs(_baseline(path))
@@ -0,0 +1,19 @@
+"""merge_turns: unión de turnos del mismo hablante."""
+
+from transcript_records import Turn, merge_turns
+
+
+def _turn(start, end, text, speaker="SPEAKER_00"):
+    return Turn(start, end, text, speaker, "🔊", "system")
+
+
+def test_empty_segments_do_not_add_spaces():
+    turns = [_turn(0, 1, ""), _turn(1, 2, "hola"), _turn(2, 3, ""), _turn(3, 4, "qué tal"), _turn(4, 5, "")]
+    (merged,) = merge_turns(turns, max_gap=3.0)
+    assert merged["text"] == "hola qué tal"
+    assert (merged["start"], merged["end"]) == (0, 5)
+
+
+def test_speaker_change_starts_a_new_turn():
+    turns = [_turn(0, 1, "hola"), _turn(1, 2, "adiós", speaker="SPEAKER_01")]
+    assert [t["text"] for t in merge_turns(turns, max_gap=3.0)] == ["hola", "adiós"]
@@ -0,0 +1,97 @@
+"""two_pass: empalme refinado + borrador y su paso por combine_transcriptions."""
+
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("pydub")
+
+import audio_sync_analyzer  # noqa: E402
+import two_pass  # noqa: E402
+
+
+def _segment(start, end, text):
+    return {"start": start, "end": end, "text": text}
+
+
+DRAFT = {
+    "segments": [
+        _segment(0.0, 2.0, "hola"),
+        _segment(2.0, 4.0, "qué tal"),
+        _segment(4.0, 6.0, "todo bien"),
+        _segment(6.5, 8.0, "seguimos"),
+        _segment(8.5, 10.0, "adiós"),
+    ],
+    "text": "hola qué tal todo bien seguimos adiós",
+}
+
+
+def _drafts():
+    return two_pass.tag_results({"system": DRAFT, "mic": None}, two_pass.DRAFT)
+
+
+def _summary(result):
+    return [(s["start"], s["end"], s["text"], s["quality"]) for s in result["segments"]]
+
+
+def test_refined_prefix_replaces_draft_up_to_its_last_end():
+    drafts = _drafts()
+    refined = [_segment(0.0, 2.1, "Hola,"), _segment(2.1, 6.2, "¿qué tal? Todo bien.")]
+
+    spliced = two_pass.splice(drafts["system"], refined)
+
+    # El borrador que empieza antes de 6.2 ya está cubierto; desde ahí sigue el borrador
+    assert _summary(spliced) == [
+        (0.0, 2.1, "Hola,", "refined"),
+        (2.1, 6.2, "¿qué tal? Todo bien.", "refined"),
+        (6.5, 8.0, "seguimos", "draft"),
+        (8.5, 10.0, "adiós", "draft"),
+    ]
+    # Ni el borrador ni los segmentos refinados recibidos se modifican
+    assert all(s["quality"] == "draft" for s in drafts["system"]["segments"])
+    assert "quality" not in refined[0]
+
+
+def test_splice_without_refined_segments_keeps_the_draft():
+    drafts = _drafts()
+    assert _summary(two_pass.splice(drafts["system"], [])) == _summary(drafts["system"])
+    assert two_pass.splice(drafts["mic"], [_segment(0.0, 1.0, "x")]) is None
+
+
+def test_refinement_writer_flushes_spliced_results_at_most_every_interval():
+    written = []
+    writer = two_pass.RefinementWriter(_drafts(), written.append, interval=0)
+    writer.on_segment("system", [_segment(0.0, 2.1, "Hola,")])
+    writer.on_segment("system", [_segment(0.0, 2.1, "Hola,"), _segment(2.1, 4.0, "¿qué tal?")])
+
+    assert writer.flushes == 2
+    assert written[-1]["mic"] is None
+    assert [s["quality"] for s in written[-1]["system"]["segments"]] == [
+        "refined", "refined", "draft", "draft", "draft"
+    ]
+
+    slow = two_pass.RefinementWriter(_drafts(), written.append, interval=3600)
+    slow.on_segment("system", [_segment(0.0, 2.1, "Hola,")])
+    assert slow.flushes == 0
+
+
+def test_combine_keeps_quality_and_never_merges_draft_with_refined(tmp_path):
+    analyzer = audio_sync_analyzer.AudioSyncAnalyzer(
+        str(tmp_path / "mic.wav"), str(tmp_path / "sys.wav"), str(tmp_path)
+    )
+    # Todos los segmentos son del mismo hablante y están a menos de merge_gap
+    spliced = two_pass.splice(
+        _drafts()["system"], [_segment(0.0, 2.1, "Hola,"), _segment(2.1, 6.2, "¿qué tal?")]
+    )
+    analyzer.combine_transcriptions(
+        None, spliced, mic_exists=False, sys_exists=True, quality=two_pass.REFINING
+    )
+
+    with open(tmp_path / "transcripcion_combinada.json", encoding="utf-8") as f:
+        combined = json.load(f)
+    assert combined["metadata"]["quality"] == "refining"
+    assert [(t["start"], t["end"], t["text"], t["quality"]) for t in combined["segments"]] == [
+        (0.0, 6.2, "Hola, ¿qué tal?", "refined"),
+        (6.5, 10.0, "seguimos adiós", "draft"),
+    ]
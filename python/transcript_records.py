@@ -0,0 +1,123 @@
+"""
+transcript_records.py — Representación compacta de palabras y turnos de la transcripción.
+
+En una reunión larga Whisper produce cientos de miles de palabras; guardarlas
+como dicts cuesta ~4 veces más memoria que un objeto con `__slots__`. Los
+turnos de `combine_transcriptions` acumulan sus textos en una lista y se unen
+una sola vez al convertirlos a dict, justo antes de escribir el JSON (antes
+crecían con `+=`, cuadrático en turnos largos).
+
+`DiarizationIndex` busca el segmento de diarización de midpoint más cercano con
+bisect en lugar de recorrer toda la diarización por cada segmento de Whisper.
+"""
+
+import bisect
+import math
+
+
+class Word:
+    """Palabra con timestamps (la salida de `word_timestamps=True` de Whisper)."""
+
+    __slots__ = ("start", "end", "text")
+
+    def __init__(self, start, end, text):
+        self.start = start
+        self.end = end
+        self.text = text
+
+    def shifted(self, offset):
+        return Word(self.start + offset, self.end + offset, self.text)
+
+    def to_dict(self):
+        return {"start": self.start, "end": self.end, "text": self.text}
+
+    def __repr__(self):
+        return f"Word({self.start:.2f}, {self.end:.2f}, {self.text!r})"
+
+
+class Turn:
+    """Turno de palabra en construcción: segmentos consecutivos del mismo hablante."""
+
+    __slots__ = ("start", "end", "speaker", "emoji", "source", "quality", "parts")
+
+    def __init__(self, start, end, text, speaker, emoji, source, quality=None):
+        self.start = start
+        self.end = end
+        self.speaker = speaker
+        self.emoji = emoji
+        self.source = source
+        self.quality = quality
+        self.parts = [text]
+
+    def can_absorb(self, other, max_gap):
+        """Mismo hablante, misma calidad (dos pasadas) y pausa menor que max_gap."""
+        return (
+            other.speaker == self.speaker
+            and other.start - self.end < max_gap
+            and other.quality == self.quality
+        )
+
+    def absorb(self, other):
+        self.end = other.end
+        self.parts.extend(other.parts)
+
+    def to_dict(self):
+        # Mismo orden de claves que el JSON histórico. Los segmentos sin texto
+        # no aportan espacio (evita dobles espacios al unir)
+        turn = {
+            "start": self.start,
+            "end": self.end,
+            "text": " ".join(part for part in self.parts if part),
+            "speaker": self.speaker,
+            "emoji": self.emoji,
+            "source": self.source,
+        }
+        if self.quality is not None:
+            turn["quality"] = self.quality
+        return turn
+
+
+def merge_turns(turns, max_gap):
+    """Une turnos (ya ordenados) del mismo hablante separados menos de max_gap; devuelve dicts."""
+    merged = []
+    for turn in turns:
+        if merged and merged[-1].can_absorb(turn, max_gap):
+            merged[-1].absorb(turn)
+        else:
+            merged.append(turn)
+    return [turn.to_dict() for turn in merged]
+
+
+class DiarizationIndex:
+    """Locutor del segmento de diarización cuyo punto medio está más cerca de un instante.
+
+    Ante empates gana el segmento que aparece antes en el JSON, como en la
+    búsqueda lineal original."""
+
+    def __init__(self, segments):
+        entries = sorted(
+            ((d["start"] + d["end"]) / 2, i, d["speaker"]) for i, d in enumerate(segments)
+        )
+        self.mids = [e[0] for e in entries]
+        self.order = [e[1] for e in entries]
+        self.speakers = [e[2] for e in entries]
+
+    def __len__(self):
+        return len(self.mids)
+
+    def speaker_at(self, mid, default=None):
+        if not self.mids:
+            return default
+        pos = bisect.bisect_left(self.mids, mid)
+        best, best_dist = None, math.inf
+        # Los candidatos son los vecinos de `pos`; se amplía mientras haya empates
+        for step in (-1, 1):
+            i = pos if step == 1 else pos - 1
+            while 0 <= i < len(self.mids):
+                dist = abs(mid - self.mids[i])
+                if dist > best_dist:
+                    break
+                if dist < best_dist or self.order[i] < self.order[best]:
+                    best, best_dist = i, dist
+                i += step
+        return self.speakers[best]
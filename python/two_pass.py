@@ -0,0 +1,71 @@
+"""
+two_pass.py — Transcripción en dos pasadas (--draft_model).
+
+1. Borrador: un modelo pequeño transcribe ambas pistas y se escribe una
+   transcripcion_combinada.json completa enseguida (turnos con quality=draft).
+2. Refinado: el modelo configurado vuelve a transcribir. A medida que llegan
+   sus segmentos, la transcripción se reescribe sustituyendo el tramo ya
+   refinado de cada pista (quality=refined) y conservando el borrador del resto.
+
+El fichero final es idéntico al de una sola pasada con el modelo grande, salvo
+por el campo `quality` de cada turno.
+"""
+
+import threading
+import time
+
+DRAFT = "draft"
+REFINING = "refining"
+REFINED = "refined"
+FLUSH_INTERVAL_SECONDS = 20
+
+
+def tag_results(results, quality):
+    """Copia {pista: resultado} marcando cada segmento con su nivel de calidad."""
+    tagged = {}
+    for key, result in results.items():
+        if result is None:
+            tagged[key] = None
+            continue
+        tagged[key] = dict(
+            result, segments=[dict(s, quality=quality) for s in result["segments"]]
+        )
+    return tagged
+
+
+def splice(draft_result, refined_segments):
+    """Segmentos refinados hasta donde llegó el modelo grande + borrador a partir de ahí."""
+    if draft_result is None:
+        return None
+    refined = [dict(s, quality=REFINED) for s in refined_segments]
+    cutoff = refined[-1]["end"] if refined else 0.0
+    pending = [s for s in draft_result["segments"] if s["start"] >= cutoff]
+    return dict(draft_result, segments=refined + pending)
+
+
+class RefinementWriter:
+    """Reescribe la transcripción combinada durante el refinado, como mucho cada `interval` segundos.
+
+    `on_segment(pista, segmentos)` se llama desde los hilos de transcripción con
+    la lista de segmentos refinados acumulados hasta el momento."""
+
+    def __init__(self, drafts, write, interval=FLUSH_INTERVAL_SECONDS):
+        self.drafts = drafts
+        self.write = write
+        self.interval = interval
+        self.refined = {key: [] for key in drafts}
+        self.flushes = 0
+        self._last_flush = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def on_segment(self, key, segments):
+        with self._lock:
+            self.refined[key] = segments
+            if time.perf_counter() - self._last_flush < self.interval:
+                return
+            self._last_flush = time.perf_counter()
+            results = {
+                k: splice(self.drafts[k], list(self.refined[k])) for k in self.drafts
+            }
+            self.write(results)
+            self.flushes += 1
@@ -0,0 +1,246 @@
+"""
+whisper_tuning.py — Perfil por host y auto-ajuste de Whisper (compute_type, hilos, workers).
+
+La configuración óptima de faster-whisper cambia mucho entre un portátil de 8
+núcleos y una estación de 32. `tune_whisper()` mide un clip de referencia
+corto con distintas combinaciones y guarda la más rápida para el modelo en un
+perfil por host (`~/.airecorder/host_profiles/<host>.json`, o el directorio
+indicado en AIRECORDER_PROFILE_DIR). El analizador lo lee con
+`resolve_whisper_config()` cuando no se pasan overrides explícitos.
+
+La búsqueda es por descenso de coordenadas (compute_type → hilos → workers)
+en lugar de la rejilla completa, para que ajustar `large` no tarde horas.
+"""
+
+import json
+import os
+import platform
+import re
+import threading
+import time
+
+PROFILE_VERSION = 1
+DEFAULT_WHISPER_CONFIG = {"compute_type": "int8", "cpu_threads": 4, "num_workers": 1}
+DEFAULT_COMPUTE_TYPES = ("int8", "int8_float32", "int16", "float32")
+TUNE_CLIP_SECONDS = 30
+WHISPER_SAMPLE_RATE = 16000
+
+
+# ---------------------------------------------------------------------------
+# Perfil por host
+# ---------------------------------------------------------------------------
+
+
+def host_fingerprint():
+    return {
+        "node": platform.node(),
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count() or 1,
+    }
+
+
+def host_id():
+    fp = host_fingerprint()
+    raw = f"{fp['node']}-{fp['machine']}-{fp['cpu_count']}cpu"
+    return re.sub(r"[^A-Za-z0-9_.-]+", "_", raw) or "host"
+
+
+def profile_path():
+    base = os.environ.get("AIRECORDER_PROFILE_DIR") or os.path.join(
+        os.path.expanduser("~"), ".airecorder", "host_profiles"
+    )
+    return os.path.join(base, f"{host_id()}.json")
+
+
+def load_host_profile():
+    """Devuelve el perfil del host (vacío si no existe o está corrupto)."""
+    path = profile_path()
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("version") == PROFILE_VERSION:
+                return data
+        except Exception as e:
+            print(f"⚠️  Perfil de host ilegible ({path}): {e}", flush=True)
+    return {"version": PROFILE_VERSION, "host": host_fingerprint(), "whisper": {}}
+
+
+def save_host_profile(profile):
+    path = profile_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    profile["host"] = host_fingerprint()
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
+
+
+def resolve_whisper_config(model, compute_type=None, cpu_threads=None, num_workers=None):
+    """Combina overrides explícitos > perfil del host > valores por defecto.
+
+    Devuelve (config, origen) donde origen es 'override', 'profile' o 'default'
+    según de dónde salió la mayor parte de la configuración."""
+    overrides = {
+        "compute_type": compute_type,
+        "cpu_threads": cpu_threads,
+        "num_workers": num_workers,
+    }
+    tuned = load_host_profile().get("whisper", {}).get(model) or {}
+
+    config = {}
+    for key, default in DEFAULT_WHISPER_CONFIG.items():
+        if overrides[key] is not None:
+            config[key] = overrides[key]
+        elif tuned.get(key) is not None:
+            config[key] = tuned[key]
+        else:
+            config[key] = default
+
+    if all(v is not None for v in overrides.values()):
+        source = "override"
+    elif tuned:
+        source = "profile"
+    else:
+        source = "default"
+    return config, source
+
+
+# ---------------------------------------------------------------------------
+# Auto-ajuste
+# ---------------------------------------------------------------------------
+
+
+def thread_candidates(cpu_count=None):
+    cpu_count = cpu_count or os.cpu_count() or 1
+    options = {1, 2, 4, cpu_count // 2, (cpu_count * 3) // 4, cpu_count}
+    return sorted(t for t in options if 1 <= t <= cpu_count)
+
+
+def supported_compute_types():
+    try:
+        import ctranslate2
+
+        available = ctranslate2.get_supported_compute_types("cpu")
+        return [c for c in DEFAULT_COMPUTE_TYPES if c in available] or ["int8"]
+    except Exception:
+        return ["int8"]
+
+
+def load_reference_clip(path, seconds=TUNE_CLIP_SECONDS):
+    """Primeros `seconds` del audio como float32 mono a 16 kHz (lo que espera Whisper)."""
+    from faster_whisper import decode_audio
+
+    audio = decode_audio(path, sampling_rate=WHISPER_SAMPLE_RATE)
+    return audio[: int(seconds * WHISPER_SAMPLE_RATE)]
+
+
+def _measure(model_cls, model, clip, config, language, beam_size):
+    """Audio-segundos por segundo con `num_workers` transcripciones concurrentes del clip."""
+    whisper = model_cls(
+        model,
+        device="cpu",
+        compute_type=config["compute_type"],
+        cpu_threads=config["cpu_threads"],
+        num_workers=config["num_workers"],
+    )
+
+    def run_once():
+        segments, _ = whisper.transcribe(
+            clip, language=language, beam_size=beam_size, vad_filter=False
+        )
+        for _ in segments:
+            pass
+
+    # Calentamiento: la primera pasada incluye inicializaciones perezosas
+    run_once()
+
+    t0 = time.perf_counter()
+    workers = [threading.Thread(target=run_once) for _ in range(config["num_workers"])]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    wall = time.perf_counter() - t0
+    clip_seconds = len(clip) / WHISPER_SAMPLE_RATE
+    return clip_seconds * config["num_workers"] / wall if wall > 0 else 0.0
+
+
+def tune_whisper(
+    model,
+    clip,
+    model_cls=None,
+    language="es",
+    beam_size=1,
+    compute_types=None,
+    threads=None,
+    workers=(1, 2),
+    on_result=None,
+):
+    """Busca la configuración más rápida para `model` en este host y la guarda en el perfil.
+
+    Devuelve el dict guardado: {compute_type, cpu_threads, num_workers, audio_s_per_s, ...}."""
+    if model_cls is None:
+        from faster_whisper import WhisperModel as model_cls
+
+    compute_types = list(compute_types or supported_compute_types())
+    threads = list(threads or thread_candidates())
+    measured = {}
+
+    def score(config):
+        key = (config["compute_type"], config["cpu_threads"], config["num_workers"])
+        if key not in measured:
+            try:
+                speed = _measure(model_cls, model, clip, config, language, beam_size)
+            except Exception as e:
+                print(f"⚠️  Configuración {key} descartada: {e}", flush=True)
+                speed = 0.0
+            measured[key] = speed
+            if on_result:
+                on_result(dict(config, audio_s_per_s=speed))
+        return measured[key]
+
+    best = {
+        "compute_type": compute_types[0],
+        "cpu_threads": threads[len(threads) // 2],
+        "num_workers": 1,
+    }
+    for field, options in (
+        ("compute_type", compute_types),
+        ("cpu_threads", threads),
+        ("num_workers", [w for w in workers if w >= 1]),
+    ):
+        best = max(
+            (dict(best, **{field: option}) for option in options), key=score
+        )
+        # Con varios workers, cada uno usa sus propios hilos: probar también repartirlos
+        if field == "num_workers" and best["num_workers"] > 1:
+            shared = dict(
+                best, cpu_threads=max(1, best["cpu_threads"] // best["num_workers"])
+            )
+            if score(shared) > score(best):
+                best = shared
+
+    result = dict(
+        best,
+        audio_s_per_s=round(score(best), 3),
+        beam_size=beam_size,
+        clip_seconds=round(len(clip) / WHISPER_SAMPLE_RATE, 2),
+        tuned_at=time.time(),
+        candidates=[
+            {
+                "compute_type": k[0],
+                "cpu_threads": k[1],
+                "num_workers": k[2],
+                "audio_s_per_s": round(v, 3),
+            }
+            for k, v in sorted(measured.items(), key=lambda kv: -kv[1])
+        ],
+    )
+
+    profile = load_host_profile()
+    profile.setdefault("whisper", {})[model] = result
+    result["profile_path"] = save_host_profile(profile)
+    return result
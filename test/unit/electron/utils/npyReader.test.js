@@ -0,0 +1,77 @@
+import { describe, it, expect, afterEach } from 'vitest';
+import fs from 'fs';
+import os from 'os';
+import path from 'path';
+import { parseNpy, readSpeakerEmbeddings } from '../../../../electron/utils/npyReader.js';
+
+// Construye un .npy v1.0 como np.save (cabecera rellenada con espacios hasta múltiplo de 64)
+function buildNpy(descr, shape, body) {
+  const dict = `{'descr': '${descr}', 'fortran_order': False, 'shape': (${shape.join(', ')}${shape.length === 1 ? ',' : ''}), }`;
+  const padding = 64 - ((10 + dict.length + 1) % 64);
+  const header = Buffer.from(dict + ' '.repeat(padding % 64) + '\n', 'latin1');
+  const preamble = Buffer.from([0x93, 0x4e, 0x55, 0x4d, 0x50, 0x59, 1, 0, 0, 0]);
+  preamble.writeUInt16LE(header.length, 8);
+  return Buffer.concat([preamble, header, body]);
+}
+
+function float32Body(values) {
+  const body = Buffer.alloc(values.length * 4);
+  values.forEach((v, i) => body.writeFloatLE(v, i * 4));
+  return body;
+}
+
+describe('parseNpy — matrices de numpy', () => {
+  it('lee una matriz float32 con su forma', () => {
+    const { shape, data } = parseNpy(buildNpy('<f4', [2, 3], float32Body([1, 2, 3, -4, 5.5, 0])));
+
+    expect(shape).toEqual([2, 3]);
+    expect(Array.from(data)).toEqual([1, 2, 3, -4, 5.5, 0]);
+  });
+
+  it('decodifica float16 (normales, negativos, subnormales y cero)', () => {
+    // 1.0, -2.0, 0.5, 2^-24 (subnormal mínimo), 0
+    const halves = [0x3c00, 0xc000, 0x3800, 0x0001, 0x0000];
+    const body = Buffer.alloc(halves.length * 2);
+    halves.forEach((h, i) => body.writeUInt16LE(h, i * 2));
+
+    const { shape, data } = parseNpy(buildNpy('<f2', [5], body));
+
+    expect(shape).toEqual([5]);
+    expect(Array.from(data)).toEqual([1, -2, 0.5, 2 ** -24, 0]);
+  });
+
+  it('rechaza archivos que no son .npy y tipos no soportados', () => {
+    expect(() => parseNpy(Buffer.from('{"version": "2.0"}'))).toThrow();
+    expect(() => parseNpy(buildNpy('<f8', [1], Buffer.alloc(8)))).toThrow(/no soportado/);
+  });
+});
+
+describe('readSpeakerEmbeddings — speaker_embeddings_file del diarization.json', () => {
+  let dir;
+
+  afterEach(() => {
+    if (dir) fs.rmSync(dir, { recursive: true, force: true });
+    dir = null;
+  });
+
+  it('mapea cada fila al hablante de la referencia (ruta relativa al JSON)', () => {
+    dir = fs.mkdtempSync(path.join(os.tmpdir(), 'npy-'));
+    fs.writeFileSync(path.join(dir, 'diarization.embeddings.npy'), buildNpy('<f4', [2, 2], float32Body([1, 0, 0, 1])));
+
+    const embeddings = readSpeakerEmbeddings(path.join(dir, 'diarization.json'), {
+      path: 'diarization.embeddings.npy',
+      speakers: ['SPEAKER_00', 'SPEAKER_01'],
+    });
+
+    expect(embeddings).toEqual({ SPEAKER_00: [1, 0], SPEAKER_01: [0, 1] });
+  });
+
+  it('falla si el número de filas no coincide con los hablantes', () => {
+    dir = fs.mkdtempSync(path.join(os.tmpdir(), 'npy-'));
+    fs.writeFileSync(path.join(dir, 'e.npy'), buildNpy('<f4', [1, 2], float32Body([1, 0])));
+
+    expect(() =>
+      readSpeakerEmbeddings(path.join(dir, 'd.json'), { path: 'e.npy', speakers: ['SPEAKER_00', 'SPEAKER_01'] })
+    ).toThrow(/filas/);
+  });
+});
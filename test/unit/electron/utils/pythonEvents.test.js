@@ -0,0 +1,74 @@
+import { describe, it, expect } from 'vitest';
+import { parseEventLine, createEventReader, PROTOCOL_VERSION } from '../../../../electron/utils/pythonEvents.js';
+
+describe('parseEventLine — protocolo EVENT:{json} de los scripts Python', () => {
+  it('parsea un evento de progreso', () => {
+    const event = parseEventLine('EVENT:{"v": 1, "type": "progress", "t": 1.5, "value": 42}');
+
+    expect(event).toEqual({ v: 1, type: 'progress', t: 1.5, value: 42 });
+  });
+
+  it('traduce las líneas clásicas PROGRESS:N a eventos de progreso', () => {
+    expect(parseEventLine('PROGRESS:15')).toEqual({ v: PROTOCOL_VERSION, type: 'progress', value: 15 });
+  });
+
+  it('traduce las líneas clásicas MODEL_SELECTION y DRAFT_READY a sus eventos', () => {
+    expect(parseEventLine('MODEL_SELECTION:{"model": "small", "beam_size": 5, "eta_s": 42.0, "fits": true}')).toEqual({
+      v: PROTOCOL_VERSION,
+      type: 'model_selection',
+      model: 'small',
+      beam_size: 5,
+      eta_s: 42.0,
+      fits: true,
+    });
+    expect(parseEventLine('DRAFT_READY:{"model": "tiny", "elapsed_s": 3.5}')).toEqual({
+      v: PROTOCOL_VERSION,
+      type: 'draft_ready',
+      model: 'tiny',
+      elapsed_s: 3.5,
+    });
+    expect(parseEventLine('DRAFT_READY:{"model": ')).toBeNull();
+  });
+
+  it('devuelve null para logs y otras líneas estructuradas', () => {
+    expect(parseEventLine('🎤 Transcribiendo audio de micrófono...')).toBeNull();
+    expect(parseEventLine('METRIC:{"stage": "decode_audio"}')).toBeNull();
+    expect(parseEventLine('Progreso general: PROGRESS:15 aprox')).toBeNull();
+  });
+
+  it('ignora JSON inválido, eventos sin tipo y versiones futuras del protocolo', () => {
+    expect(parseEventLine('EVENT:{"v": 1, "type": ')).toBeNull();
+    expect(parseEventLine('EVENT:{"v": 1}')).toBeNull();
+    expect(parseEventLine(`EVENT:{"v": ${PROTOCOL_VERSION + 1}, "type": "progress", "value": 1}`)).toBeNull();
+  });
+});
+
+describe('createEventReader — stdout en chunks arbitrarios', () => {
+  it('reconstruye eventos partidos entre chunks', () => {
+    const events = [];
+    const reader = createEventReader({ onEvent: (e) => events.push(e) });
+
+    reader.push('EVENT:{"v": 1, "type": "progress", "val');
+    reader.push('ue": 10}\nEVENT:{"v": 1, "type": "partial_result", "track": "mic", ');
+    reader.push(Buffer.from('"segments": [{"start": 0, "end": 1.2, "text": " Hola"}]}\r\n'));
+
+    expect(events).toHaveLength(2);
+    expect(events[0].value).toBe(10);
+    expect(events[1].segments[0].text).toBe(' Hola');
+  });
+
+  it('separa eventos y líneas de log, y procesa la última línea sin salto al cerrar', () => {
+    const events = [];
+    const lines = [];
+    const reader = createEventReader({ onEvent: (e) => events.push(e), onLine: (l) => lines.push(l) });
+
+    reader.push('INIT:start\n\nPROGRESS:5\nEVENT:{"v": 1, "type": "error", "message": "boom", "fatal": true}');
+    expect(events).toHaveLength(1);
+
+    reader.end();
+
+    expect(lines).toEqual(['INIT:start']);
+    expect(events.map((e) => e.type)).toEqual(['progress', 'error']);
+    expect(events[1]).toMatchObject({ message: 'boom', fatal: true });
+  });
+});